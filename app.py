@@ -5,15 +5,27 @@ Main Streamlit Application
 Author: Prasad Tilloo
 Date: November 2025
 """
-import subprocess
 import streamlit as st
+from contextlib import closing
 from pathlib import Path
+import os
 import sys
-import ollama
+import time
+import uuid
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
+# Only lightweight modules load here; the LLM client, embedder, index and
+# image libraries are imported on first use or by the background warm-up.
+from src.feedback import PROMPT_VERSION, get_response_cache, stream_photography_feedback
+from src.image_pipeline import ImageCache, image_facts, ingest_image
+from src.scheduler import SchedulerError, get_scheduler
+from src.session_store import session_results
+from src.structured_output import overall_rating
+from src.telemetry import cpu_timed, record_cpu, record_span, start_metrics_server, track_request
+from src.utils import format_feedback, format_knowledge, load_env_variables
+
 # ============================================================================
 # PAGE CONFIG
 # ============================================================================
@@ -23,34 +35,76 @@ st.set_page_config(
     page_icon="📸",
     layout="wide",
     initial_sidebar_state="expanded"
-)
+)  # must stay the first Streamlit command
+
+load_env_variables()
+
+# Server CPU of each full script run is recorded at the bottom; fragments,
+# which rerun on their own, record theirs separately
+script_cpu_start = time.thread_time()
 
 # ============================================================================
-# HELPER FUNCTION - OLLAMA INTEGRATION
+# SHARED RESOURCES (one per server process, reused across reruns and sessions)
 # ============================================================================
 
-def generate_photography_feedback(photo_description: str) -> str:
-    """Generate photography feedback using Ollama."""
-    
-    prompt = f"""You are a photography expert. Analyze this photo:
+@st.cache_resource
+def get_llm():
+    from src.llm_client import get_llm_client
+    return get_llm_client()
 
-PHOTO: {photo_description}
 
-Provide brief feedback on:
-- Composition (what works, what to improve)
-- Lighting (quality and tips)
-- Rating (X/10) with one key improvement
+@st.cache_resource
+def get_embedder():
+    from src.embedding_service import get_embedding_service
+    return get_embedding_service()
 
-Keep it concise and specific."""
 
-    try:
-        response = ollama.chat(
-            model='llama3.2:3b',
-            messages=[{'role': 'user', 'content': prompt}]
-        )
-        return response['message']['content']
-    except Exception as e:
-        return f"Error: {str(e)}\n\nMake sure Ollama is running."
+@st.cache_resource
+def get_knowledge_index():
+    from src.rag_pipeline import PhotographyKnowledgeBase
+    get_embedder()
+    PhotographyKnowledgeBase.get_vector_store()
+    return PhotographyKnowledgeBase.get_index()
+
+
+@st.cache_resource
+def get_coach():
+    from src.photo_analyzer import PhotographyCoach
+    return PhotographyCoach(get_llm())
+
+
+@st.cache_resource
+def get_duplicates():
+    from src.image_dedup import get_duplicate_index
+    return get_duplicate_index()
+
+
+@st.cache_resource
+def get_portfolio():
+    from src.portfolio import get_portfolio_store
+    return get_portfolio_store()
+
+
+@st.cache_resource
+def get_request_scheduler():
+    return get_scheduler()
+
+
+@st.cache_resource
+def start_warm_up():
+    # Background threads: the first page renders while the model loads
+    from src.warmup import warm_start
+    return warm_start(get_llm())
+
+
+start_warm_up()
+
+if "session_id" not in st.session_state:
+    st.session_state["session_id"] = uuid.uuid4().hex
+
+if os.getenv("METRICS_PORT"):
+    start_metrics_server(int(os.getenv("METRICS_PORT")))
+
 # ============================================================================
 # TITLE & HEADER
 # ============================================================================
@@ -85,6 +139,35 @@ with st.sidebar:
     st.success("✅ Ollama Connected")
     st.info("🤖 Model: Llama 3.2 (3B)")
     
+    llm = get_llm()
+    if hasattr(llm, "get_stats"):
+        servers = llm.get_stats()["backends"]
+        available = sum(s["healthy"] and not s["draining"] for s in servers)
+        st.caption(f"🖧 Ollama servers: {available}/{len(servers)} available")
+    
+    fast_tier = get_coach().fast_tier
+    if fast_tier is not None and fast_tier.get_stats()["requests"]:
+        fast_stats = fast_tier.get_stats()
+        st.caption(
+            f"⚡ Fast tier: {fast_stats['absorbed_fraction']:.0%} of analyses, "
+            f"{fast_stats['aspect_absorbed_fraction']:.0%} of aspects answered instantly"
+        )
+    
+    cache = get_response_cache()
+    if cache is not None:
+        cache_stats = cache.get_stats()
+        st.caption(
+            f"⚡ Cache hit rate: {cache_stats['hit_rate']:.0%} "
+            f"({cache_stats['entries']} cached responses)"
+        )
+    
+    st.text_input(
+        "👤 Portfolio name",
+        value=os.getenv("PORTFOLIO_USER", "local"),
+        key="portfolio_user",
+        help="Analyses are saved under this name for the Progress tab"
+    )
+    
     st.markdown("---")
     
     st.markdown("""
@@ -101,13 +184,24 @@ with st.sidebar:
 # MAIN TABS
 # ============================================================================
 
-tab1, tab2, tab3 = st.tabs(["📷 Analyze Photo", "💡 Learn Photography", "ℹ️ About"])
+tab1, tab2, tab3, tab4 = st.tabs(["📷 Analyze Photo", "💡 Learn Photography", "📈 Progress", "ℹ️ About"])
 
 # ============================================================================
 # TAB 1: PHOTO ANALYSIS
 # ============================================================================
 
-with tab1:
+def clear_analysis():
+    # Runs before the panel reruns: empties the description and swaps in a
+    # fresh uploader, which releases the previous upload
+    st.session_state["photo_description"] = ""
+    st.session_state["upload_generation"] = st.session_state.get("upload_generation", 0) + 1
+
+
+@st.fragment
+@cpu_timed("rerun", scope="analysis")
+def analysis_panel():
+    # Interacting with anything in here reruns only this function, not the
+    # page config, sidebar and static tabs
     st.header("Analyze Your Photography")
     
     # Example descriptions
@@ -138,10 +232,55 @@ with tab1:
         ```
         """)
     
+    uploaded_photo = st.file_uploader(
+        "Upload your photo (optional):",
+        type=["jpg", "jpeg", "png", "webp"],
+        key=f"photo_upload_{st.session_state.get('upload_generation', 0)}",
+        help="Camera settings are read from EXIF and used in the technical feedback"
+    )
+    
+    photo_info = None
+    if uploaded_photo is not None:
+        # Decoded once per file; reruns hit the content-hash cache under data/
+        try:
+            photo_info = ingest_image(uploaded_photo)
+        except (OSError, ValueError) as e:
+            st.warning(f"⚠️ Could not read this image ({e}); analyzing the description only.")
+    if photo_info is not None:
+        col_img, col_facts = st.columns([1, 2])
+        with col_img:
+            st.image(photo_info["thumbnail_path"], use_container_width=True)
+        with col_facts:
+            for fact in image_facts(photo_info):
+                st.caption(fact)
+            
+            # A burst frame or light edit of an earlier upload is analyzed as
+            # that photo, so its feedback comes back from the response cache.
+            # The index is shared by every session, so that only happens when
+            # the two photos' facts match: otherwise the feedback would cite
+            # another upload's settings and exposure.
+            duplicates = get_duplicates()
+            if duplicates is not None:
+                representative, _ = duplicates.add(photo_info["hash"], photo_info["perceptual"])
+                original = ImageCache().get(representative) if representative != photo_info["hash"] else None
+                if original is not None:
+                    from src.image_dedup import fact_differences
+                    
+                    if set(image_facts(photo_info)) == set(image_facts(original)):
+                        st.info("🔁 Near-duplicate of a photo analyzed before; its analysis is reused.")
+                        photo_info = original
+                    else:
+                        st.info(
+                            "🔁 Near-duplicate of a photo analyzed before, but its own facts differ, "
+                            "so it is analyzed afresh: " + "; ".join(
+                                fact_differences(photo_info, original) or fact_differences(original, photo_info))
+                        )
+    
     photo_description = st.text_area(
         "Describe your photo:",
         placeholder="Enter detailed description of your photograph...",
         height=150,
+        key="photo_description",
         help="The more detail you provide, the better the analysis!"
     )
     
@@ -151,119 +290,297 @@ with tab1:
         analyze_button = st.button("🔍 Get AI Feedback", type="primary", use_container_width=True)
     
     with col2:
-        if st.button("🗑️ Clear", use_container_width=True):
-            st.rerun()
+        st.button("🗑️ Clear", use_container_width=True, on_click=clear_analysis)
+    
+    with col3:
+        structured = st.checkbox(
+            "Per-aspect scores",
+            help="Strengths, improvements and a 1-10 rating for each aspect, shown as each one completes"
+        )
+        depth = st.checkbox(
+            "In-depth",
+            disabled=not structured,
+            help="Send every aspect to the AI model; otherwise clear-cut ones are answered "
+                 "instantly from the knowledge base"
+        ) and structured
+    
+    analysis_input = photo_description
+    if photo_info is not None:
+        analysis_input += "\n\n" + "\n".join(image_facts(photo_info))
+    # Finished results are kept per session (bounded) so the panel's own
+    # reruns redisplay them instead of losing them
+    results = session_results(st.session_state)
+    result_key = f"{('depth:' if depth else 'structured:') if structured else ''}{analysis_input}"
     
     if analyze_button:
         if not photo_description or len(photo_description) < 20:
             st.error("⚠️ Please provide a detailed photo description (at least 20 characters)")
         else:
-            with st.spinner("🤖 AI is analyzing your photo... (this may take 20-30 seconds)"):
-                feedback = generate_photography_feedback(photo_description)
+            st.markdown("---")
+            st.markdown("### 📊 AI Photography Feedback")
+            output = st.empty()
+            output.info("🤖 AI is analyzing your photo...")
+            
+            from src.response_cache import normalize_description
+            
+            get_knowledge_index()
+            llm = get_llm()
+            
+            # Requests go through the shared scheduler: one generation at a
+            # time across all sessions, identical descriptions share output.
+            # Tokens render as they arrive; if the user interrupts the run,
+            # the ticket is cancelled and, once no other session is waiting
+            # on it, generation stops on the server.
+            feedback = ""
+            completed = False
+            last_render = 0.0
+            render_seconds = 0.0
+            analysis = {}
+            escalated = []
+            with track_request("feedback") as trace:
+                if structured:
+                    # Clear-cut aspects are answered from the knowledge-base
+                    # rules at once, without queueing; only the rest go to the model
+                    coach = get_coach()
+                    analysis = coach.fast_analysis(analysis_input, image=photo_info, depth=depth)
+                    escalated = [aspect for aspect in coach.ASPECTS if aspect not in analysis]
+                    if analysis:
+                        feedback = format_feedback(analysis)
+                        output.markdown(feedback + ("▌" if escalated else ""))
+                ticket = None
+                try:
+                    if structured:
+                        # Yields (aspect, result) as each aspect's JSON object closes
+                        job = lambda: coach.stream_full_analysis(analysis_input, escalated, image=photo_info)
+                    else:
+                        job = lambda: stream_photography_feedback(analysis_input, client=llm)
+                    if escalated or not structured:
+                        ticket = get_request_scheduler().submit(
+                            st.session_state["session_id"],
+                            job,
+                            key=f"{'structured:' + ','.join(escalated) + ':' if structured else ''}"
+                                f"{PROMPT_VERSION}:{normalize_description(analysis_input)}",
+                        )
+                except SchedulerError as e:
+                    retry = getattr(e, "retry_after", None)
+                    output.warning(f"⏳ {e}" + (f" (about {retry:.0f}s)" if retry else ""))
+                    ticket = None
                 
-                st.markdown("---")
-                st.markdown("### 📊 AI Photography Feedback")
-                st.markdown(feedback)
+                if ticket is not None:
+                    try:
+                        while not ticket.wait_started(timeout=0.5):
+                            position = ticket.position()
+                            if position and analysis:
+                                output.markdown(feedback + f"\n\n⏳ You're #{position} in the queue for the rest...")
+                            elif position:
+                                output.info(f"⏳ You're #{position} in the queue...")
+                    finally:
+                        if ticket.status == "queued":
+                            ticket.cancel()
+                    if not analysis:
+                        output.info("🤖 AI is analyzing your photo...")
+                    try:
+                        with closing(ticket.stream()) as tokens:
+                            for token in tokens:
+                                if structured:
+                                    aspect, result = token
+                                    analysis[aspect] = {**result, "tier": "model"}
+                                    feedback = format_feedback(analysis)
+                                else:
+                                    feedback += token
+                                if structured or time.monotonic() - last_render > 0.05:
+                                    tick = time.perf_counter()
+                                    output.markdown(feedback + "▌")
+                                    render_seconds += time.perf_counter() - tick
+                                    last_render = time.monotonic()
+                    except SchedulerError as e:
+                        output.warning(f"⏳ {e}. Please try again.")
+                    else:
+                        completed = True
+                elif structured and not escalated:
+                    completed = True  # the fast tier answered every aspect
                 
-                # Add copy button for feedback
-                st.download_button(
-                    label="📄 Download Feedback",
-                    data=feedback,
-                    file_name="photography_feedback.txt",
-                    mime="text/plain"
+                if completed:
+                    if structured:
+                        analysis["overall_rating"] = overall_rating(analysis)
+                        feedback = format_feedback(analysis)
+                    tick = time.perf_counter()
+                    output.markdown(feedback)
+                    record_span("render", render_seconds + time.perf_counter() - tick)
+                    portfolio = get_portfolio()
+                    if portfolio is not None and st.session_state["portfolio_user"].strip():
+                        from src.portfolio import history_analysis, ratings_from_analysis, ratings_from_text
+                        
+                        # Only what succeeded is saved: no error text, no fast-tier-only entries
+                        saved = history_analysis(analysis, escalated) if structured else None
+                        if saved is not None or not structured:
+                            # Queued for the background writer; doesn't delay the response
+                            portfolio.record(
+                                st.session_state["portfolio_user"].strip(),
+                                photo_description,
+                                ratings_from_analysis(saved) if structured else ratings_from_text(feedback),
+                                feedback=format_feedback(saved) if structured else feedback,
+                                model=llm.config.model if ticket is not None else "fast-tier",
+                            )
+            if completed:
+                results.put(result_key, {
+                    "feedback": feedback,
+                    "trace": {
+                        "total_ms": round(trace.duration * 1000, 1),
+                        **trace.summary(),
+                        **({"profile": trace.profile_path} if trace.profile_path else {}),
+                    },
+                })
+    
+    stored = results.get(result_key) if photo_description else None
+    if stored is not None:
+        if not analyze_button:
+            st.markdown("---")
+            st.markdown("### 📊 AI Photography Feedback")
+            st.markdown(stored["feedback"])
+        
+        # Add copy button for feedback
+        st.download_button(
+            label="📄 Download Feedback",
+            data=stored["feedback"],
+            file_name="photography_feedback.txt",
+            mime="text/plain"
+        )
+        with st.expander("⏱️ Request timings"):
+            st.json(stored["trace"])
+        
+        # Follow-ups continue this analysis's conversation: after the first
+        # one, only the new question is sent along with the model's context
+        st.markdown("#### 💬 Follow-up Questions")
+        follow_ups = stored.get("follow_ups", [])
+        for question, answer in follow_ups:
+            st.markdown(f"**You:** {question}")
+            st.markdown(answer)
+        question = st.text_input(
+            "Ask about this feedback",
+            placeholder="How would I fix the lighting?",
+            key="follow_up_question"
+        )
+        if st.button("💬 Ask", disabled=not question.strip()):
+            coach = get_coach()
+            conversation_id = f"{st.session_state['session_id']}:{hash(result_key)}"
+            if conversation_id not in coach.conversations:
+                coach.conversations.seed(conversation_id, analysis_input, stored["feedback"])
+            st.markdown(f"**You:** {question}")
+            output = st.empty()
+            answer = ""
+            try:
+                ticket = get_request_scheduler().submit(
+                    st.session_state["session_id"],
+                    lambda: coach.follow_up(conversation_id, question),
                 )
+                with closing(ticket.stream()) as tokens:
+                    for token in tokens:
+                        answer += token
+                        output.markdown(answer + "▌")
+            except SchedulerError as e:
+                output.warning(f"⏳ {e}. Please try again.")
+            except Exception as e:
+                output.error(f"Error: {e}\n\nMake sure Ollama is running.")
+            else:
+                output.markdown(answer)
+                results.put(result_key, {**stored, "follow_ups": follow_ups + [(question, answer)]})
+
+
+with tab1:
+    analysis_panel()
 
 # ============================================================================
 # TAB 2: LEARN PHOTOGRAPHY
 # ============================================================================
 
+LEARN_HEADINGS = {
+    "composition": "🎨 Composition Principles",
+    "lighting": "💡 Lighting Techniques",
+    "storytelling": "📖 Storytelling",
+    "technical": "⚙️ Technical Tips",
+}
+
+
+@st.cache_data
+def learning_content() -> dict:
+    # Built once per process from the same knowledge the coach retrieves from
+    from src.rag_pipeline import PhotographyKnowledgeBase
+    return {
+        section: format_knowledge(PhotographyKnowledgeBase.get_section_knowledge(section))
+        for section in PhotographyKnowledgeBase.SECTIONS
+    }
+
+
 with tab2:
     st.header("Photography Learning Resources")
     
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.subheader("🎨 Composition Principles")
-        st.markdown("""
-        **Rule of Thirds**
-        - Place subjects at grid intersections
-        - Creates dynamic compositions
-        - Avoids centered, static images
-        
-        **Leading Lines**
-        - Roads, rivers, fences guide eye
-        - Creates depth and journey
-        - Draws viewer into scene
-        
-        **Foreground, Midground, Background**
-        - Creates sense of depth
-        - Makes 2D image feel 3D
-        - Tells complete story
-        
-        **Negative Space**
-        - Empty space around subject
-        - Lets subject breathe
-        - Emphasizes main focus
-        """)
-    
-    with col2:
-        st.subheader("💡 Lighting Techniques")
-        st.markdown("""
-        **Golden Hour**
-        - 1 hour after sunrise / before sunset
-        - Warm, soft, directional light
-        - Flattering for all subjects
-        
-        **Blue Hour**
-        - Just after sunset / before sunrise
-        - Cool blue tones
-        - Great for urban scenes
-        
-        **Side Lighting**
-        - Light from 90° to subject
-        - Emphasizes texture & dimension
-        - Shows form and shape
+    content = learning_content()
+    sections = list(LEARN_HEADINGS)
+    for row, pair in enumerate((sections[:2], sections[2:])):
+        if row:
+            st.markdown("---")
+        for column, section in zip(st.columns(2), pair):
+            with column:
+                st.subheader(LEARN_HEADINGS[section])
+                st.markdown(content[section])
+
+# ============================================================================
+# TAB 3: PROGRESS
+# ============================================================================
+
+@st.fragment
+@cpu_timed("rerun", scope="progress")
+def progress_panel():
+    st.header("Your Progress")
+    
+    portfolio = get_portfolio()
+    portfolio_user = st.session_state.get("portfolio_user", "").strip()
+    if portfolio is None or not portfolio_user:
+        st.info("Enter a portfolio name in the sidebar to save your analyses and track your scores over time.")
+    else:
+        months = st.select_slider(
+            "Period",
+            options=[3, 6, 12, 24],
+            value=6,
+            format_func=lambda m: f"Last {m} months"
+        )
+        # Reads the per-month aggregates: cost doesn't grow with history size
+        progress = portfolio.progress(portfolio_user, months=months)
         
-        **Backlighting**
-        - Subject between camera and light
-        - Creates rim light and glow
-        - Good for silhouettes
-        """)
-    
-    st.markdown("---")
-    
-    col3, col4 = st.columns(2)
-    
-    with col3:
-        st.subheader("📖 Storytelling")
-        st.markdown("""
-        **Elements of Visual Story:**
-        - Clear subject (what/who)
-        - Context (where/when)
-        - Action or moment (what's happening)
-        - Emotion (how it feels)
-        - Universal connection (why we care)
-        """)
-    
-    with col4:
-        st.subheader("⚙️ Technical Tips")
-        st.markdown("""
-        **Exposure Triangle:**
-        - Aperture (depth of field)
-        - Shutter speed (motion blur)
-        - ISO (light sensitivity)
+        if not any(summary["count"] for summary in progress.values()):
+            st.info("No rated analyses in this period yet. Ratings from the Analyze tab show up here.")
+        else:
+            columns = st.columns(len(progress))
+            for column, (aspect, summary) in zip(columns, progress.items()):
+                column.metric(
+                    aspect.title(),
+                    f"{summary['mean']:.1f}/10" if summary["count"] else "–",
+                    help=f"{summary['count']} rated analyses"
+                )
+            
+            chart = {"Month": [m["month"] for m in next(iter(progress.values()))["months"]]}
+            for aspect, summary in progress.items():
+                chart[aspect.title()] = [m["mean"] for m in summary["months"]]
+            st.line_chart(chart, x="Month")
         
-        **Focus:**
-        - Sharp on intended subject
-        - Appropriate depth of field
-        - No distracting blur
-        """)
+        st.subheader("Recent Analyses")
+        for row in portfolio.history(portfolio_user, limit=10):
+            rating = row["ratings"].get("overall")
+            title = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["created_at"]))
+            with st.expander(f"{title} · {rating}/10" if rating else title):
+                st.caption(row["description"])
+                st.markdown(row["feedback"])
+
+
+with tab3:
+    progress_panel()
 
 # ============================================================================
-# TAB 3: ABOUT
+# TAB 4: ABOUT
 # ============================================================================
 
-with tab3:
+with tab4:
     st.header("About AI Photography Coach")
     
     st.markdown("""
@@ -329,7 +646,6 @@ with tab3:
     - Multi-language support
     - Cloud deployment
     - Mobile app version
-    - Portfolio tracking over time
     """)
 
 # ============================================================================
@@ -343,3 +659,5 @@ st.markdown("""
     <p>Made with ❤️ using Streamlit + Ollama</p>
 </div>
 """, unsafe_allow_html=True)
+
+record_cpu("rerun", time.thread_time() - script_cpu_start, scope="full")
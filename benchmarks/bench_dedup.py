@@ -0,0 +1,136 @@
+"""
+Near-Duplicate Benchmark
+LLM calls saved by clustering burst frames and edited variants, and lookup cost
+
+Builds a synthetic catalog: each scene is shot as a burst of frames that are
+slightly shifted, re-exposed and re-compressed, and some frames get a light
+edit (contrast, crop, resize). Every photo is hashed and filed in a
+DuplicateIndex in catalog order; only representatives would be sent to the
+model. Precision counts merged photos filed under a frame of the same scene.
+
+Usage:
+    python benchmarks/bench_dedup.py --scenes 200 --burst 4
+    python benchmarks/bench_dedup.py --phash-distance 8 --dhash-distance 12 --json
+"""
+
+import argparse
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.image_dedup import DHASH_DISTANCE, PHASH_DISTANCE, DuplicateIndex, MultiIndexHash, hamming, perceptual_hashes  # noqa: E402
+
+
+def synthetic_scene(rng: np.random.Generator, width: int = 640, height: int = 480) -> np.ndarray:
+    """A sky gradient over ground with a few coloured blocks, float32 RGB"""
+    ys = np.linspace(0, 1, height, dtype=np.float32)[:, None, None]
+    scene = np.broadcast_to(rng.uniform(80, 230, 3) * (1 - 0.5 * ys), (height, width, 3)).copy()
+    horizon = int(height * rng.uniform(0.3, 0.8))
+    scene[horizon:] = rng.uniform(20, 140, 3)
+    for _ in range(rng.integers(2, 6)):
+        h, w = rng.integers(height // 10, height // 2), rng.integers(width // 10, width // 2)
+        y, x = rng.integers(0, height - h), rng.integers(0, width - w)
+        scene[y:y + h, x:x + w] = rng.uniform(0, 255, 3)
+    return scene
+
+
+def burst_frame(scene: np.ndarray, rng: np.random.Generator, edit: bool):
+    """One frame of a burst: a few pixels of camera shake, exposure drift, JPEG round trip"""
+    from PIL import Image, ImageEnhance
+
+    height, width = scene.shape[:2]
+    dy, dx = rng.integers(-height // 50, height // 50 + 1), rng.integers(-width // 50, width // 50 + 1)
+    frame = np.roll(scene, (dy, dx), axis=(0, 1)) * rng.uniform(0.92, 1.08)
+    frame += rng.normal(0, 4, frame.shape)
+    image = Image.fromarray(np.clip(frame, 0, 255).astype(np.uint8))
+    if edit:
+        image = ImageEnhance.Contrast(image).enhance(rng.uniform(0.85, 1.2))
+        margin = int(width * rng.uniform(0, 0.04))
+        image = image.crop((margin, margin, width - margin, height - margin))
+        if rng.random() < 0.5:
+            image = image.resize((image.width // 2, image.height // 2))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=int(rng.integers(60, 95)))
+    buffer.seek(0)
+    return Image.open(buffer).convert("RGB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenes", type=int, default=200)
+    parser.add_argument("--burst", type=int, default=4, help="Frames per scene")
+    parser.add_argument("--edit-ratio", type=float, default=0.3, help="Share of frames with a light edit")
+    parser.add_argument("--phash-distance", type=int, default=PHASH_DISTANCE)
+    parser.add_argument("--dhash-distance", type=int, default=DHASH_DISTANCE)
+    parser.add_argument("--lookups", type=int, default=100_000, help="Random hashes for the lookup timing")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    photos = []
+    for scene_id in range(args.scenes):
+        scene = synthetic_scene(rng)
+        for frame in range(args.burst):
+            photos.append((scene_id, burst_frame(scene, rng, edit=rng.random() < args.edit_ratio)))
+
+    start = time.perf_counter()
+    hashes = [perceptual_hashes(image) for _, image in photos]
+    hash_ms = (time.perf_counter() - start) / len(photos) * 1000
+
+    index = DuplicateIndex(phash_distance=args.phash_distance, dhash_distance=args.dhash_distance)
+    scene_of = {}
+    merged = correct = 0
+    for i, ((scene_id, _), photo_hashes) in enumerate(zip(photos, hashes)):
+        scene_of[str(i)] = scene_id
+        representative, _ = index.add(str(i), photo_hashes)
+        if representative != str(i):
+            merged += 1
+            correct += scene_of[representative] == scene_id
+    possible = args.scenes * (args.burst - 1)
+
+    # Lookup cost at catalog scale: multi-index probes versus a linear scan
+    tree = MultiIndexHash()
+    keys = rng.integers(0, 2 ** 63, args.lookups, dtype=np.int64)
+    for key in keys:
+        tree.add(int(key), None)
+    probe = [int(key) ^ (1 << int(bit)) for key, bit in zip(keys[:200], rng.integers(0, 63, 200))]
+    start = time.perf_counter()
+    for key in probe:
+        tree.search(key, args.phash_distance)
+    tree_ms = (time.perf_counter() - start) / len(probe) * 1000
+    start = time.perf_counter()
+    for key in probe[:20]:
+        [k for k in keys.tolist() if hamming(key, k) <= args.phash_distance]
+    linear_ms = (time.perf_counter() - start) / 20 * 1000
+
+    results = {
+        "photos": len(photos),
+        "llm_calls": len(photos) - merged,
+        "calls_saved": round(merged / len(photos), 3),
+        "merge_recall": round(merged / possible, 3) if possible else None,
+        "merge_precision": round(correct / merged, 3) if merged else None,
+        "hash_ms_per_photo": round(hash_ms, 3),
+        "lookup": {"entries": args.lookups, "multi_index_ms": round(tree_ms, 3), "linear_ms": round(linear_ms, 3)},
+        "config": {key: value for key, value in vars(args).items() if key != "json"},
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{results['photos']} photos ({args.scenes} scenes x {args.burst} frames), "
+          f"pHash <= {args.phash_distance}, dHash <= {args.dhash_distance}")
+    print(f"  LLM calls {results['llm_calls']} ({results['calls_saved']:.0%} saved)  "
+          f"merge recall {results['merge_recall']}  precision {results['merge_precision']}  "
+          f"hashing {results['hash_ms_per_photo']:.2f} ms/photo")
+    print(f"  lookup among {args.lookups} hashes: multi-index {tree_ms:.3f} ms, linear scan {linear_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Embedding Throughput Benchmark
+Queries/sec versus batch size, direct and through the micro-batching service
+
+Usage:
+    python benchmarks/bench_embedding.py --batch-sizes 1 4 16 64 --clients 16
+    EMBEDDING_BACKEND=onnx-int8 python benchmarks/bench_embedding.py
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.embedding_service import EmbeddingService  # noqa: E402
+from src.embeddings import get_default_embedder  # noqa: E402
+
+SUBJECTS = ["portrait", "landscape", "street scene", "macro shot", "night skyline", "wildlife"]
+LIGHT = ["golden hour", "harsh midday sun", "soft window light", "blue hour", "overcast sky"]
+DETAILS = ["leading lines", "shallow depth of field", "centred subject", "tilted horizon", "motion blur"]
+
+
+def synthetic_queries(count: int):
+    """Distinct, description-like strings so no call is served from a cache"""
+    return [f"{SUBJECTS[i % 6]} in {LIGHT[i % 5]} with {DETAILS[i % 5]}, shot {i}" for i in range(count)]
+
+
+def direct_qps(embedder, queries, batch_size: int) -> float:
+    embedder.embed(queries[:batch_size])  # warm-up
+    started = time.perf_counter()
+    for start in range(0, len(queries), batch_size):
+        embedder.embed(queries[start:start + batch_size])
+    return len(queries) / (time.perf_counter() - started)
+
+
+def service_qps(embedder, queries, batch_size: int, clients: int, wait_ms: float):
+    """Single-query calls from concurrent clients, coalesced by the service"""
+    service = EmbeddingService(embedder, max_batch_size=batch_size, max_wait_ms=wait_ms, cache_size=0)
+    service.embed(["warm up"])
+    per_client = [queries[i::clients] for i in range(clients)]
+    barrier = threading.Barrier(clients + 1)
+
+    def client(items):
+        barrier.wait()
+        for text in items:
+            service.embed([text])
+
+    threads = [threading.Thread(target=client, args=(items,)) for items in per_client]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return len(queries) / elapsed, service.get_stats()["mean_batch_size"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding queries/sec versus batch size")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--queries", type=int, default=1024)
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent callers for the service run")
+    parser.add_argument("--wait-ms", type=float, default=5.0, help="Service batching window")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    embedder = get_default_embedder()
+    queries = synthetic_queries(args.queries)
+    results = {"embedder": embedder.name, "queries": args.queries, "clients": args.clients, "rows": []}
+    for batch_size in args.batch_sizes:
+        qps, mean_batch = service_qps(embedder, queries, batch_size, args.clients, args.wait_ms)
+        results["rows"].append({
+            "batch_size": batch_size,
+            "direct_qps": round(direct_qps(embedder, queries, batch_size), 1),
+            "service_qps": round(qps, 1),
+            "service_mean_batch": mean_batch,
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{results['embedder']}, {args.queries} queries, {args.clients} concurrent clients")
+    print(f"{'batch':>6}{'direct q/s':>13}{'service q/s':>14}{'mean batch':>12}")
+    for row in results["rows"]:
+        print(f"{row['batch_size']:>6}{row['direct_qps']:>13.0f}{row['service_qps']:>14.0f}"
+              f"{row['service_mean_batch']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Fast Tier Benchmark
+Share of analyses the keyword fast tier absorbs, and its latency against the model's
+
+Runs a mix of photo descriptions, from cue-rich to vague, through
+get_tiered_analysis() and get_full_analysis() and reports, per confidence
+threshold, the fraction of analyses and of aspects the fast tier answered
+and the mean end-to-end latency of each path. The local stub stands in for
+the model with --latency per request and --token-delay per token; pass
+--base-url to measure a real Ollama server instead.
+
+Usage:
+    python benchmarks/bench_fast_tier.py
+    python benchmarks/bench_fast_tier.py --thresholds 0.5 0.75 0.9 --json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.fast_tier import FastTier  # noqa: E402
+from src.llm_client import LLMConfig, OllamaClient  # noqa: E402
+from src.photo_analyzer import PhotographyCoach  # noqa: E402
+from tools.ollama_stub import StubOllamaServer  # noqa: E402
+
+DESCRIPTIONS = [
+    "Mountain landscape at sunset with golden hour light on the peaks. A stream winds through the foreground "
+    "creating leading lines; a lone hiker on the ridge is placed on the right third.",
+    "Portrait of a woman with soft window light from the left. Blurred background with warm bokeh, natural "
+    "expression, candid moment. Shot at f/2.8 with shallow depth of field.",
+    "Urban street scene, commuters in motion. Harsh midday sun creating strong shadows; the horizon is tilted "
+    "and the sky overexposed.",
+    "City skyline at blue hour after sunset, reflection in the river, symmetrical composition, noisy at ISO 6400.",
+    "Backlit silhouette of a couple on a pier against the sun, negative space in the empty sky.",
+    "Close-up of a red flower in the garden.",
+    "My dog on the sofa, taken with my phone.",
+    "A bowl of fruit on a kitchen table in the afternoon.",
+]
+
+
+def structured_reply(messages):
+    aspects = messages[-1]["content"].split("Aspects, in order: ")[-1].split(", ")
+    return json.dumps({aspect: {"strengths": ["Model view"], "improvements": ["Model note"],
+                                "suggestions": ["Model tip"], "rating": 7} for aspect in aspects})
+
+
+def run(coach: PhotographyCoach, rounds: int, tiered: bool) -> np.ndarray:
+    seconds = []
+    for _ in range(rounds):
+        for description in DESCRIPTIONS:
+            start = time.perf_counter()
+            if tiered:
+                coach.get_tiered_analysis(description)
+            else:
+                coach.get_full_analysis(description)
+            seconds.append(time.perf_counter() - start)
+    return np.array(seconds) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=2, help="Passes over the description mix")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.5, 0.75, 0.9],
+                        help="FAST_TIER_MIN_CONFIDENCE values to compare")
+    parser.add_argument("--base-url", help="Use a running Ollama server instead of the stub")
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub delay per request (seconds)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Stub delay per streamed token")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    os.environ.setdefault("EMBEDDING_MODEL", "hashing")
+    from src.rag_pipeline import PhotographyKnowledgeBase
+
+    PhotographyKnowledgeBase.get_vector_store()  # index load is not part of the measurement
+    stub = None
+    if args.base_url is None:
+        stub = StubOllamaServer(reply=structured_reply, latency=args.latency, token_delay=args.token_delay).start()
+    client = OllamaClient(LLMConfig(base_url=args.base_url or stub.base_url))
+    coach = PhotographyCoach(client)
+    rows = []
+    try:
+        model_ms = run(coach, args.rounds, tiered=False)
+        for threshold in args.thresholds:
+            coach.fast_tier = FastTier(PhotographyKnowledgeBase, min_confidence=threshold)
+            tiered_ms = run(coach, args.rounds, tiered=True)
+            stats = coach.fast_tier.get_stats()
+            rows.append({
+                "min_confidence": threshold,
+                "absorbed_fraction": round(stats["absorbed_fraction"], 3),
+                "aspect_absorbed_fraction": round(stats["aspect_absorbed_fraction"], 3),
+                "tiered_mean_ms": round(float(tiered_ms.mean()), 1),
+                "tiered_p50_ms": round(float(np.percentile(tiered_ms, 50)), 1),
+            })
+        start = time.perf_counter()
+        for _ in range(100):
+            for description in DESCRIPTIONS:
+                coach.fast_tier.analyze(description, coach.ASPECTS)
+        fast_ms = (time.perf_counter() - start) * 1000 / (100 * len(DESCRIPTIONS))
+    finally:
+        coach.close()
+        client.close()
+        if stub is not None:
+            stub.stop()
+
+    results = {
+        "model_only": {"mean_ms": round(float(model_ms.mean()), 1),
+                       "p50_ms": round(float(np.percentile(model_ms, 50)), 1)},
+        "fast_tier_ms": round(fast_ms, 3),
+        "tiered": rows,
+        "config": {key: value for key, value in vars(args).items() if key != "json"},
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{len(DESCRIPTIONS) * args.rounds} analyses per run; fast tier alone: {results['fast_tier_ms']} ms each")
+    print(f"Model only: mean {results['model_only']['mean_ms']} ms, p50 {results['model_only']['p50_ms']} ms")
+    print(f"  {'min conf':<10}{'analyses':>10}{'aspects':>10}{'mean ms':>10}{'p50 ms':>10}{'vs model':>10}")
+    for row in rows:
+        print(f"  {row['min_confidence']:<10}{row['absorbed_fraction']:>10.0%}{row['aspect_absorbed_fraction']:>10.0%}"
+              f"{row['tiered_mean_ms']:>10.1f}{row['tiered_p50_ms']:>10.1f}"
+              f"{row['tiered_mean_ms'] / results['model_only']['mean_ms']:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Follow-up Benchmark
+Latency and prompt tokens evaluated per follow-up question: model context versus resending history
+
+Opens a conversation with the first analysis, then asks a series of
+follow-up questions three ways: continuing from the model context
+(ConversationStore), from the rolling summary (as after an eviction), and
+statelessly resending the full prompt plus every earlier turn through
+/api/chat. The local stub charges --prefill-ms per prompt token it has to
+evaluate, like a CPU-bound model with a warm KV cache for the context; pass
+--base-url to measure a real Ollama server instead.
+
+Usage:
+    python benchmarks/bench_followup.py --turns 5
+    python benchmarks/bench_followup.py --base-url http://localhost:11434 --json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.conversation import ConversationStore  # noqa: E402
+from src.llm_client import LLMConfig, OllamaClient  # noqa: E402
+from src.telemetry import registry  # noqa: E402
+from tools.ollama_stub import StubOllamaServer  # noqa: E402
+
+DESCRIPTION = ("Mountain landscape at sunset with golden hour light on the peaks, a stream as a leading "
+               "line from the bottom left corner and a lone hiker on the ridge. Shot at f/8, 1/250s.")
+QUESTIONS = [
+    "How would I fix the lighting?",
+    "Would a tighter crop help the composition?",
+    "What shutter speed would smooth the stream?",
+    "Should the hiker be larger in the frame?",
+    "How would you edit the colours?",
+]
+
+
+def prompt_tokens() -> float:
+    return registry.counter("llm_tokens_total").value(kind="prompt")
+
+
+def timed(fn):
+    """Run fn, returning (seconds, prompt tokens the model evaluated, result)"""
+    tokens = prompt_tokens()
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, prompt_tokens() - tokens, result
+
+
+def run_store(client: OllamaClient, turns: int, **kwargs) -> dict:
+    store = ConversationStore(client, **kwargs)
+    first_s, first_tokens, analysis = timed(lambda: "".join(store.start("bench", DESCRIPTION)))
+    samples = [timed(lambda: "".join(store.ask("bench", QUESTIONS[i % len(QUESTIONS)]))) for i in range(turns)]
+    return {"first": (first_s, first_tokens), "turns": samples, "analysis": analysis, "store": store}
+
+
+def run_resend(client: OllamaClient, turns: int, store: ConversationStore, analysis: str) -> list:
+    """Stateless: every follow-up carries the original prompt and all earlier turns"""
+    from src.feedback import build_feedback_prompt
+    from src.telemetry import record_llm_usage
+
+    messages = build_feedback_prompt(DESCRIPTION, store.builder).messages + [
+        {"role": "assistant", "content": analysis}]
+    samples = []
+    for i in range(turns):
+        messages.append({"role": "user", "content": QUESTIONS[i % len(QUESTIONS)]})
+
+        def ask():
+            response = client.chat(messages, options=store.builder.options)
+            record_llm_usage(response)
+            return response["message"]["content"]
+
+        seconds, tokens, answer = timed(ask)
+        messages.append({"role": "assistant", "content": answer})
+        samples.append((seconds, tokens, answer))
+    return samples
+
+
+def summarize(samples) -> dict:
+    seconds = np.array([s[0] for s in samples]) * 1000
+    tokens = np.array([s[1] for s in samples])
+    return {"mean_ms": round(float(seconds.mean()), 1), "p90_ms": round(float(np.percentile(seconds, 90)), 1),
+            "prompt_tokens_mean": round(float(tokens.mean()), 1), "prompt_tokens_last": int(tokens[-1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=5, help="Follow-up questions per mode")
+    parser.add_argument("--base-url", help="Use a running Ollama server instead of the stub")
+    parser.add_argument("--prefill-ms", type=float, default=2.0, help="Stub latency per evaluated prompt token")
+    parser.add_argument("--reply-words", type=int, default=60, help="Stub answer length")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    os.environ.setdefault("EMBEDDING_MODEL", "hashing")
+    from src.rag_pipeline import PhotographyKnowledgeBase
+
+    PhotographyKnowledgeBase.get_vector_store()  # index load is not part of the measurement
+    stub = None
+    if args.base_url is None:
+        reply = " ".join(f"word{i}." if i % 12 == 11 else f"word{i}" for i in range(args.reply_words))
+        stub = StubOllamaServer(reply=lambda prompt: reply, prefill_delay=args.prefill_ms / 1000).start()
+    client = OllamaClient(LLMConfig(base_url=args.base_url or stub.base_url))
+    try:
+        context = run_store(client, args.turns)
+        summary = run_store(client, args.turns, max_context_tokens=0)
+        resend = run_resend(client, args.turns, context["store"], context["analysis"])
+    finally:
+        client.close()
+        if stub is not None:
+            stub.stop()
+
+    first_s, first_tokens = context["first"]
+    results = {
+        "first_analysis": {"ms": round(first_s * 1000, 1), "prompt_tokens": int(first_tokens)},
+        "follow_up": {
+            "context": summarize(context["turns"]),
+            "summary": summarize(summary["turns"]),
+            "resend_history": summarize(resend),
+        },
+        "config": {key: value for key, value in vars(args).items() if key != "json"},
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"First analysis: {results['first_analysis']['ms']} ms, "
+          f"{results['first_analysis']['prompt_tokens']} prompt tokens evaluated")
+    print(f"{args.turns} follow-ups per mode:")
+    print(f"  {'mode':<16}{'mean ms':>10}{'p90 ms':>10}{'tokens/turn':>13}{'last turn':>11}{'vs first':>10}")
+    for mode, row in results["follow_up"].items():
+        print(f"  {mode:<16}{row['mean_ms']:>10.1f}{row['p90_ms']:>10.1f}{row['prompt_tokens_mean']:>13.1f}"
+              f"{row['prompt_tokens_last']:>11}{row['mean_ms'] / results['first_analysis']['ms']:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
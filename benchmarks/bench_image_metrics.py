@@ -0,0 +1,96 @@
+"""
+Image Metrics Benchmark
+Per-image latency of the metrics engine on a single CPU core
+
+Usage:
+    python benchmarks/bench_image_metrics.py --megapixels 12 --runs 30
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import image_metrics  # noqa: E402
+
+
+def synthetic_photo(megapixels: float, seed: int = 0) -> np.ndarray:
+    """A 4:3 frame with a sky/ground split, a subject on a third and sensor noise"""
+    height = int(np.sqrt(megapixels * 1e6 * 3 / 4))
+    width = int(height * 4 / 3)
+    rng = np.random.default_rng(seed)
+    ys = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    photo = np.empty((height, width, 3), dtype=np.float32)
+    photo[...] = (200 - 60 * ys)[..., None]
+    photo[height // 2:] = (60, 80, 40)
+    cy, cx, r = height // 3, width // 3, height // 12
+    photo[cy - r:cy + r, cx - r:cx + r] = (230, 80, 40)
+    photo += rng.normal(0, 6, (height, 1, 1)).astype(np.float32)
+    return np.clip(photo, 0, 255).astype(np.uint8)
+
+
+def time_call(fn, runs: int):
+    fn()  # warm-up
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(samples, 50)), float(np.percentile(samples, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=12.0)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    parser.add_argument("--no-opencv", action="store_true", help="Benchmark the pure NumPy fallbacks")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    if args.no_opencv:
+        image_metrics.cv2 = None
+    elif image_metrics.cv2 is not None:
+        image_metrics.cv2.setNumThreads(1)
+
+    photo = synthetic_photo(args.megapixels)
+    small = image_metrics.downscale(photo)
+    luma = image_metrics.luminance(small)
+    gx, gy = image_metrics._gradients(luma)
+
+    stages = {
+        "downscale": lambda: image_metrics.downscale(photo),
+        "exposure": lambda: image_metrics.exposure_metrics(luma),
+        "sharpness": lambda: image_metrics.sharpness(luma),
+        "horizon_tilt": lambda: image_metrics.horizon_tilt(gx, gy),
+        "thirds": lambda: image_metrics.thirds_metrics(image_metrics.saliency_map(small)),
+        "total": lambda: image_metrics.compute_metrics(photo),
+    }
+    results = {
+        "megapixels": round(photo.shape[0] * photo.shape[1] / 1e6, 1),
+        "backend": "numpy" if image_metrics.cv2 is None else "opencv",
+        "stages": {},
+    }
+    for name, fn in stages.items():
+        p50, p99 = time_call(fn, args.runs)
+        results["stages"][name] = {"p50_ms": round(p50, 2), "p99_ms": round(p99, 2)}
+    results["within_budget"] = results["stages"]["total"]["p50_ms"] < args.budget_ms
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{results['megapixels']} MP, {results['backend']} backend, 1 thread")
+        for name, row in results["stages"].items():
+            print(f"  {name:<13} p50 {row['p50_ms']:7.2f} ms   p99 {row['p99_ms']:7.2f} ms")
+        verdict = "OK" if results["within_budget"] else "OVER BUDGET"
+        print(f"  budget {args.budget_ms:.0f} ms: {verdict}")
+    return 0 if results["within_budget"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Import-Time Benchmark
+Cold-start cost of the modules the Streamlit app loads at script start
+
+Each module is imported in a fresh interpreter under `python -X importtime`
+and the median cumulative time is reported with its most expensive
+dependencies. Exits non-zero when a module exceeds --budget-ms or pulls in
+a heavy dependency that should load lazily, so it can guard CI.
+
+Usage:
+    python benchmarks/bench_import_time.py --runs 5 --budget-ms 150
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).parent.parent
+
+# What app.py imports before rendering the first page
+APP_MODULES = ["src", "src.feedback", "src.image_pipeline", "src.scheduler",
+               "src.session_store", "src.structured_output", "src.telemetry", "src.utils"]
+# Must never load at import time; each is deferred to first use
+HEAVY_MODULES = ["numpy", "httpx", "faiss", "cv2", "PIL", "sentence_transformers",
+                 "torch", "sqlite3", "http.server"]
+
+
+def parse_importtime(stderr: str) -> List[Tuple[int, int, int, str]]:
+    """(depth, self_us, cumulative_us, module) for every -X importtime line"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((depth, int(self_us), int(cumulative_us), name.strip()))
+    return rows
+
+
+def measure(module: str) -> Dict:
+    """Import module once in a fresh interpreter"""
+    probe = (f"import sys, {module}; "
+             f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", probe],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = parse_importtime(result.stderr)
+    # Only what the probe itself triggered: everything after interpreter startup (site)
+    start = max((i for i, row in enumerate(rows) if row[0] == 0 and row[3] == "site"), default=-1) + 1
+    probe_rows = rows[start:]
+    total_us = sum(row[2] for row in probe_rows if row[0] == 0)
+    heaviest = sorted(((row[2], row[3]) for row in probe_rows if row[0] <= 1), reverse=True)[:5]
+    return {
+        "total_us": total_us,
+        "heaviest": heaviest,
+        "heavy_loaded": [m for m in result.stdout.strip().split(",") if m],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import cost of the app's modules")
+    parser.add_argument("--module", action="append", help="Module to measure (repeatable; default: app modules)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="Per-module median budget")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for module in args.module or APP_MODULES:
+        samples = [measure(module) for _ in range(args.runs)]
+        results[module] = {
+            "median_ms": round(statistics.median(s["total_us"] for s in samples) / 1000, 2),
+            "max_ms": round(max(s["total_us"] for s in samples) / 1000, 2),
+            "heaviest": [{"module": name, "ms": round(us / 1000, 2)} for us, name in samples[-1]["heaviest"]],
+            "heavy_loaded": samples[-1]["heavy_loaded"],
+        }
+        results[module]["ok"] = (results[module]["median_ms"] <= args.budget_ms
+                                 and not results[module]["heavy_loaded"])
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'module':<22}{'median ms':>11}{'max ms':>9}  heavy deps / top imports")
+        for module, r in results.items():
+            detail = ("LOADS " + ", ".join(r["heavy_loaded"])) if r["heavy_loaded"] else \
+                ", ".join(f"{h['module']} {h['ms']:.0f}" for h in r["heaviest"][:3])
+            flag = "" if r["ok"] else "  <-- regression"
+            print(f"{module:<22}{r['median_ms']:>11.1f}{r['max_ms']:>9.1f}  {detail}{flag}")
+
+    sys.exit(0 if all(r["ok"] for r in results.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
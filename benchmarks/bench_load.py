@@ -0,0 +1,256 @@
+"""
+Load Test
+End-to-end throughput, time to first token and tail latency under concurrent sessions
+
+Runs N simulated sessions against local Ollama stubs (or real servers via
+--base-url) through the same code paths the app uses. The targets are the
+streamed feedback behind the Analyze tab, generate_photography_feedback and
+the per-aspect PhotographyCoach pipeline. Each configuration is labelled so
+that --json results from scheduler, cache and retrieval variants can be
+compared.
+
+Usage:
+    python benchmarks/bench_load.py --sessions 8 --requests 5
+    python benchmarks/bench_load.py --target coach --tokens-per-second 30 --jitter 0.3 --json
+    python benchmarks/bench_load.py --no-scheduler --cache --label cache-only --json
+    python benchmarks/bench_load.py --servers 3 --max-active 3 --label three-hosts --json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import closing, nullcontext
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.feedback import PROMPT_VERSION, generate_photography_feedback, stream_photography_feedback  # noqa: E402
+from src.llm_client import LLMConfig, OllamaClient  # noqa: E402
+from src.llm_router import LLMRouter  # noqa: E402
+from src.scheduler import RequestScheduler, SchedulerError  # noqa: E402
+from tools.ollama_stub import DEFAULT_REPLY, StubOllamaServer  # noqa: E402
+
+TARGETS = ("stream", "feedback", "coach")
+
+DESCRIPTIONS = [
+    "Mountain landscape at sunset with golden hour light on the peaks and a stream as a leading line.",
+    "Portrait with soft window light from the left, blurred background, shot at f/2.8.",
+    "Urban street scene at midday with harsh shadows and strong geometric shapes from buildings.",
+    "Night skyline over a river with long-exposure light trails and a slightly tilted horizon.",
+    "Macro shot of a dew-covered leaf, backlit, with the background falling into dark bokeh.",
+    "Wildlife photo of a heron at blue hour, subject centred, some noise at ISO 3200.",
+]
+
+
+def make_reply(tokens: int):
+    """A stub reply of roughly `tokens` words"""
+    words = DEFAULT_REPLY.split(" ")
+    text = " ".join(words[i % len(words)] for i in range(max(tokens, 1)))
+    return lambda prompt: text
+
+
+def percentiles(values) -> dict:
+    if not values:
+        return {"p50": None, "p90": None, "p99": None, "max": None}
+    ms = np.asarray(values) * 1000
+    return {"p50": round(float(np.percentile(ms, 50)), 1), "p90": round(float(np.percentile(ms, 90)), 1),
+            "p99": round(float(np.percentile(ms, 99)), 1), "max": round(float(ms.max()), 1)}
+
+
+class LoadTest:
+    """N sessions issuing requests with think time in between, each timed end to end"""
+
+    def __init__(self, args, client: OllamaClient):
+        self.args = args
+        self.client = client
+        self.cache = None
+        if args.cache:
+            from src.response_cache import ResponseCache
+            self.cache = ResponseCache(db_path=None)
+        self.scheduler = (RequestScheduler(max_active=args.max_active, max_queue=args.max_queue,
+                                           max_per_session=2, max_wait=args.timeout)
+                          if args.scheduler else None)
+        self.coach = None
+        if args.target == "coach":
+            from src.photo_analyzer import PhotographyCoach
+            self.coach = PhotographyCoach(client, aspect_timeout=args.timeout)
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def describe(self, rng: random.Random, session: int, request: int) -> str:
+        """A popular description (cacheable, coalescible) or a unique one"""
+        base = DESCRIPTIONS[rng.randrange(len(DESCRIPTIONS))]
+        if rng.random() < self.args.repeat_ratio:
+            return base
+        return f"{base} Frame {session}-{request}."
+
+    def call(self, description: str):
+        """Return an iterator of text pieces for one request"""
+        if self.args.target == "stream":
+            return stream_photography_feedback(description, client=self.client, cache=self.cache)
+        if self.args.target == "feedback":
+            return iter([generate_photography_feedback(description, client=self.client, cache=self.cache)])
+        result = self.coach.get_coaching_feedback(description)
+        failed = [aspect for aspect, r in result.items() if r.get("status") != "ok"]
+        return iter([f"Error: {', '.join(failed)}" if failed else json.dumps(result)])
+
+    def run_request(self, session_id: str, description: str) -> dict:
+        from src.response_cache import normalize_description
+
+        started = time.perf_counter()
+        first = None
+        pieces = 0
+        text = ""
+        error = None
+        try:
+            if self.scheduler is None:
+                stream = self.call(description)
+            else:
+                key = f"{self.args.target}:{PROMPT_VERSION}:{normalize_description(description)}"
+                ticket = self.scheduler.submit(session_id, lambda: self.call(description), key=key)
+                stream = ticket.stream()
+            with closing(stream) if hasattr(stream, "close") else nullcontext():
+                for piece in stream:
+                    if first is None:
+                        first = time.perf_counter()
+                    pieces += 1
+                    text += piece
+            if text.startswith("Error:"):
+                error = text.splitlines()[0]
+        except SchedulerError as e:
+            error = f"rejected: {e}"
+        except Exception as e:
+            error = str(e)
+        done = time.perf_counter()
+        return {"latency": done - started, "ttft": (first or done) - started,
+                "pieces": pieces, "chars": len(text), "error": error}
+
+    def session(self, index: int, barrier: threading.Barrier):
+        rng = random.Random(self.args.seed + index)
+        session_id = f"session-{index}"
+        barrier.wait()
+        for request in range(self.args.requests):
+            sample = self.run_request(session_id, self.describe(rng, index, request))
+            with self._lock:
+                self.samples.append(sample)
+            if self.args.think_ms:
+                time.sleep(rng.expovariate(1000 / self.args.think_ms))
+
+    def run(self) -> dict:
+        barrier = threading.Barrier(self.args.sessions + 1)
+        threads = [threading.Thread(target=self.session, args=(i, barrier), daemon=True)
+                   for i in range(self.args.sessions)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        ok = [s for s in self.samples if s["error"] is None]
+        report = {
+            "requests": len(self.samples),
+            "ok": len(ok),
+            "rejected": sum(1 for s in self.samples if (s["error"] or "").startswith("rejected")),
+            "errors": sum(1 for s in self.samples if s["error"] and not s["error"].startswith("rejected")),
+            "wall_s": round(wall, 2),
+            "throughput_rps": round(len(ok) / wall, 3) if wall else 0.0,
+            "chars_per_s": round(sum(s["chars"] for s in ok) / wall, 1) if wall else 0.0,
+            "latency_ms": percentiles([s["latency"] for s in ok]),
+            "ttft_ms": percentiles([s["ttft"] for s in ok]),
+        }
+        if self.scheduler is not None:
+            report["scheduler"] = self.scheduler.get_stats()
+            self.scheduler.shutdown()
+        if self.cache is not None:
+            report["cache"] = self.cache.get_stats()
+        if self.coach is not None:
+            self.coach.close()
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=TARGETS, default="stream")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent simulated users")
+    parser.add_argument("--requests", type=int, default=5, help="Requests per session")
+    parser.add_argument("--think-ms", type=float, default=500, help="Mean pause between a session's requests")
+    parser.add_argument("--repeat-ratio", type=float, default=0.3,
+                        help="Share of requests reusing a popular description")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", default="", help="Name for this configuration in the JSON output")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    app = parser.add_argument_group("app configuration")
+    app.add_argument("--scheduler", action=argparse.BooleanOptionalAction, default=True,
+                     help="Route requests through the request scheduler, as the app does")
+    app.add_argument("--max-active", type=int, default=1)
+    app.add_argument("--max-queue", type=int, default=32)
+    app.add_argument("--cache", action="store_true", help="Use an in-memory response cache")
+    app.add_argument("--retrieval-mode", choices=("hybrid", "vector", "keyword"), default=None)
+    app.add_argument("--client-concurrency", type=int, default=4)
+    app.add_argument("--timeout", type=float, default=120.0)
+    server = parser.add_argument_group("model server")
+    server.add_argument("--base-url", help="Use running Ollama servers (comma-separated) instead of stubs")
+    server.add_argument("--servers", type=int, default=1, help="Stub servers to route across")
+    server.add_argument("--tokens-per-second", type=float, default=40.0)
+    server.add_argument("--reply-tokens", type=int, default=120)
+    server.add_argument("--latency", type=float, default=0.2, help="Stub seconds before the first token")
+    server.add_argument("--jitter", type=float, default=0.1, help="Stub extra latency, up to this many seconds")
+    server.add_argument("--parallel", type=int, default=1, help="Stub requests generated at once")
+    args = parser.parse_args()
+
+    os.environ.setdefault("EMBEDDING_MODEL", "hashing")
+    os.environ["RESPONSE_CACHE"] = "0"  # only the explicit --cache instance is used
+    if args.retrieval_mode:
+        os.environ["RETRIEVAL_MODE"] = args.retrieval_mode
+
+    from src.rag_pipeline import PhotographyKnowledgeBase
+
+    PhotographyKnowledgeBase.get_vector_store()  # index load is not part of the measurement
+    stubs = []
+    if args.base_url is None:
+        stubs = [
+            StubOllamaServer(reply=make_reply(args.reply_tokens), latency=args.latency, jitter=args.jitter,
+                             seed=args.seed + i, parallel=args.parallel,
+                             token_delay=1 / args.tokens_per_second if args.tokens_per_second else 0.0).start()
+            for i in range(args.servers)
+        ]
+    llm_config = LLMConfig(base_url=args.base_url or ",".join(stub.base_url for stub in stubs),
+                           timeout=args.timeout, max_concurrency=args.client_concurrency)
+    client = LLMRouter(llm_config) if len(llm_config.base_urls) > 1 else OllamaClient(llm_config)
+    try:
+        report = LoadTest(args, client).run()
+    finally:
+        client.close()
+        report_stubs = [dict(stub.stats) for stub in stubs]
+        for stub in stubs:
+            stub.stop()
+
+    config = {key: value for key, value in vars(args).items() if key not in ("json", "label")}
+    results = {"label": args.label or args.target, "config": config, **report}
+    if len(report_stubs) == 1:
+        results["server"] = report_stubs[0]
+    elif report_stubs:
+        results["servers"] = report_stubs
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{results['label']}: {args.sessions} sessions x {args.requests} requests, "
+          f"scheduler {'on' if args.scheduler else 'off'}, cache {'on' if args.cache else 'off'}")
+    print(f"  ok {report['ok']}/{report['requests']}  rejected {report['rejected']}  errors {report['errors']}  "
+          f"wall {report['wall_s']}s  throughput {report['throughput_rps']} req/s")
+    for name in ("ttft_ms", "latency_ms"):
+        p = report[name]
+        print(f"  {name:<11} p50 {p['p50']}  p90 {p['p90']}  p99 {p['p99']}  max {p['max']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Portfolio Benchmark
+Progress-view query time as history grows, aggregates versus scanning raw scores
+
+Fills a temporary history with users spread over two years of analyses, then
+times the "last 6 months" progress view read from the monthly aggregates
+against the same numbers computed from the raw scores, plus the time a
+request spends in record().
+
+Usage:
+    python benchmarks/bench_portfolio.py --rows 10000 100000 300000
+    python benchmarks/bench_portfolio.py --json
+"""
+
+import argparse
+import calendar
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.portfolio import OVERALL, PortfolioStore, recent_months  # noqa: E402
+
+ASPECTS = ("composition", "lighting", "storytelling", "technical")
+DAY = 24 * 3600
+
+
+def fill(store: PortfolioStore, rows: int, users: int, now: float, seed: int):
+    """Append `rows` analyses for `users` users over the two years before now"""
+    rng = random.Random(seed)
+    for i in range(rows):
+        ratings = {aspect: rng.randint(3, 9) for aspect in ASPECTS}
+        ratings[OVERALL] = round(sum(ratings.values()) / len(ratings))
+        store.record(f"user-{i % users}", f"Photo {i}", ratings, created_at=now - rng.random() * 730 * DAY)
+        if store._queue.full():
+            store.flush()
+    store.flush()
+
+
+def raw_progress(store: PortfolioStore, user_id: str, months: int, now: float):
+    """The progress numbers computed from the raw scores instead of the aggregates"""
+    return store._query(
+        "SELECT aspect, strftime('%Y-%m', created_at, 'unixepoch') AS month, COUNT(*), SUM(rating) "
+        "FROM scores WHERE user_id = ? AND created_at >= ? GROUP BY 1, 2",
+        (user_id, calendar.timegm(time.strptime(recent_months(months, now)[0], "%Y-%m"))),
+    )
+
+
+def timed_ms(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return round(float(np.median(samples)) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--users", type=int, default=1, help="Users sharing the history")
+    parser.add_argument("--months", type=int, default=6)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    now = time.time()
+    results = []
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = PortfolioStore(Path(tmp) / "portfolio.sqlite3", max_pending=4096, batch_size=512)
+            start = time.perf_counter()
+            fill(store, rows, args.users, now, args.seed)
+            fill_s = time.perf_counter() - start
+
+            record_ms = timed_ms(lambda: store.record("user-0", "Timed", {OVERALL: 7}), args.repeats)
+            store.flush()
+            results.append({
+                "rows": rows,
+                "fill_rows_per_s": round(rows / fill_s),
+                "record_ms": record_ms,
+                "progress_ms": timed_ms(lambda: store.progress("user-0", months=args.months, now=now),
+                                        args.repeats),
+                "raw_scan_ms": timed_ms(lambda: raw_progress(store, "user-0", args.months, now), args.repeats),
+                "history_page_ms": timed_ms(lambda: store.history("user-0", limit=20), args.repeats),
+            })
+            store.close()
+
+    if args.json:
+        print(json.dumps({"users": args.users, "months": args.months, "results": results}, indent=2))
+        return
+    print(f"Last-{args.months}-months progress view for one of {args.users} users (median of {args.repeats})")
+    print(f"{'rows':>9}{'fill rows/s':>13}{'record ms':>11}{'progress ms':>13}{'raw scan ms':>13}{'history ms':>12}")
+    for row in results:
+        print(f"{row['rows']:>9}{row['fill_rows_per_s']:>13}{row['record_ms']:>11.3f}{row['progress_ms']:>13.3f}"
+              f"{row['raw_scan_ms']:>13.3f}{row['history_page_ms']:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
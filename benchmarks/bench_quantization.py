@@ -0,0 +1,111 @@
+"""
+Quantization Benchmark
+Index memory per million chunks and recall loss for float32, float16, int8 and PQ storage
+
+Usage:
+    python benchmarks/bench_quantization.py --chunks 100000 --k 5
+    python benchmarks/bench_quantization.py --json
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bench_retrieval import synthetic_queries, synthetic_vectors  # noqa: E402
+from src.vector_index import NumpyIndex, QuantizedIndex  # noqa: E402
+from src.vector_store import ChunkTable  # noqa: E402
+
+MB_PER_MILLION = 1_000_000 / 2 ** 20  # bytes per chunk -> MiB per million chunks
+
+
+def synthetic_chunks(n: int):
+    return [{
+        "id": f"textbooks/book_{i // 500}.md#{i % 500}",
+        "section": ("composition", "lighting", "storytelling", "technical")[i % 4],
+        "title": f"Chapter {i // 40} heading",
+        "text": f"Passage {i}: " + "light falls across the frame and shapes the subject " * 10,
+        "source": f"textbooks/book_{i // 500}.md",
+    } for i in range(n)]
+
+
+def metadata_report(n: int) -> dict:
+    """Bytes per chunk of per-chunk dicts versus ChunkTable columns"""
+    tracemalloc.start()
+    chunks = synthetic_chunks(n)
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    table = ChunkTable.from_dicts(chunks)
+    text_bytes = int(table.offsets[-1, -1] - table.offsets[-1, 0])
+    return {
+        "dicts_mb_per_million": round(dict_bytes / n * MB_PER_MILLION, 1),
+        "columns_mb_per_million": round(table.nbytes / n * MB_PER_MILLION, 1),
+        "columns_resident_mb_per_million": round((table.nbytes - text_bytes) / n * MB_PER_MILLION, 1),
+    }
+
+
+def evaluate(index, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        _, ids = index.search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(np.intersect1d(ids[0], expected))
+    return {"p50_ms": round(float(np.percentile(latencies, 50)), 3), "recall_at_k": round(hits / truth.size, 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--rerank", type=int, default=64, help="Exact re-rank candidates (0 compares raw codes)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.chunks, args.dim)
+    queries = synthetic_queries(vectors, args.queries)
+    exact = NumpyIndex(vectors)
+    _, truth = exact.search(queries, args.k)
+
+    rows = [{"mode": "float32", "build_s": 0.0, "mb_per_million": round(exact.nbytes / len(exact) * MB_PER_MILLION, 1),
+             **evaluate(exact, queries, truth, args.k)}]
+    for mode in ("float16", "int8", "pq"):
+        for rerank in sorted({0, args.rerank}):
+            start = time.perf_counter()
+            index = QuantizedIndex(vectors, mode, rerank=rerank)
+            build_s = time.perf_counter() - start
+            rows.append({
+                "mode": index.name,
+                "build_s": round(build_s, 2),
+                "mb_per_million": round(index.nbytes / len(index) * MB_PER_MILLION, 1),
+                **evaluate(index, queries, truth, args.k),
+            })
+    for row in rows:
+        row["recall_loss"] = round(1.0 - row["recall_at_k"], 4)
+    results = {"chunks": args.chunks, "dim": args.dim, "k": args.k, "indexes": rows,
+               "metadata": metadata_report(min(args.chunks, 20_000))}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.chunks} chunks x {args.dim} dims, recall@{args.k} against exact float32 search")
+    print(f"{'mode':<16}{'MiB/M chunks':>13}{'build s':>9}{'p50 ms':>9}{'recall':>8}{'loss':>8}")
+    for row in rows:
+        print(f"{row['mode']:<16}{row['mb_per_million']:>13.1f}{row['build_s']:>9.2f}{row['p50_ms']:>9.3f}"
+              f"{row['recall_at_k']:>8.3f}{row['recall_loss']:>8.3f}")
+    meta = results["metadata"]
+    print(f"\nChunk metadata, MiB per million chunks: dicts {meta['dicts_mb_per_million']:.0f}, "
+          f"columns {meta['columns_mb_per_million']:.0f} "
+          f"({meta['columns_resident_mb_per_million']:.0f} resident with the text blob memory-mapped)")
+
+
+if __name__ == "__main__":
+    main()
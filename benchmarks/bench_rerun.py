@@ -0,0 +1,99 @@
+"""
+Rerun Benchmark
+Server CPU per interaction: full script runs versus the Analyze panel fragment
+
+Drives the app headlessly with Streamlit's AppTest, editing the description
+and toggling the per-aspect checkbox, and reports process CPU per script
+run. AppTest always reruns the whole script, so what an interaction inside
+the Analyze panel costs in a browser session (a fragment rerun) is read from
+the app's own photo_coach_cpu_seconds{span="rerun"} histogram. To compare
+against an earlier revision, export its app.py next to the current one.
+
+Usage:
+    python benchmarks/bench_rerun.py --runs 50
+    git show <rev>:app.py > app_before.py && python benchmarks/bench_rerun.py --app app_before.py --json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.telemetry import registry  # noqa: E402
+
+DESCRIPTIONS = [
+    "Mountain landscape at sunset with golden hour light on the peaks and a stream as a leading line.",
+    "Portrait with soft window light from the left, blurred background, shot at f/2.8.",
+]
+
+
+def summarize(seconds) -> dict:
+    ms = np.asarray(seconds) * 1000
+    return {"p50": round(float(np.percentile(ms, 50)), 2), "p90": round(float(np.percentile(ms, 90)), 2),
+            "mean": round(float(ms.mean()), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", type=Path, default=ROOT / "app.py")
+    parser.add_argument("--runs", type=int, default=30, help="Interactions to time after the first run")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    # No model calls, background warm-up or persistent stores: only the script itself is measured
+    os.environ.update({"WARM_START": "0", "RESPONSE_CACHE": "0", "PORTFOLIO": "0", "DEDUP": "0",
+                       "METRICS_PORT": "", "EMBEDDING_MODEL": os.getenv("EMBEDDING_MODEL", "hashing")})
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(str(args.app.resolve()), default_timeout=args.timeout)
+    start = time.process_time()
+    app.run()
+    first_run = time.process_time() - start
+    if app.exception:
+        raise SystemExit(f"{args.app} failed: {app.exception[0].message}")
+    registry.reset()
+
+    samples = []
+    for i in range(args.runs):
+        if i % 2:
+            app.checkbox[0].set_value(not app.checkbox[0].value)
+        else:
+            app.text_area[0].input(f"{DESCRIPTIONS[i // 2 % len(DESCRIPTIONS)]} Take {i}.")
+        start = time.process_time()
+        app.run()
+        samples.append(time.process_time() - start)
+
+    series = registry.histogram("cpu_seconds").to_dict()
+    fragments = {
+        key: {"runs": value["count"], "mean_ms": round(value["sum"] / value["count"] * 1000, 2)}
+        for key, value in series.items() if 'span="rerun"' in key
+    }
+    results = {
+        "app": str(args.app),
+        "first_run_ms": round(first_run * 1000, 1),
+        "script_run_ms": summarize(samples),
+        "instrumented": fragments,
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    run = results["script_run_ms"]
+    print(f"{args.app.name}: first run {results['first_run_ms']} ms CPU, then per interaction "
+          f"p50 {run['p50']} ms  p90 {run['p90']} ms  mean {run['mean']} ms ({args.runs} runs)")
+    for key, value in sorted(fragments.items()):
+        print(f"  {key:<40} {value['mean_ms']:>8.2f} ms mean over {value['runs']} runs")
+    if not fragments:
+        print("  (this app.py records no per-fragment CPU)")
+
+
+if __name__ == "__main__":
+    main()
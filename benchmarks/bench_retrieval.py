@@ -0,0 +1,90 @@
+"""
+Retrieval Benchmark
+p50/p99 query latency and recall@k for exact vs approximate vector search
+
+Usage:
+    python benchmarks/bench_retrieval.py --sizes 1000 10000 100000 --k 5
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.vector_index import NumpyIndex, build_index  # noqa: E402
+
+
+def synthetic_vectors(n: int, dim: int, latent_dim: int = 32, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors on a low-rank subspace, like real text embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 50), latent_dim)).astype(np.float32)
+    latent = centers[rng.integers(0, len(centers), n)]
+    latent += 0.5 * rng.standard_normal((n, latent_dim)).astype(np.float32)
+    projection = np.random.default_rng(seed + 1).standard_normal((latent_dim, dim)).astype(np.float32)
+    vectors = latent @ projection
+    vectors += 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def synthetic_queries(vectors: np.ndarray, count: int, seed: int = 2) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.integers(0, len(vectors), count)].copy()
+    queries += 0.02 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries
+
+
+def run_backend(index, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        _, ids = index.search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(np.intersect1d(ids[0], expected))
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "recall_at_k": hits / truth.size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--backends", nargs="+", default=["exact", "hnsw", "ivf"])
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for n in args.sizes:
+        vectors = synthetic_vectors(n, args.dim)
+        queries = synthetic_queries(vectors, args.queries)
+        _, truth = NumpyIndex(vectors).search(queries, args.k)
+        for backend in args.backends:
+            start = time.perf_counter()
+            index = build_index(vectors, backend)
+            build_s = time.perf_counter() - start
+            row = {"chunks": n, "backend": index.name, "build_s": build_s}
+            row.update(run_backend(index, queries, truth, args.k))
+            results.append(row)
+            if not args.json:
+                print(f"{n:>8} {row['backend']:<12} build {build_s:7.2f}s  "
+                      f"p50 {row['p50_ms']:7.3f}ms  p99 {row['p99_ms']:7.3f}ms  "
+                      f"recall@{args.k} {row['recall_at_k']:.3f}")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
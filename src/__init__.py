@@ -5,10 +5,28 @@ AI Photography Coach - Python Package
 __version__ = "0.1.0"
 __author__ = "Prasad Tilloo"
 
-from src.rag_pipeline import PhotographyKnowledgeBase
-from src.photo_analyzer import PhotoAnalyzer
-
 __all__ = [
     "PhotographyKnowledgeBase",
     "PhotoAnalyzer"
 ]
+
+# Resolved on first access so `import src.<module>` doesn't pull in the
+# whole analysis stack (and its numpy/faiss/OpenCV imports)
+_LAZY_EXPORTS = {
+    "PhotographyKnowledgeBase": "src.rag_pipeline",
+    "PhotoAnalyzer": "src.photo_analyzer",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        import importlib
+
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module 'src' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,264 @@
+"""
+Batch Runner
+Coach large JSONL/CSV exports of photo descriptions with resumable progress
+
+Usage:
+    python -m src.batch_runner photos.jsonl results.jsonl --workers 4
+    python -m src.batch_runner catalog.csv results.jsonl --image-field path
+"""
+
+import argparse
+import csv
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set
+
+
+def iter_records(path: Path, id_field: str = "id", description_field: str = "description",
+                 image_field: Optional[str] = None) -> Iterator[Dict]:
+    """Stream records from a .jsonl or .csv file one at a time
+
+    Records without an id get their 1-based line/row number as id. Image
+    paths are resolved relative to the input file.
+    """
+    path = Path(path)
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.suffix.lower() == ".csv":
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for number, row in enumerate(rows, start=1):
+            image = row.get(image_field) if image_field else None
+            yield {
+                "id": str(row.get(id_field) or number),
+                "description": row.get(description_field) or "",
+                "image": str(path.parent / image) if image else None,
+                "record": row,
+            }
+
+
+def failed_aspects(result) -> List[str]:
+    """Aspects of a coaching result that came back as an error or a timeout"""
+    if not isinstance(result, dict):
+        return []
+    return [aspect for aspect, value in result.items()
+            if isinstance(value, dict) and value.get("status") in ("error", "timeout")]
+
+
+def load_completed_ids(output_path: Path) -> Set[str]:
+    """Ids already written to the output file (the run's checkpoint)
+
+    Lines with incomplete aspects don't count, so a resumed run analyzes
+    those records again.
+    """
+    completed = set()
+    output_path = Path(output_path)
+    if not output_path.exists():
+        return completed
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                line = json.loads(line)
+                if not line.get("incomplete"):
+                    completed.add(line["id"])
+            except (ValueError, KeyError):
+                continue  # torn final line from an interrupted run
+    return completed
+
+
+class BatchRunner:
+    """Run an analysis function over a record stream with a bounded worker pool
+
+    At most max_pending records are read ahead of the workers, so memory stays
+    flat regardless of input size. Every finished record is appended to the
+    output file and flushed, which doubles as the resume checkpoint; records
+    that still fail after retries go to a separate .errors.jsonl file and are
+    retried on the next run. A result whose every aspect failed (the model
+    unreachable, say) counts as a failure; one where only some did is
+    written with its "incomplete" aspects and analyzed again on the next
+    run, the later line superseding it.
+
+    Records with an image are passed to analyze as image=. With a dedup
+    index, images are filed in input order and a near-duplicate of a photo
+    analyzed earlier in the run reuses that result instead of calling
+    analyze, with duplicate_of and the facts that differ in its output
+    line. The most recent max_shared representatives' results are kept.
+    """
+
+    def __init__(self, analyze: Callable[..., Dict], workers: int = 4,
+                 max_pending: Optional[int] = None, retries: int = 2,
+                 retry_backoff: float = 1.0, dedup=None, max_shared: int = 1024, image_cache=None):
+        self.analyze = analyze
+        self.workers = workers
+        self.max_pending = max_pending or workers * 2
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.dedup = dedup
+        self.max_shared = max_shared
+        self.image_cache = image_cache
+        self.stats = {"processed": 0, "succeeded": 0, "failed": 0, "partial": 0,
+                      "skipped": 0, "retries": 0, "deduplicated": 0}
+        self._lock = threading.Lock()
+        self._shared: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _analyze_with_retries(self, description: str, image: Optional[Dict] = None) -> Dict:
+        attempt = 0
+        while True:
+            try:
+                result = self.analyze(description) if image is None else self.analyze(description, image=image)
+                failed = failed_aspects(result)
+                if failed and len(failed) == sum(isinstance(value, dict) for value in result.values()):
+                    raise RuntimeError(f"every aspect failed: {result[failed[0]].get('error', 'timeout')}")
+                return result
+            except Exception:
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                with self._lock:
+                    self.stats["retries"] += 1
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+    def _file_image(self, item: Dict):
+        """Ingest a record's image and, with dedup on, file it as a representative or a duplicate
+
+        Runs on the reading thread, so a representative is always submitted
+        (and, the pool being FIFO, started) before its duplicates.
+        """
+        from src.image_pipeline import ingest_image
+
+        try:
+            item["image_info"] = ingest_image(item["image"], self.image_cache)
+        except (OSError, ValueError) as e:
+            item["error"] = f"could not read image {item['image']}: {e}"
+            return
+        if self.dedup is None:
+            return
+        representative, distance = self.dedup.add(item["id"], item["image_info"]["perceptual"])
+        with self._lock:
+            if representative == item["id"]:
+                item["shared"] = Future()
+                self._shared[item["id"]] = (item["shared"], item["image_info"])
+                if len(self._shared) > self.max_shared:
+                    self._shared.popitem(last=False)
+            elif representative in self._shared:
+                future, representative_info = self._shared[representative]
+                item["duplicate_of"] = (representative, distance, future, representative_info)
+
+    def _reuse(self, item: Dict) -> Optional[Dict]:
+        """The representative's result and how this photo differs, or None if it failed"""
+        from src.image_dedup import fact_differences
+
+        representative, distance, future, representative_info = item["duplicate_of"]
+        try:
+            result = future.result()
+        except Exception:
+            return None
+        with self._lock:
+            self.stats["deduplicated"] += 1
+        return {"feedback": result, "duplicate_of": representative, "distance": distance,
+                "differences": fact_differences(item["image_info"], representative_info)}
+
+    def _process(self, item: Dict, output, errors):
+        shared = item.get("shared")
+        try:
+            if "error" in item:
+                raise ValueError(item["error"])
+            reused = self._reuse(item) if "duplicate_of" in item else None
+            result = reused.pop("feedback") if reused else self._analyze_with_retries(
+                item["description"], item.get("image_info"))
+        except Exception as e:
+            if shared is not None:
+                shared.set_exception(e)
+            line = {"id": item["id"], "error": str(e)}
+            with self._lock:
+                self.stats["processed"] += 1
+                self.stats["failed"] += 1
+                errors.write(json.dumps(line) + "\n")
+                errors.flush()
+            return
+        if shared is not None:
+            shared.set_result(result)
+
+        incomplete = failed_aspects(result)
+        line = {"id": item["id"], "description": item["description"], "feedback": result, **(reused or {})}
+        if incomplete:
+            line["incomplete"] = incomplete
+        with self._lock:
+            self.stats["processed"] += 1
+            self.stats["succeeded"] += 1
+            self.stats["partial"] += int(bool(incomplete))
+            output.write(json.dumps(line) + "\n")
+            output.flush()
+
+    def run(self, input_path: Path, output_path: Path, id_field: str = "id",
+            description_field: str = "description", image_field: Optional[str] = None) -> Dict:
+        """Process every record not already in output_path and return run statistics"""
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        errors_path = output_path.with_suffix(".errors.jsonl")
+        completed = load_completed_ids(output_path)
+        slots = threading.BoundedSemaphore(self.max_pending)
+        started = time.perf_counter()
+
+        def release(_future):
+            slots.release()
+
+        with open(output_path, "a", encoding="utf-8") as output, \
+                open(errors_path, "a", encoding="utf-8") as errors, \
+                ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as pool:
+            for item in iter_records(input_path, id_field, description_field, image_field):
+                if item["id"] in completed:
+                    self.stats["skipped"] += 1
+                    continue
+                completed.add(item["id"])  # a repeated id later in the file is skipped too
+                if item["image"]:
+                    self._file_image(item)
+                slots.acquire()  # backpressure: block reading until a worker frees a slot
+                pool.submit(self._process, item, output, errors).add_done_callback(release)
+
+        elapsed = time.perf_counter() - started
+        self.stats["elapsed_s"] = round(elapsed, 3)
+        self.stats["photos_per_minute"] = round(self.stats["processed"] / elapsed * 60, 2) if elapsed else 0.0
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch photography coaching over a JSONL/CSV file")
+    parser.add_argument("input", type=Path, help="Input .jsonl or .csv file")
+    parser.add_argument("output", type=Path, help="Output .jsonl file (appended; re-run to resume)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--description-field", default="description")
+    parser.add_argument("--image-field", help="Field holding each photo's image path")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Analyze every image, even near-duplicates of one already analyzed")
+    parser.add_argument("--batched", action="store_true", help="One combined prompt per photo")
+    args = parser.parse_args()
+
+    from src.llm_client import get_llm_client
+    from src.photo_analyzer import PhotographyCoach
+    from src.utils import load_env_variables
+
+    load_env_variables()
+    coach = PhotographyCoach(get_llm_client(), max_workers=args.workers * len(PhotographyCoach.ASPECTS),
+                             batched=args.batched)
+    dedup = None
+    if args.image_field and not args.no_dedup:
+        from src.image_dedup import DuplicateIndex
+        dedup = DuplicateIndex()
+    runner = BatchRunner(coach.get_coaching_feedback, workers=args.workers, retries=args.retries, dedup=dedup)
+    try:
+        stats = runner.run(args.input, args.output, args.id_field, args.description_field, args.image_field)
+    finally:
+        coach.close()
+
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
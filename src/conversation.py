@@ -0,0 +1,231 @@
+"""
+Follow-up Conversations
+Multi-turn coaching that continues from the model's context instead of resending history
+"""
+
+import os
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+from src.prompt_builder import FOLLOW_UP_SYSTEM, PromptBuilder, estimate_tokens
+from src.telemetry import record_llm_usage, record_span, registry
+
+if TYPE_CHECKING:
+    from src.llm_client import OllamaClient
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def gist(text: str, max_tokens: int) -> str:
+    """The leading sentences of text that fit in max_tokens"""
+    kept: List[str] = []
+    used = 0
+    for sentence in _SENTENCE_END.split(" ".join(text.split())):
+        tokens = estimate_tokens(sentence) + 1
+        if used + tokens > max_tokens:
+            break
+        kept.append(sentence)
+        used += tokens
+    if not kept and text.strip():  # a single overlong sentence: cut it
+        return " ".join(text.split())[:max_tokens * 3].rsplit(" ", 1)[0] + " …"
+    return " ".join(kept)
+
+
+class Conversation:
+    """One photo's follow-up thread: the model context to continue from and its turns
+
+    context holds Ollama's token ids for everything said so far, as 4-byte
+    ints; it is None once dropped, and the next turn starts over from the
+    summary.
+    """
+
+    def __init__(self, conversation_id: str, description: str):
+        self.conversation_id = conversation_id
+        self.description = description
+        self.context: Optional[array] = None
+        self.turns: List[Tuple[str, str]] = []  # (question, answer); the analysis has no question
+        self.last_used = time.monotonic()
+
+    @property
+    def context_tokens(self) -> int:
+        return len(self.context) if self.context is not None else 0
+
+    def summary(self, max_tokens: int) -> str:
+        """The photo, the analysis and the latest turns that fit in max_tokens
+
+        Photo and analysis get a third of the budget each; the remainder
+        goes to the most recent questions and answers, oldest dropped first.
+        """
+        share = max_tokens // 3
+        parts = [f"PHOTO: {gist(self.description, share)}"]
+        if self.turns:
+            parts.append(f"ANALYSIS: {gist(self.turns[0][1], share)}")
+        remaining = max_tokens - sum(estimate_tokens(part) for part in parts)
+        recent: List[str] = []
+        for question, answer in reversed(self.turns[1:]):
+            turn = f"Q: {question}\nA: {gist(answer, max(remaining // 2, 16))}"
+            remaining -= estimate_tokens(turn)
+            if remaining < 0:
+                break
+            recent.append(turn)
+        return "\n".join(parts + recent[::-1])
+
+
+class ConversationStore:
+    """Follow-up conversations across all sessions within a memory budget
+
+    A turn sends only the new question plus the context returned by the
+    previous one, so Ollama evaluates just the delta when the conversation's
+    tokens are still in its KV cache. Contexts are held up to
+    max_context_tokens in total; over that, least recently used
+    conversations lose theirs and continue from a summary of at most
+    summary_tokens, as does one whose context would no longer fit the
+    model's window. Conversations idle longer than idle_ttl are dropped.
+    """
+
+    def __init__(self, client: Optional["OllamaClient"] = None,
+                 builder: Optional[PromptBuilder] = None,
+                 max_context_tokens: int = 262_144, idle_ttl: float = 1800.0,
+                 summary_tokens: int = 400):
+        self._llm = client
+        self.builder = builder or PromptBuilder.from_env()
+        self.max_context_tokens = max_context_tokens
+        self.idle_ttl = idle_ttl
+        self.summary_tokens = summary_tokens
+        self._conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._context_tokens = 0
+        self._lock = threading.Lock()
+        self.stats = {"started": 0, "context_turns": 0, "summary_turns": 0, "evicted": 0, "expired": 0}
+
+    @classmethod
+    def from_env(cls, client: Optional["OllamaClient"] = None,
+                 builder: Optional[PromptBuilder] = None) -> "ConversationStore":
+        return cls(
+            client, builder,
+            max_context_tokens=int(os.getenv("FOLLOW_UP_CONTEXT_BUDGET", "262144")),
+            idle_ttl=float(os.getenv("FOLLOW_UP_IDLE_TTL", "1800")),
+            summary_tokens=int(os.getenv("FOLLOW_UP_SUMMARY_TOKENS", "400")),
+        )
+
+    @property
+    def client(self) -> "OllamaClient":
+        if self._llm is None:
+            from src.llm_client import get_llm_client
+
+            self._llm = get_llm_client()
+        return self._llm
+
+    def __contains__(self, conversation_id: str) -> bool:
+        with self._lock:
+            self._expire()
+            return conversation_id in self._conversations
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+    @property
+    def context_tokens(self) -> int:
+        return self._context_tokens
+
+    def _set_context(self, conversation: Conversation, context: Optional[array]):
+        # Caller holds the lock
+        self._context_tokens += (len(context) if context is not None else 0) - conversation.context_tokens
+        conversation.context = context
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._conversations:
+            conversation = next(iter(self._conversations.values()))
+            if conversation.last_used > cutoff:
+                break
+            self._set_context(conversation, None)
+            del self._conversations[conversation.conversation_id]
+            self.stats["expired"] += 1
+
+    def _evict(self):
+        for conversation in self._conversations.values():
+            if self._context_tokens <= self.max_context_tokens:
+                break
+            if conversation.context is not None:
+                self._set_context(conversation, None)
+                self.stats["evicted"] += 1
+
+    def _open(self, conversation_id: str, description: str) -> Conversation:
+        conversation = Conversation(conversation_id, description)
+        with self._lock:
+            self._expire()
+            previous = self._conversations.pop(conversation_id, None)
+            if previous is not None:
+                self._set_context(previous, None)
+            self._conversations[conversation_id] = conversation
+            self.stats["started"] += 1
+        return conversation
+
+    def seed(self, conversation_id: str, description: str, analysis: str):
+        """Open a conversation about an analysis produced elsewhere (e.g. served from cache)
+
+        There is no model context for it yet, so the first follow-up is
+        answered from the summary.
+        """
+        self._open(conversation_id, description).turns.append(("", analysis))
+
+    def start(self, conversation_id: str, description: str) -> Iterator[str]:
+        """Stream the first analysis of a photo, opening (or restarting) its conversation"""
+        from src.feedback import build_feedback_prompt
+
+        conversation = self._open(conversation_id, description)
+        prompt = build_feedback_prompt(description, self.builder)
+        return self._turn(conversation, "", "start", prompt=prompt.user, system=prompt.system)
+
+    def ask(self, conversation_id: str, question: str) -> Iterator[str]:
+        """Stream the answer to a follow-up question
+
+        Raises KeyError if the conversation was never opened or has expired.
+        """
+        with self._lock:
+            self._expire()
+            conversation = self._conversations[conversation_id]
+            self._conversations.move_to_end(conversation_id)
+            conversation.last_used = time.monotonic()
+            fits = (conversation.context is not None
+                    and conversation.context_tokens + estimate_tokens(question) <= self.builder.input_budget)
+            if conversation.context is not None and not fits:
+                self._set_context(conversation, None)
+            context = list(conversation.context) if fits else None
+        if fits:
+            return self._turn(conversation, question, "context", prompt=question, context=context)
+        prompt = f"SUMMARY:\n{conversation.summary(self.summary_tokens)}\n\nQUESTION: {question}"
+        return self._turn(conversation, question, "summary", prompt=prompt, system=FOLLOW_UP_SYSTEM)
+
+    def _turn(self, conversation: Conversation, question: str, mode: str, **request) -> Iterator[str]:
+        parts = []
+        final: Dict = {}
+        started = time.perf_counter()
+        for chunk in self.client.generate_stream(options=self.builder.options, **request):
+            token = chunk.get("response", "")
+            if token:
+                parts.append(token)
+                yield token
+            if chunk.get("done"):
+                final = chunk
+        record_llm_usage(final)
+        record_span("follow_up", time.perf_counter() - started, mode=mode)
+        registry.counter("follow_up_turns_total", "Conversation turns by how the model was primed").inc(mode=mode)
+        with self._lock:
+            conversation.turns.append((question, "".join(parts)))
+            conversation.last_used = time.monotonic()
+            if mode != "start":
+                self.stats[f"{mode}_turns"] += 1
+            # One restarted or expired meanwhile no longer counts against the budget
+            if self._conversations.get(conversation.conversation_id) is conversation:
+                self._conversations.move_to_end(conversation.conversation_id)
+                self._set_context(conversation, array("i", final["context"]) if final.get("context") else None)
+                self._evict()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "conversations": len(self._conversations), "context_tokens": self._context_tokens}
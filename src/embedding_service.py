@@ -0,0 +1,171 @@
+"""
+Embedding Service
+Micro-batches concurrent embedding requests and caches repeated strings
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class EmbeddingService:
+    """Drop-in embedder that coalesces concurrent calls into one model batch
+
+    A lone query waits at most max_wait_ms for company; everything queued
+    within that window (up to max_batch_size strings) is encoded in a single
+    call, which amortizes per-call overhead and uses the CPU's vector units
+    far better than one-at-a-time encoding. Calls that already hold a full
+    batch (e.g. ingestion) skip the window and are split into
+    max_batch_size slices. Vectors of recently seen strings are served from
+    an LRU cache.
+    """
+
+    def __init__(self, embedder, max_batch_size: int = 32, max_wait_ms: float = 5.0,
+                 cache_size: int = 4096):
+        self.embedder = embedder
+        self.name = embedder.name
+        self.dim = embedder.dim
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._pending: List = []  # (texts, future)
+        self._pending_cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self.stats = {"requests": 0, "texts": 0, "cache_hits": 0, "batches": 0, "batched_texts": 0}
+
+    def _cached(self, text: str) -> Optional[np.ndarray]:
+        with self._cache_lock:
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+            return vector
+
+    def _remember(self, texts: List[str], vectors: np.ndarray):
+        if not self.cache_size:
+            return
+        with self._cache_lock:
+            for text, vector in zip(texts, vectors):
+                self._cache[text] = vector
+                self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _count(self, **increments):
+        with self._cache_lock:
+            for name, value in increments.items():
+                self.stats[name] += value
+
+    def _encode(self, texts: List[str], remember: bool = True) -> np.ndarray:
+        """One model call, counted as a batch"""
+        vectors = np.ascontiguousarray(self.embedder.embed(texts), dtype=np.float32)
+        self._count(batches=1, batched_texts=len(texts))
+        if remember:
+            self._remember(texts, vectors)
+        return vectors
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into an (n, dim) float32 matrix"""
+        texts = list(texts)
+        result = np.empty((len(texts), self.dim), dtype=np.float32)
+        missing: Dict[str, List[int]] = {}
+        for row, text in enumerate(texts):
+            vector = self._cached(text)
+            if vector is not None:
+                result[row] = vector
+            else:
+                missing.setdefault(text, []).append(row)
+        hits = len(texts) - sum(len(rows) for rows in missing.values())
+        self._count(requests=1, texts=len(texts), cache_hits=hits)
+        if not missing:
+            return result
+
+        unique = list(missing)
+        if len(unique) >= self.max_batch_size:
+            # Bulk (ingestion) calls aren't cached: their texts are rarely queried
+            vectors = np.concatenate([self._encode(unique[i:i + self.max_batch_size], remember=False)
+                                      for i in range(0, len(unique), self.max_batch_size)])
+        else:
+            future: Future = Future()
+            with self._pending_cond:
+                self._pending.append((unique, future))
+                self._ensure_worker()
+                self._pending_cond.notify()
+            vectors = future.result()
+        for text, vector in zip(unique, vectors):
+            result[missing[text]] = vector
+        return result
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self._worker.start()
+
+    def _take_batch(self) -> List:
+        """Wait for work, then gather requests for up to max_wait (called with the lock held)"""
+        while not self._pending:
+            self._pending_cond.wait()
+        deadline = time.monotonic() + self.max_wait
+        while sum(len(texts) for texts, _ in self._pending) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._pending_cond.wait(remaining)
+
+        batch, size = [], 0
+        while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_batch_size):
+            texts, future = self._pending.pop(0)
+            batch.append((texts, future))
+            size += len(texts)
+        return batch
+
+    def _run(self):
+        while True:
+            with self._pending_cond:
+                batch = self._take_batch()
+            # Identical strings from different callers are encoded once
+            unique = list(dict.fromkeys(text for texts, _ in batch for text in texts))
+            try:
+                vectors = self._encode(unique)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            rows = {text: i for i, text in enumerate(unique)}
+            for texts, future in batch:
+                future.set_result(vectors[[rows[text] for text in texts]])
+
+    def get_stats(self) -> Dict:
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "mean_batch_size": round(self.stats["batched_texts"] / batches, 2) if batches else 0.0,
+            "cache_entries": len(self._cache),
+        }
+
+
+_service: Optional[EmbeddingService] = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    """Process-wide service around the default embedder (EMBEDDING_BATCH_* settings)"""
+    global _service
+    from src.embeddings import get_default_embedder
+
+    embedder = get_default_embedder()
+    with _service_lock:
+        if _service is None or _service.embedder is not embedder:
+            _service = EmbeddingService(
+                embedder,
+                max_batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "32")),
+                max_wait_ms=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5")),
+                cache_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "4096")),
+            )
+        return _service
@@ -0,0 +1,124 @@
+"""
+Embedding Backends
+Text -> vector encoders used by the knowledge index
+"""
+
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, List
+
+import numpy as np
+
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# Quantized export shipped with the sentence-transformers ONNX models (AVX2 CPUs)
+ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[./][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, keeping jargon such as f/2.8 or 1/250 intact"""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class HashingEmbedder:
+    """Dependency-free embedder using signed feature hashing of words and bigrams
+
+    Used when sentence-transformers is not installed. Vectors are L2-normalized
+    so dot products are cosine similarities, same as the model-backed embedder.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        tokens = tokenize(text)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into an (n, dim) float32 matrix"""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                vectors[row, value % self.dim] += 1.0 if (value >> 63) else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class SentenceTransformerEmbedder:
+    """sentence-transformers model wrapper producing normalized float32 vectors
+
+    backend "onnx" runs the model's ONNX export on ONNX Runtime and
+    "onnx-int8" its pre-quantized int8 export, both usually faster than
+    PyTorch on CPU (needs sentence-transformers>=3.2 and onnxruntime).
+    """
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, batch_size: int = 64,
+                 backend: str = "torch"):
+        from sentence_transformers import SentenceTransformer
+
+        if backend == "torch":
+            self.model = SentenceTransformer(model_name)
+        elif backend in ("onnx", "onnx-int8"):
+            model_kwargs = {"file_name": os.getenv("EMBEDDING_ONNX_FILE", ONNX_INT8_FILE)} \
+                if backend == "onnx-int8" else {}
+            self.model = SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs)
+        else:
+            raise ValueError(f"Unknown embedding backend: {backend}")
+        self.batch_size = batch_size
+        self.dim = self.model.get_sentence_embedding_dimension()
+        # Backends give slightly different vectors, so they index separately
+        self.name = f"st-{model_name}" if backend == "torch" else f"st-{model_name}-{backend}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into an (n, dim) float32 matrix"""
+        vectors = self.model.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+
+_default_embedders: Dict[str, object] = {}
+_default_embedders_lock = threading.Lock()
+
+
+def get_default_embedder():
+    """Return the configured embedder, falling back to feature hashing
+
+    One instance is kept per model and backend so the model is loaded once
+    per process however many components ask for it.
+    """
+    model_name = os.getenv("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+    backend = os.getenv("EMBEDDING_BACKEND", "torch")
+    with _default_embedders_lock:
+        key = f"{model_name}:{backend}"
+        if key not in _default_embedders:
+            _default_embedders[key] = _load_embedder(model_name, backend)
+        return _default_embedders[key]
+
+
+def _load_embedder(model_name: str, backend: str = "torch"):
+    if model_name == "hashing":
+        return HashingEmbedder()
+    try:
+        return SentenceTransformerEmbedder(model_name, backend=backend)
+    except (ImportError, TypeError) as e:
+        # TypeError: sentence-transformers older than 3.2 has no backend argument
+        if backend != "torch":
+            print(f"⚠️ {backend} embedding backend unavailable ({e}). Using PyTorch.")
+            return _load_embedder(model_name)
+        if isinstance(e, TypeError):
+            raise
+        print("⚠️ sentence-transformers not installed. Using hashing embeddings.")
+        return HashingEmbedder()
@@ -0,0 +1,230 @@
+"""
+Fast Tier
+Instant per-aspect feedback from keyword rules over the knowledge base, before the LLM
+"""
+
+import os
+import re
+import textwrap
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from src.telemetry import record_span, registry
+
+# "no leading lines", "without a reflector": the cue is present but negated
+_NEGATION = re.compile(r"\b(?:no|not|without|lacks?|lacking|never)\b(?:\W+\w+){0,2}\W*$", re.IGNORECASE)
+
+
+class Rule:
+    """A description cue mapped to a knowledge-base subsection
+
+    A matching cue adds that subsection's bullets at `points` to the
+    aspect's strengths (or improvements) and `suggestion` to its
+    suggestions.
+    """
+
+    def __init__(self, aspect: str, title: str, pattern: str, points: Sequence[int],
+                 suggestion: str, improvement: bool = False):
+        self.aspect = aspect
+        self.title = title
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self.points = tuple(points)
+        self.suggestion = suggestion
+        self.improvement = improvement
+
+    def cues(self, text: str) -> List[str]:
+        """The distinct phrases in text that trigger this rule, skipping negated ones"""
+        found = []
+        for match in self.pattern.finditer(text):
+            cue = match.group().lower()
+            if cue not in found and not _NEGATION.search(text[max(0, match.start() - 30):match.start()]):
+                found.append(cue)
+        return found
+
+
+RULES = [
+    # Lighting
+    Rule("lighting", "Golden Hour (Best Light)", r"golden hour|golden light|sunset|sunrise|warm evening light",
+         (1, 2), "Expose for the bright sky so the warm tones don't wash out"),
+    Rule("lighting", "Blue Hour", r"blue hour|twilight|dusk|after sunset",
+         (1, 3), "Use a tripod and a longer exposure to keep the blue tones clean"),
+    Rule("lighting", "Harsh vs Soft Light", r"harsh|midday|noon|direct sun|strong shadows",
+         (0,), "Shoot in the golden hour or open shade, or soften the light with a diffuser or reflector",
+         improvement=True),
+    Rule("lighting", "Harsh vs Soft Light", r"soft (?:window )?light|overcast|window light|open shade|diffused",
+         (1,), "Keep the light source close and to one side to hold the gentle shadows"),
+    Rule("lighting", "Side Lighting", r"side ?light|light from the (?:left|right)|from the side",
+         (1, 2), "Turn the subject slightly toward the light to control how deep the shadows fall"),
+    Rule("lighting", "Backlighting", r"backlit|backlight|back light|silhouette|rim light|against the sun",
+         (1, 2), "Expose for the highlights, or add fill if the subject's face matters"),
+    Rule("lighting", "Front Lighting", r"flat light|front light|on-camera flash|direct flash",
+         (1, 2), "Move the light off-axis, or wait for side light to bring out texture", improvement=True),
+    Rule("lighting", "Fill Light", r"reflector|fill light|fill flash",
+         (0, 1), "Keep the fill subtle so the main light still sets the mood"),
+    # Composition
+    Rule("composition", "Rule of Thirds", r"rule of thirds|(?:left|right|upper|lower|top|bottom) third|off-cent(?:er|re)",
+         (1, 2), "Check the horizon also sits on a third rather than through the middle"),
+    Rule("composition", "Rule of Thirds", r"\bcent(?:er|re)d\b|in the (?:middle|cent(?:er|re)) of the frame",
+         (3,), "Try placing the subject on a third to add tension and visual interest", improvement=True),
+    Rule("composition", "Leading Lines", r"leading lines?|winding (?:road|path|stream|river)|\b(?:road|river|stream|"
+         r"path|fence|railway|railroad|pier|bridge)s?\b",
+         (1, 2), "Make sure the line leads toward the subject rather than out of the frame"),
+    Rule("composition", "Foreground, Midground, Background", r"foreground",
+         (0, 4), "Give the foreground a clear point of interest so it leads into the scene"),
+    Rule("composition", "Framing", r"framed by|frame within|through (?:a|the) (?:window|doorway|arch)|archway",
+         (1, 3), "Keep the frame darker or softer than the subject so it doesn't compete"),
+    Rule("composition", "Symmetry vs Asymmetry", r"symmetr|reflection|mirror(?:ed)?\b",
+         (0,), "Center the line of symmetry exactly, or break it deliberately"),
+    Rule("composition", "Negative Space", r"negative space|minimalis|empty sky|lone\b|solitary",
+         (1, 3), "Leave the empty space in the direction the subject faces or moves"),
+    Rule("composition", "Negative Space", r"clutter|busy background|distracting",
+         (1,), "Simplify the frame: step closer, change angle or use a wider aperture", improvement=True),
+    # Storytelling
+    Rule("storytelling", "Emotional Impact", r"emotion|mood|moody|atmospher|expression|smil|laugh|tears",
+         (1, 3), "Decide which single feeling the image should carry and cut what works against it"),
+    Rule("storytelling", "Authenticity", r"candid|natural expression|genuine|spontaneous|unposed",
+         (2, 3), "Keep shooting between poses; the in-between moments are often the strongest"),
+    Rule("storytelling", "Authenticity", r"\bposed\b|stiff|forced smile|awkward",
+         (1,), "Give the subject something to do, or talk to them, to loosen the pose", improvement=True),
+    Rule("storytelling", "Subject & Context", r"\b(?:hiker|person|woman|man|child|couple|portrait|subject|figure)s?\b",
+         (3,), "Show just enough surroundings to explain where the subject is"),
+    Rule("storytelling", "Narrative", r"in motion|moment|walking|running|action|crossing|story",
+         (3,), "Time the shot for the peak of the action so the story reads at a glance"),
+    # Technical
+    Rule("technical", "Focus & Sharpness", r"shallow depth of field|bokeh|blurred background|f/(?:1\.\d|2(?:\.\d)?)\b",
+         (0, 2), "Focus on the nearest eye; at wide apertures the focal plane is thin"),
+    Rule("technical", "Focus & Sharpness", r"out of focus|blurry|soft focus|camera shake|motion blur",
+         (0, 1), "Use a faster shutter speed or a tripod, and check focus at 100%", improvement=True),
+    Rule("technical", "Exposure", r"overexposed|blown|clipped|too bright",
+         (1,), "Lower the exposure or bracket, and check the histogram for clipping", improvement=True),
+    Rule("technical", "Exposure", r"underexposed|too dark|crushed",
+         (2,), "Raise the exposure, or lift the shadows gently in editing", improvement=True),
+    Rule("technical", "Noise & Grain", r"noise|noisy|grain|high iso|iso [3-9]\d{3}",
+         (0, 2), "Expose to the right at high ISO and apply noise reduction sparingly"),
+    Rule("technical", "Composition & Framing", r"tilted|crooked|horizon (?:is )?not level",
+         (1,), "Level the horizon in camera with the grid, or straighten it when editing", improvement=True),
+    Rule("technical", "Color & Saturation", r"oversaturated|over-saturated|garish",
+         (0,), "Pull saturation back and adjust vibrance instead", improvement=True),
+    Rule("technical", "Color Balance", r"white balance|colou?r cast|tungsten|mixed light",
+         (0, 1), "Set white balance from a neutral grey in the scene, or keep the cast deliberately"),
+]
+
+
+def parse_subsections(text: str) -> Dict[str, List[str]]:
+    """{subsection title: bullets} of one PhotographyKnowledgeBase string"""
+    subsections: Dict[str, List[str]] = {}
+    bullets: Optional[List[str]] = None
+    for line in textwrap.dedent(text).strip().splitlines()[1:]:  # first line is the section header
+        line = line.strip()
+        if line.startswith("- ") and bullets is not None:
+            bullets.append(line[2:])
+        elif line.endswith(":"):
+            bullets = subsections.setdefault(line[:-1], [])
+    return subsections
+
+
+def confidence(subsections: int, conflicts: int = 0) -> float:
+    """How sure a fast answer is, from the distinct subsections it cites (0 for none)
+
+    Each subsection halves the remaining doubt; each one cited as both a
+    strength and an improvement (e.g. soft and harsh light) halves the
+    result, since the description is ambiguous there.
+    """
+    return round((1 - 0.5 ** subsections) * 0.5 ** conflicts, 3)
+
+
+class FastTier:
+    """Structured per-aspect feedback from the knowledge base, without a model call
+
+    Each aspect's confidence grows with the number of distinct
+    subsections the description's cues point to (see confidence()), so
+    several phrases for the same rule count once; aspects at or above min_confidence are absorbed, the rest are left
+    for the model. The advice quoted is the knowledge base's own
+    bullets, so the answers change with it.
+    """
+
+    def __init__(self, knowledge, rules: Optional[Iterable[Rule]] = None, min_confidence: float = 0.75):
+        self.rules = list(RULES if rules is None else rules)
+        self.min_confidence = min_confidence
+        self._bullets = {section: parse_subsections(knowledge.get_section_knowledge(section))
+                         for section in knowledge.SECTIONS}
+        for rule in self.rules:
+            bullets = self._bullets[rule.aspect].get(rule.title)
+            if bullets is None or max(rule.points) >= len(bullets):
+                raise ValueError(f"Rule cites a missing knowledge bullet: {rule.aspect}/{rule.title}")
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "absorbed": 0, "skipped": 0, "aspects": 0, "aspects_absorbed": 0}
+
+    @classmethod
+    def from_env(cls, knowledge) -> "FastTier":
+        return cls(knowledge, min_confidence=float(os.getenv("FAST_TIER_MIN_CONFIDENCE", "0.75")))
+
+    def _point(self, rule: Rule) -> str:
+        bullets = self._bullets[rule.aspect][rule.title]
+        return f"{rule.title}: " + "; ".join(bullets[i] for i in rule.points)
+
+    def analyze_aspect(self, aspect: str, text: str) -> Dict:
+        """The fast answer for one aspect, with its confidence and whether it is good enough"""
+        cues = {}
+        for rule in self.rules:
+            if rule.aspect == aspect:
+                cues.update({cue: rule for cue in rule.cues(text)})
+        matched = list(dict.fromkeys(cues.values()))
+        strengths = [self._point(rule) for rule in matched if not rule.improvement]
+        improvements = [self._point(rule) for rule in matched if rule.improvement]
+        # Improvements first: they are what the photographer can act on
+        suggestions = [rule.suggestion for rule in sorted(matched, key=lambda rule: not rule.improvement)]
+        conflicts = ({rule.title for rule in matched if rule.improvement}
+                     & {rule.title for rule in matched if not rule.improvement})
+        sources = list(dict.fromkeys(rule.title for rule in matched))
+        score = confidence(len(sources), len(conflicts))
+        return {
+            "status": "ok",
+            "strengths": strengths,
+            "improvements": improvements,
+            "suggestions": suggestions,
+            "rating": min(10, max(1, 6 + len(strengths) - 2 * len(improvements))),
+            "sources": sources,
+            "tier": "fast",
+            "confidence": score,
+            "absorbed": score >= self.min_confidence,
+        }
+
+    def analyze(self, text: str, aspects: Sequence[str]) -> Dict[str, Dict]:
+        """Fast answers for every aspect; those with "absorbed" False need the model"""
+        started = time.perf_counter()
+        results = {aspect: self.analyze_aspect(aspect, text) for aspect in aspects}
+        absorbed = sum(result["absorbed"] for result in results.values())
+        outcome = "absorbed" if absorbed == len(results) else "partial" if absorbed else "escalated"
+        record_span("fast_tier", time.perf_counter() - started)
+        registry.counter("fast_tier_requests_total", "Analyses by how much the fast tier answered").inc(
+            outcome=outcome)
+        aspect_counter = registry.counter("fast_tier_aspects_total", "Aspects answered by the fast tier or the model")
+        for result in results.values():
+            aspect_counter.inc(outcome="absorbed" if result["absorbed"] else "escalated")
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["absorbed"] += outcome == "absorbed"
+            self.stats["aspects"] += len(results)
+            self.stats["aspects_absorbed"] += absorbed
+        return results
+
+    def skip(self, aspects: int):
+        """Count an analysis sent straight to the model (the user asked for depth)"""
+        registry.counter("fast_tier_requests_total", "Analyses by how much the fast tier answered").inc(
+            outcome="skipped")
+        registry.counter("fast_tier_aspects_total", "Aspects answered by the fast tier or the model").inc(
+            aspects, outcome="skipped")
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["skipped"] += 1
+            self.stats["aspects"] += aspects
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["absorbed_fraction"] = stats["absorbed"] / stats["requests"] if stats["requests"] else 0.0
+        stats["aspect_absorbed_fraction"] = (stats["aspects_absorbed"] / stats["aspects"]
+                                             if stats["aspects"] else 0.0)
+        return stats
@@ -0,0 +1,149 @@
+"""
+Feedback Generation
+Prompt construction and model calls behind the Analyze tab
+"""
+
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Iterator, Optional
+
+from src.prompt_builder import FEEDBACK_SYSTEM, Prompt, PromptBuilder
+from src.telemetry import record_llm_usage, record_span, registry, span
+from src.utils import get_project_root
+
+# The HTTP client and the cache (numpy) load on first use, not at app start
+if TYPE_CHECKING:
+    from src.llm_client import OllamaClient
+    from src.response_cache import ResponseCache
+
+
+# Bump whenever build_feedback_prompt changes so cached responses are not reused
+PROMPT_VERSION = "2"
+# Knowledge sections the single-turn feedback prompt draws on
+FEEDBACK_ASPECTS = ("composition", "lighting")
+
+_response_cache: Optional["ResponseCache"] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional["ResponseCache"]:
+    """Process-wide response cache configured from RESPONSE_CACHE_* settings"""
+    global _response_cache
+    if os.getenv("RESPONSE_CACHE", "1") == "0":
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            from src.response_cache import ResponseCache
+
+            db_path = os.getenv("RESPONSE_CACHE_DB", str(get_project_root() / "data" / "cache" / "responses.sqlite3"))
+            _response_cache = ResponseCache(
+                max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "512")),
+                ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600))),
+                similarity_threshold=float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95")),
+                db_path=db_path or None,
+            )
+        return _response_cache
+
+
+def build_feedback_prompt(photo_description: str,
+                          builder: Optional[PromptBuilder] = None) -> Prompt:
+    """Build the single-turn coaching prompt for a photo description
+
+    The best-matching composition and lighting principles are added up to
+    the model's context budget, after a system prefix shared by every call.
+    """
+    from src.rag_pipeline import PhotographyKnowledgeBase
+
+    builder = builder or PromptBuilder.from_env()
+    candidates = {
+        aspect: PhotographyKnowledgeBase.search(photo_description, k=4, section=aspect)
+        for aspect in FEEDBACK_ASPECTS
+    }
+    return builder.build(FEEDBACK_SYSTEM, photo_description, candidates)
+
+
+def generate_photography_feedback(photo_description: str,
+                                  client: Optional["OllamaClient"] = None,
+                                  cache: Optional["ResponseCache"] = None) -> str:
+    """Generate photography feedback using Ollama."""
+    from src.llm_client import get_llm_client
+
+    client = client or get_llm_client()
+    cache = cache or get_response_cache()
+    model = client.config.model
+
+    if cache is not None:
+        cached = cache.get(photo_description, model, PROMPT_VERSION)
+        if cached is not None:
+            return cached
+
+    with span("prompt_build"):
+        prompt = build_feedback_prompt(photo_description)
+
+    try:
+        with span("llm_generation"):
+            response = client.chat(prompt.messages, options=prompt.options)
+        record_llm_usage(response)
+        feedback = response['message']['content']
+    except Exception as e:
+        return f"Error: {str(e)}\n\nMake sure Ollama is running."
+
+    if cache is not None:
+        cache.put(photo_description, model, PROMPT_VERSION, feedback)
+    return feedback
+
+
+def stream_photography_feedback(photo_description: str,
+                                client: Optional["OllamaClient"] = None,
+                                cache: Optional["ResponseCache"] = None) -> Iterator[str]:
+    """Yield feedback text incrementally as the model generates it
+
+    Closing the generator early stops generation on the Ollama server.
+    Only complete responses are cached. Time to first token and generation
+    time exclude the time the consumer spends between tokens.
+    """
+    from src.llm_client import get_llm_client
+
+    client = client or get_llm_client()
+    cache = cache or get_response_cache()
+    model = client.config.model
+
+    if cache is not None:
+        cached = cache.get(photo_description, model, PROMPT_VERSION)
+        if cached is not None:
+            registry.counter("feedback_cache_hits_total", "Feedback served from the response cache").inc()
+            yield cached
+            return
+
+    with span("prompt_build"):
+        prompt = build_feedback_prompt(photo_description)
+
+    parts = []
+    started = time.perf_counter()
+    waiting = 0.0  # model time: spent inside next(), not in the consumer
+    stream = client.chat_stream(prompt.messages, options=prompt.options)
+    try:
+        while True:
+            tick = time.perf_counter()
+            chunk = next(stream, None)
+            waiting += time.perf_counter() - tick
+            if chunk is None:
+                break
+            if chunk.get('done'):
+                record_llm_usage(chunk)
+            token = chunk.get('message', {}).get('content', '')
+            if token:
+                if not parts:
+                    record_span("llm_ttft", time.perf_counter() - started)
+                parts.append(token)
+                yield token
+    except Exception as e:
+        yield f"Error: {str(e)}\n\nMake sure Ollama is running."
+        return
+    finally:
+        stream.close()
+        record_span("llm_generation", waiting)
+
+    if cache is not None:
+        cache.put(photo_description, model, PROMPT_VERSION, "".join(parts))
@@ -0,0 +1,242 @@
+"""
+Near-Duplicate Detection
+Perceptual hashes and a multi-index Hamming search for clustering burst frames and edited variants
+"""
+
+import json
+import os
+import threading
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.utils import get_project_root
+
+
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE * HASH_SIZE
+CHUNK_BITS = 16
+PHASH_SAMPLE = 32
+# Hamming distances (of 64 bits) at or below which two photos count as the
+# same frame; both hashes must agree. Unrelated photos average ~32.
+PHASH_DISTANCE = 10
+DHASH_DISTANCE = 14
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    matrix = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT = _dct_matrix(PHASH_SAMPLE)
+
+
+def dhash(image) -> int:
+    """64-bit difference hash: whether each pixel is brighter than its left neighbour"""
+    from PIL import Image
+
+    gray = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.int16)
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(image) -> int:
+    """64-bit perceptual hash: signs of the lowest 8x8 DCT frequencies against their median"""
+    from PIL import Image
+
+    gray = image.convert("L").resize((PHASH_SAMPLE, PHASH_SAMPLE), Image.Resampling.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE]
+    return _bits_to_int(low > np.median(low))
+
+
+def perceptual_hashes(image) -> Dict[str, str]:
+    """pHash and dHash of a decoded image, as 16-digit hex strings"""
+    return {"phash": f"{phash(image):016x}", "dhash": f"{dhash(image):016x}"}
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+@lru_cache(maxsize=8)
+def _flip_masks(max_bits: int) -> Tuple[int, ...]:
+    """Every CHUNK_BITS-bit mask with at most max_bits bits set"""
+    return tuple(sum(1 << bit for bit in bits)
+                 for n in range(max_bits + 1) for bits in combinations(range(CHUNK_BITS), n))
+
+
+class MultiIndexHash:
+    """Hamming-radius search over 64-bit hashes, indexed by 16-bit chunk
+
+    Each hash is filed under its four 16-bit chunks. If two hashes are
+    within r bits of each other, one of their chunks differs in at most
+    r // 4 bits (pigeonhole), so a query only probes the buckets within
+    that many bits of each of its chunks and checks the full distance on
+    what it finds there. With r = 10 that is ~550 dictionary lookups
+    however many hashes are indexed, where a BK-tree at that radius ends
+    up visiting most of its nodes.
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[int, object]] = []
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in range(HASH_BITS // CHUNK_BITS)]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _chunks(key: int) -> Iterator[int]:
+        mask = (1 << CHUNK_BITS) - 1
+        return ((key >> (CHUNK_BITS * i)) & mask for i in range(HASH_BITS // CHUNK_BITS))
+
+    def add(self, key: int, value):
+        position = len(self._entries)
+        self._entries.append((key, value))
+        for table, chunk in zip(self._tables, self._chunks(key)):
+            table.setdefault(chunk, []).append(position)
+
+    def search(self, key: int, radius: int) -> List[Tuple[int, object]]:
+        """(distance, value) of every entry within radius of key, nearest first"""
+        masks = _flip_masks(radius // len(self._tables))
+        seen = set()
+        found = []
+        for table, chunk in zip(self._tables, self._chunks(key)):
+            for mask in masks:
+                for position in table.get(chunk ^ mask, ()):
+                    if position in seen:
+                        continue
+                    seen.add(position)
+                    other, value = self._entries[position]
+                    distance = hamming(key, other)
+                    if distance <= radius:
+                        found.append((distance, value))
+        found.sort(key=lambda match: match[0])
+        return found
+
+
+class DuplicateIndex:
+    """Clusters of near-identical photos, each led by the first one seen
+
+    add() files a photo under the nearest existing representative whose
+    pHash and dHash are both within the distance limits, or makes it a new
+    representative. Only representatives are indexed for search, so a long
+    burst that drifts gradually starts a new cluster rather than chaining
+    unrelated frames together. With a path set, assignments are appended
+    to a JSONL file and reloaded on start.
+    """
+
+    def __init__(self, path: Optional[Path] = None, phash_distance: int = PHASH_DISTANCE,
+                 dhash_distance: int = DHASH_DISTANCE):
+        self.path = Path(path) if path is not None else None
+        self.phash_distance = phash_distance
+        self.dhash_distance = dhash_distance
+        self._search = MultiIndexHash()
+        self._hashes: Dict[str, Tuple[int, int]] = {}
+        self._representative: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if self.path is not None and self.path.exists():
+            self._load()
+
+    @classmethod
+    def from_env(cls) -> "DuplicateIndex":
+        path = os.getenv("DEDUP_INDEX", str(get_project_root() / "data" / "image_cache" / "duplicates.jsonl"))
+        return cls(
+            path=path or None,
+            phash_distance=int(os.getenv("DEDUP_PHASH_DISTANCE", str(PHASH_DISTANCE))),
+            dhash_distance=int(os.getenv("DEDUP_DHASH_DISTANCE", str(DHASH_DISTANCE))),
+        )
+
+    def __len__(self) -> int:
+        return len(self._representative)
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self._insert(entry["id"], int(entry["phash"], 16), int(entry["dhash"], 16),
+                                 entry["representative"])
+                except (ValueError, KeyError):
+                    continue  # torn final line from an interrupted write
+
+    def _insert(self, item_id: str, p: int, d: int, representative: str):
+        self._hashes[item_id] = (p, d)
+        self._representative[item_id] = representative
+        if representative == item_id:
+            self._search.add(p, item_id)
+
+    def find(self, hashes: Dict[str, str]) -> Optional[Tuple[str, int]]:
+        """Nearest representative within the limits and its pHash distance, or None"""
+        p, d = int(hashes["phash"], 16), int(hashes["dhash"], 16)
+        with self._lock:
+            for distance, candidate in self._search.search(p, self.phash_distance):
+                if hamming(d, self._hashes[candidate][1]) <= self.dhash_distance:
+                    return candidate, distance
+        return None
+
+    def add(self, item_id: str, hashes: Dict[str, str]) -> Tuple[str, int]:
+        """File a photo and return (its representative, pHash distance to it)
+
+        A photo already in the index keeps its original assignment.
+        """
+        with self._lock:
+            if item_id in self._representative:
+                representative = self._representative[item_id]
+                return representative, hamming(self._hashes[item_id][0], self._hashes[representative][0])
+        match = self.find(hashes)
+        representative, distance = match if match is not None else (item_id, 0)
+        with self._lock:
+            if item_id in self._representative:  # filed concurrently
+                return self._representative[item_id], distance
+            self._insert(item_id, int(hashes["phash"], 16), int(hashes["dhash"], 16), representative)
+            if self.path is not None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"id": item_id, "representative": representative, **hashes}) + "\n")
+        return representative, distance
+
+    def representative(self, item_id: str) -> Optional[str]:
+        return self._representative.get(item_id)
+
+    def clusters(self) -> Iterator[List[str]]:
+        """Groups of two or more photos, representative first"""
+        members: Dict[str, List[str]] = {}
+        with self._lock:
+            for item_id, representative in self._representative.items():
+                members.setdefault(representative, [representative])
+                if item_id != representative:
+                    members[representative].append(item_id)
+        return (group for group in members.values() if len(group) > 1)
+
+
+def fact_differences(image_info: Dict, representative_info: Dict) -> List[str]:
+    """Image facts of a near-duplicate that its representative's analysis didn't see"""
+    from src.image_pipeline import image_facts
+
+    seen = set(image_facts(representative_info))
+    return [fact for fact in image_facts(image_info) if fact not in seen]
+
+
+_duplicate_index: Optional[DuplicateIndex] = None
+_duplicate_index_lock = threading.Lock()
+
+
+def get_duplicate_index() -> Optional[DuplicateIndex]:
+    """Process-wide index of uploaded photos configured from DEDUP_* settings (None if disabled)"""
+    global _duplicate_index
+    if os.getenv("DEDUP", "1") == "0":
+        return None
+    with _duplicate_index_lock:
+        if _duplicate_index is None:
+            _duplicate_index = DuplicateIndex.from_env()
+        return _duplicate_index
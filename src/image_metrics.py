@@ -0,0 +1,250 @@
+"""
+Image Metrics Engine
+Deterministic exposure, sharpness, horizon and rule-of-thirds measurements
+"""
+
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:  # NumPy fallbacks below produce the same metrics, just slower
+    cv2 = None
+
+
+# Metrics are computed on a working copy this size on its longest edge
+METRICS_MAX_SIZE = 512
+
+HIGHLIGHT_LEVEL = 250
+SHADOW_LEVEL = 5
+# Peak colour contrast (0-441) below which a frame has no distinct subject
+MIN_SALIENCY = 8.0
+
+
+def downscale(rgb: np.ndarray, max_size: int = METRICS_MAX_SIZE) -> np.ndarray:
+    """Area-downscale an (H, W, 3) uint8 array so its longest edge is <= max_size"""
+    height, width = rgb.shape[:2]
+    factor = max(height, width) / max_size
+    if factor <= 1:
+        return rgb
+    if cv2 is None:
+        step = math.ceil(factor)
+        h, w = height // step * step, width // step * step
+        sums = np.add.reduceat(rgb[:h, :w], np.arange(0, h, step), axis=0, dtype=np.uint32)
+        sums = np.add.reduceat(sums, np.arange(0, w, step), axis=1)
+        return (sums // (step * step)).astype(np.uint8)
+
+    # Integer-factor area reduction takes OpenCV's fast path (one pass over
+    # the full-size pixels); only the small remainder uses fractional scaling.
+    step = int(factor)
+    if step >= 2:
+        h, w = height // step * step, width // step * step
+        rgb = cv2.resize(rgb[:h, :w], (w // step, h // step), interpolation=cv2.INTER_AREA)
+        height, width = rgb.shape[:2]
+        factor = max(height, width) / max_size
+        if factor <= 1:
+            return rgb
+    size = (max(1, round(width / factor)), max(1, round(height / factor)))
+    return cv2.resize(rgb, size, interpolation=cv2.INTER_AREA)
+
+
+def luminance(rgb: np.ndarray) -> np.ndarray:
+    """Rec. 601 luma as float32 in [0, 255]"""
+    weights = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    return rgb.astype(np.float32) @ weights
+
+
+def exposure_metrics(luma: np.ndarray) -> Dict:
+    """Histogram statistics: clipped highlights/shadows, mean and tonal range"""
+    histogram = np.bincount(luma.astype(np.uint8).ravel(), minlength=256)
+    total = histogram.sum()
+    cdf = np.cumsum(histogram) / total
+    return {
+        "mean_luminance": round(float(luma.mean()), 2),
+        "clipped_highlights": round(float(histogram[HIGHLIGHT_LEVEL:].sum() / total), 4),
+        "crushed_shadows": round(float(histogram[:SHADOW_LEVEL + 1].sum() / total), 4),
+        "p1": int(np.searchsorted(cdf, 0.01)),
+        "p99": int(np.searchsorted(cdf, 0.99)),
+    }
+
+
+def _gradients(luma: np.ndarray):
+    if cv2 is not None:
+        return cv2.Sobel(luma, cv2.CV_32F, 1, 0, ksize=3), cv2.Sobel(luma, cv2.CV_32F, 0, 1, ksize=3)
+    padded = np.pad(luma, 1, mode="edge")
+    gx = (padded[1:-1, 2:] - padded[1:-1, :-2]) * 2 + (padded[:-2, 2:] - padded[:-2, :-2]) \
+        + (padded[2:, 2:] - padded[2:, :-2])
+    gy = (padded[2:, 1:-1] - padded[:-2, 1:-1]) * 2 + (padded[2:, :-2] - padded[:-2, :-2]) \
+        + (padded[2:, 2:] - padded[:-2, 2:])
+    return gx, gy
+
+
+def sharpness(luma: np.ndarray) -> float:
+    """Variance of the Laplacian; low values indicate blur or missed focus"""
+    if cv2 is not None:
+        return float(cv2.Laplacian(luma, cv2.CV_32F).var())
+    laplacian = (luma[:-2, 1:-1] + luma[2:, 1:-1] + luma[1:-1, :-2] + luma[1:-1, 2:]
+                 - 4 * luma[1:-1, 1:-1])
+    return float(laplacian.var())
+
+
+def horizon_tilt(gx: np.ndarray, gy: np.ndarray, max_tilt: float = 20.0) -> Optional[float]:
+    """Angle in degrees of the dominant near-horizontal line (positive = counter-clockwise)
+
+    Edges are weighted by gradient magnitude and averaged on the doubled
+    angle so opposite gradient directions reinforce rather than cancel.
+    Returns None when there is no strong near-horizontal structure.
+    """
+    magnitude = np.hypot(gx, gy).ravel()
+    cutoff = np.partition(magnitude, int(magnitude.size * 0.9))[int(magnitude.size * 0.9)]
+    strong = np.flatnonzero(magnitude > cutoff)
+    # Angles only for the strongest 10% of edges. A horizontal line has a
+    # vertical gradient, so line angle = gradient angle - 90°.
+    line_angle = np.arctan2(-gy.ravel()[strong], gx.ravel()[strong])
+    line_angle = line_angle % np.pi - np.pi / 2
+    near_horizontal = np.abs(line_angle) < np.radians(max_tilt)
+    if near_horizontal.sum() < 0.002 * magnitude.size:
+        return None
+    weights = magnitude[strong][near_horizontal]
+    doubled = 2 * line_angle[near_horizontal]
+    angle = 0.5 * math.atan2(float((weights * np.sin(doubled)).sum()),
+                             float((weights * np.cos(doubled)).sum()))
+    return round(math.degrees(angle), 2) + 0.0
+
+
+def _blur(image: np.ndarray, sigma: float) -> np.ndarray:
+    if cv2 is not None:
+        return cv2.GaussianBlur(image, (0, 0), sigma)
+    radius = max(1, int(3 * sigma))
+    kernel = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2).astype(np.float32)
+    kernel /= kernel.sum()
+    for axis in (0, 1):
+        padded = np.pad(image, [(radius, radius) if a == axis else (0, 0) for a in range(image.ndim)], mode="edge")
+        image = sum(w * np.take(padded, range(i, i + image.shape[axis]), axis=axis) for i, w in enumerate(kernel))
+    return image
+
+
+def saliency_map(rgb: np.ndarray, size: int = 128) -> np.ndarray:
+    """Centre-surround colour contrast (difference of Gaussians) on a small copy
+
+    Compact regions that differ from their surroundings light up; large
+    uniform areas such as sky only register along their edges.
+    """
+    image = downscale(rgb, size).astype(np.float32)
+    diff = _blur(image, 1.5) - _blur(image, size / 8)
+    return np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+
+
+ANCHORS = {
+    "thirds": [(1 / 3, 1 / 3), (2 / 3, 1 / 3), (1 / 3, 2 / 3), (2 / 3, 2 / 3)],
+    "centre": [(1 / 2, 1 / 2)],
+}
+
+
+def thirds_metrics(saliency: np.ndarray, radius: float = 1 / 12) -> Dict:
+    """Share of saliency mass near thirds intersections vs the frame centre
+
+    radius is a fraction of the frame diagonal. thirds_ratio compares the
+    mass near the four intersections to what a uniform image would have
+    there, so values above 1 mean salient content sits on the thirds.
+    placement names the anchor nearest the saliency peak, if it is within
+    radius of one, or "none" for a frame without any distinct subject.
+    """
+    height, width = saliency.shape
+    total = float(saliency.sum()) or 1.0
+    ys, xs = np.ogrid[:height, :width]
+    diagonal = math.hypot(width, height)
+    r = radius * diagonal
+
+    masks = {}
+    for name, points in ANCHORS.items():
+        mask = np.zeros_like(saliency, dtype=bool)
+        for fx, fy in points:
+            mask |= (xs - fx * width) ** 2 + (ys - fy * height) ** 2 <= r * r
+        masks[name] = mask
+
+    peak_y, peak_x = np.unravel_index(int(np.argmax(saliency)), saliency.shape)
+    peak = (float(peak_x + 0.5) / width, float(peak_y + 0.5) / height)
+    distance, placement = min(
+        (math.hypot((peak[0] - fx) * width, (peak[1] - fy) * height), name)
+        for name, points in ANCHORS.items() for fx, fy in points
+    )
+
+    thirds_mass = float(saliency[masks["thirds"]].sum()) / total
+    centre_mass = float(saliency[masks["centre"]].sum()) / total
+    return {
+        "thirds_mass": round(thirds_mass, 4),
+        "thirds_ratio": round(float(thirds_mass / masks["thirds"].mean()), 3),
+        "centre_mass": round(centre_mass, 4),
+        "centre_ratio": round(float(centre_mass / masks["centre"].mean()), 3),
+        "peak": [round(peak[0], 3), round(peak[1], 3)],
+        "placement": ("none" if float(saliency.max()) < MIN_SALIENCY
+                      else placement if distance <= 1.5 * r else "off-anchor"),
+    }
+
+
+def compute_metrics(rgb: np.ndarray) -> Dict:
+    """All metrics for an (H, W, 3) uint8 RGB array of any size"""
+    small = downscale(np.ascontiguousarray(rgb[..., :3]))
+    luma = luminance(small)
+    gx, gy = _gradients(luma)
+    metrics = {"exposure": exposure_metrics(luma)}
+    metrics["sharpness"] = round(sharpness(luma), 2)
+    metrics["horizon_tilt_deg"] = horizon_tilt(gx, gy)
+    metrics["thirds"] = thirds_metrics(saliency_map(small))
+    return metrics
+
+
+def metrics_facts(metrics: Optional[Dict], aspect: Optional[str] = None) -> List[str]:
+    """Render metrics as prompt facts, optionally only those relevant to one aspect"""
+    if not metrics:
+        return []
+    facts = {"technical": [], "composition": [], "lighting": []}
+
+    exposure = metrics["exposure"]
+    highlights = exposure["clipped_highlights"] * 100
+    shadows = exposure["crushed_shadows"] * 100
+    facts["technical"].append(
+        f"Exposure: mean luminance {exposure['mean_luminance']:.0f}/255, "
+        f"{highlights:.1f}% clipped highlights, {shadows:.1f}% crushed shadows"
+        + (" (blown highlights)" if highlights > 2 else "")
+        + (" (crushed shadows)" if shadows > 5 else "")
+    )
+    facts["lighting"].append(facts["technical"][-1])  # clipping is a lighting call too
+    sharp = metrics["sharpness"]
+    label = "soft/blurry" if sharp < 50 else "moderately sharp" if sharp < 200 else "sharp"
+    facts["technical"].append(f"Sharpness (Laplacian variance): {sharp:.0f} ({label})")
+
+    tilt = metrics.get("horizon_tilt_deg")
+    if tilt is not None:
+        level = "level" if abs(tilt) < 1 else f"tilted {abs(tilt):.1f}°"
+        facts["technical"].append(f"Horizon: {level}")
+        facts["composition"].append(f"Horizon: {level}")
+
+    thirds = metrics["thirds"]
+    if thirds["placement"] == "none":
+        return _select(facts, aspect)
+    placement = {
+        "thirds": "main subject sits on a rule-of-thirds intersection",
+        "centre": "main subject is centred",
+        "off-anchor": "main subject is away from both the thirds and the centre",
+    }[thirds["placement"]]
+    px, py = thirds["peak"]
+    facts["composition"].append(
+        f"Placement: {placement} (most salient point {px:.0%} across, {py:.0%} down; "
+        f"saliency near thirds {thirds['thirds_ratio']:.1f}x uniform)"
+    )
+
+    return _select(facts, aspect)
+
+
+def _select(facts: Dict[str, List[str]], aspect: Optional[str]) -> List[str]:
+    if aspect is not None:
+        return facts.get(aspect, [])
+    merged: List[str] = []
+    for fact in facts["technical"] + facts["composition"] + facts["lighting"]:
+        if fact not in merged:
+            merged.append(fact)
+    return merged
@@ -0,0 +1,247 @@
+"""
+Image Ingestion Pipeline
+Lazy decoding, bounded downscaling, EXIF extraction and a content-hash cache
+"""
+
+import hashlib
+import io
+import json
+import os
+from fractions import Fraction
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Union
+
+from src.utils import get_project_root
+
+
+# Longest edge of the working copy used for analysis
+ANALYSIS_MAX_SIZE = 1024
+THUMBNAIL_SIZE = 384
+# Bump when ingest_image adds or changes features so cached entries are rebuilt
+FEATURES_VERSION = 4
+
+_EXIF_IFD = 0x8769
+_EXIF_TAGS = {
+    "aperture": 0x829D,          # FNumber
+    "shutter_seconds": 0x829A,   # ExposureTime
+    "iso": 0x8827,               # ISOSpeedRatings / PhotographicSensitivity
+    "focal_length_mm": 0x920A,   # FocalLength
+    "focal_length_35mm": 0xA405,  # FocalLengthIn35mmFilm
+    "lens": 0xA434,              # LensModel
+    "taken_at": 0x9003,          # DateTimeOriginal
+}
+_IFD0_TAGS = {"make": 0x010F, "camera": 0x0110}
+_ORIENTATION = 0x0112
+
+ImageSource = Union[bytes, BinaryIO, str, Path]
+
+
+def _read_bytes(source: ImageSource) -> bytes:
+    if isinstance(source, bytes):
+        return source
+    if isinstance(source, (str, Path)):
+        return Path(source).read_bytes()
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    source.seek(0)
+    return source.read()
+
+
+def content_hash(source: ImageSource) -> str:
+    """SHA-256 of the encoded file, streamed in 1 MB blocks for file objects"""
+    digest = hashlib.sha256()
+    if isinstance(source, bytes):
+        digest.update(source)
+    elif isinstance(source, (str, Path)):
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    else:
+        source.seek(0)
+        for block in iter(lambda: source.read(1 << 20), b""):
+            digest.update(block)
+        source.seek(0)
+    return digest.hexdigest()
+
+
+def open_image(source: ImageSource, max_size: int = ANALYSIS_MAX_SIZE):
+    """Decode an image at most max_size pixels on its longest edge
+
+    For JPEGs, draft mode lets libjpeg decode directly at 1/2, 1/4 or 1/8
+    scale, so a 50 MP file never materializes at full resolution. Returns
+    (RGB image, EXIF, original (width, height)), both upright per the EXIF
+    orientation.
+    """
+    from PIL import Image
+
+    if isinstance(source, (str, Path)):
+        image = Image.open(source)
+    else:
+        image = Image.open(io.BytesIO(_read_bytes(source)))
+    original_size = image.size
+    exif = image.getexif()
+    if image.format == "JPEG":
+        image.draft("RGB", (max_size, max_size))
+    image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    image = image.convert("RGB")
+
+    transpose = {
+        2: Image.Transpose.FLIP_LEFT_RIGHT,
+        3: Image.Transpose.ROTATE_180,
+        4: Image.Transpose.FLIP_TOP_BOTTOM,
+        5: Image.Transpose.TRANSPOSE,
+        6: Image.Transpose.ROTATE_270,
+        7: Image.Transpose.TRANSVERSE,
+        8: Image.Transpose.ROTATE_90,
+    }.get(exif.get(_ORIENTATION))
+    if transpose is not None:
+        image = image.transpose(transpose)
+    if exif.get(_ORIENTATION) in (5, 6, 7, 8):  # stored sideways: report the size as displayed
+        original_size = original_size[::-1]
+    return image, exif, original_size
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        if isinstance(value, tuple) and len(value) == 2:
+            return float(value[0]) / float(value[1]) if value[1] else None
+        return float(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+
+
+def extract_exif(exif) -> Dict:
+    """Pull aperture, shutter, ISO, focal length and camera details from EXIF"""
+    details = exif.get_ifd(_EXIF_IFD) if exif else {}
+    result: Dict = {}
+    for name, tag in _EXIF_TAGS.items():
+        value = details.get(tag)
+        if value is None:
+            continue
+        if name in ("lens", "taken_at"):
+            result[name] = str(value).strip("\x00 ")
+        elif name == "iso":
+            result[name] = int(value[0] if isinstance(value, (tuple, list)) else value)
+        else:
+            number = _to_float(value)
+            if number:
+                result[name] = round(number, 6)
+    for name, tag in _IFD0_TAGS.items():
+        if exif and exif.get(tag):
+            result[name] = str(exif.get(tag)).strip("\x00 ")
+    return result
+
+
+def format_camera_settings(exif: Dict) -> str:
+    """Render EXIF exposure settings as 'f/2.8, 1/250s, ISO 400, 50mm'"""
+    parts = []
+    if "aperture" in exif:
+        parts.append(f"f/{exif['aperture']:g}")
+    if "shutter_seconds" in exif:
+        seconds = exif["shutter_seconds"]
+        if seconds < 1:
+            fraction = Fraction(seconds).limit_denominator(8000)
+            parts.append(f"1/{round(1 / seconds)}s" if fraction.numerator != 1 else f"{fraction}s")
+        else:
+            parts.append(f"{seconds:g}s")
+    if "iso" in exif:
+        parts.append(f"ISO {exif['iso']}")
+    if "focal_length_mm" in exif:
+        parts.append(f"{exif['focal_length_mm']:g}mm")
+    return ", ".join(parts)
+
+
+def image_facts(image_info: Optional[Dict], aspect: Optional[str] = None) -> List[str]:
+    """Structured facts about an ingested image for analysis prompts
+
+    With an aspect, only the facts relevant to it are returned (camera
+    settings and exposure go to technical, exposure and clipping also to
+    lighting, placement to composition).
+    """
+    from src.image_metrics import metrics_facts
+
+    if not image_info:
+        return []
+    facts = []
+    if aspect in (None, "technical"):
+        settings = format_camera_settings(image_info.get("exif", {}))
+        if settings:
+            facts.append(f"Camera settings (EXIF): {settings}")
+        width, height = image_info.get("original_size", (0, 0))
+        if width and height:
+            facts.append(f"Resolution: {width}x{height} ({width * height / 1e6:.1f} MP)")
+    facts.extend(metrics_facts(image_info.get("metrics"), aspect))
+    return facts
+
+
+class ImageCache:
+    """On-disk thumbnails and extracted features keyed by file content hash"""
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir or get_project_root() / "data" / "image_cache")
+
+    def _entry_dir(self, digest: str) -> Path:
+        return self.cache_dir / digest[:2] / digest
+
+    def get(self, digest: str) -> Optional[Dict]:
+        """Return cached features for a content hash, or None"""
+        features_path = self._entry_dir(digest) / "features.json"
+        if not features_path.exists():
+            return None
+        try:
+            return json.loads(features_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _write_features(self, digest: str, features: Dict):
+        entry_dir = self._entry_dir(digest)
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry_dir / f".features.{os.getpid()}.tmp"
+        tmp_path.write_text(json.dumps(features), encoding="utf-8")
+        os.replace(tmp_path, entry_dir / "features.json")
+
+    def put(self, digest: str, features: Dict, thumbnail) -> Dict:
+        """Store a thumbnail and features; returns the features with the thumbnail path"""
+        thumbnail_path = self._entry_dir(digest) / "thumbnail.jpg"
+        thumbnail_path.parent.mkdir(parents=True, exist_ok=True)
+        thumbnail.save(thumbnail_path, "JPEG", quality=85)
+        features = {**features, "thumbnail_path": str(thumbnail_path)}
+        self._write_features(digest, features)
+        return features
+
+    def update(self, digest: str, **features) -> Dict:
+        """Merge extra features into an existing entry"""
+        current = self.get(digest) or {}
+        current.update(features)
+        self._write_features(digest, current)
+        return current
+
+
+def ingest_image(source: ImageSource, cache: Optional[ImageCache] = None) -> Dict:
+    """Hash, decode (downscaled), extract EXIF, metrics and perceptual hashes, and cache an uploaded image
+
+    A file seen before is served from the cache without decoding it again.
+    """
+    cache = cache or ImageCache()
+    digest = content_hash(source)
+    cached = cache.get(digest)
+    if cached is not None and cached.get("version") == FEATURES_VERSION:
+        return cached
+
+    import numpy as np
+    from src.image_dedup import perceptual_hashes
+    from src.image_metrics import compute_metrics
+
+    image, exif, original_size = open_image(source)
+    thumbnail = image.copy()
+    thumbnail.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+    features = {
+        "hash": digest,
+        "version": FEATURES_VERSION,
+        "original_size": list(original_size),
+        "analysis_size": list(image.size),
+        "exif": extract_exif(exif),
+        "metrics": compute_metrics(np.asarray(image)),
+        "perceptual": perceptual_hashes(image),
+    }
+    return cache.put(digest, features, thumbnail)
@@ -0,0 +1,317 @@
+"""
+Knowledge Ingestion
+Incremental indexing of photography textbooks (Markdown, PDF, plain text)
+
+Usage:
+    python -m src.ingestion              # sync data/textbooks into the index
+    python -m src.ingestion --rebuild    # re-embed everything
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.utils import get_project_root
+from src.vector_store import CHUNKER_VERSION, VectorStore, chunk_text
+
+
+TEXTBOOK_SUFFIXES = {".md", ".markdown", ".txt", ".pdf"}
+BUILTIN_SOURCE = "builtin"
+
+_HEADING = re.compile(r"^#{1,6}\s+(.*?)\s*#*\s*$")
+
+# Keyword cues used to file a textbook chunk under one of the knowledge sections
+SECTION_KEYWORDS = {
+    "composition": ("composition", "compose", "frame", "framing", "rule of thirds", "leading line",
+                    "symmetry", "balance", "negative space", "foreground", "background", "crop",
+                    "perspective", "vanishing point"),
+    "lighting": ("light", "lighting", "shadow", "golden hour", "blue hour", "backlight", "flash",
+                 "diffuse", "reflector", "softbox", "highlight", "contrast", "silhouette"),
+    "storytelling": ("story", "narrative", "emotion", "moment", "mood", "viewer", "expression",
+                     "meaning", "context", "documentary", "decisive"),
+    "technical": ("aperture", "shutter", "iso", "focus", "sharp", "lens", "exposure", "noise",
+                  "depth of field", "white balance", "histogram", "raw", "sensor", "f/"),
+}
+
+
+def get_textbook_dir() -> Path:
+    """Directory scanned for textbook files (KNOWLEDGE_DIR, default data/textbooks)"""
+    return Path(os.getenv("KNOWLEDGE_DIR") or get_project_root() / "data" / "textbooks")
+
+
+def classify_section(text: str, hint: str = "") -> str:
+    """Pick the knowledge section a passage belongs to
+
+    A section name in the file's path (e.g. textbooks/lighting/...) wins;
+    otherwise the section with the most keyword hits does.
+    """
+    hint = hint.lower()
+    for section in SECTION_KEYWORDS:
+        if section in hint:
+            return section
+    lowered = text.lower()
+    scores = {section: sum(lowered.count(word) for word in words)
+              for section, words in SECTION_KEYWORDS.items()}
+    return max(scores, key=lambda section: (scores[section], section == "technical"))
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _iter_pdf_pages(path: Path) -> Iterator[str]:
+    from pypdf import PdfReader
+
+    for page in PdfReader(str(path)).pages:
+        yield page.extract_text() or ""
+
+
+def iter_paragraphs(path: Path) -> Iterator[Tuple[str, str]]:
+    """Stream (heading, paragraph) pairs from a file without reading it whole"""
+    title = path.stem.replace("_", " ").replace("-", " ")
+    if path.suffix.lower() == ".pdf":
+        for page in _iter_pdf_pages(path):
+            for paragraph in re.split(r"\n\s*\n", page):
+                paragraph = " ".join(paragraph.split())
+                if paragraph:
+                    yield title, paragraph
+        return
+
+    markdown = path.suffix.lower() in (".md", ".markdown")
+    lines: List[str] = []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            heading = _HEADING.match(line) if markdown else None
+            if heading or not line.strip():
+                if lines:
+                    yield title, " ".join(lines)
+                    lines = []
+                if heading:
+                    title = heading.group(1)
+                continue
+            lines.append(line.strip())
+    if lines:
+        yield title, " ".join(lines)
+
+
+def iter_file_chunks(path: Path, name: str, max_chars: int = 600) -> Iterator[Dict]:
+    """Pack a file's paragraphs into chunks, one heading per chunk"""
+    count = 0
+    current, current_title = "", None
+
+    def make(title: str, text: str) -> Dict:
+        nonlocal count
+        chunk = {
+            "id": f"{name}#{count}",
+            "section": classify_section(f"{title}\n{text}", hint=name),
+            "title": title,
+            "text": f"{title}:\n{text}",
+            "source": name,
+        }
+        count += 1
+        return chunk
+
+    for title, paragraph in iter_paragraphs(path):
+        if current and (title != current_title or len(current) + len(paragraph) + 2 > max_chars):
+            yield make(current_title, current)
+            current = ""
+        current_title = title
+        if len(paragraph) > max_chars:
+            parts = chunk_text(paragraph, max_chars=max_chars)
+            for part in parts[:-1]:
+                yield make(title, part)
+            paragraph = parts[-1]
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        yield make(current_title, current)
+
+
+class Source:
+    """A unit of change detection: one textbook file or the built-in knowledge"""
+
+    def __init__(self, name: str, iter_chunks: Callable[[], Iterable[Dict]],
+                 content_hash: Callable[[], str], path: Optional[Path] = None):
+        self.name = name
+        self.iter_chunks = iter_chunks
+        self.content_hash = content_hash
+        self.path = path
+
+    def fingerprint(self, previous: Optional[Dict]) -> Dict:
+        """Content hash, reusing the previous one when size and mtime are unchanged"""
+        if self.path is None:
+            return {"hash": self.content_hash()}
+        stat = self.path.stat()
+        if previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+            return {"hash": previous["hash"], "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        return {"hash": self.content_hash(), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def textbook_sources(directory: Optional[Path] = None) -> List[Source]:
+    """One Source per supported file under directory (missing directory = none)"""
+    directory = Path(directory or get_textbook_dir())
+    if not directory.is_dir():
+        return []
+    sources = []
+    for path in sorted(directory.rglob("*")):
+        if path.suffix.lower() not in TEXTBOOK_SUFFIXES or not path.is_file() or path.name.startswith("."):
+            continue
+        name = f"textbooks/{path.relative_to(directory).as_posix()}"
+        sources.append(Source(name, lambda p=path, n=name: iter_file_chunks(p, n),
+                              lambda p=path: file_hash(p), path))
+    return sources
+
+
+def builtin_source(chunks: List[Dict]) -> Source:
+    """The PhotographyKnowledgeBase strings as a single source"""
+    def content_hash() -> str:
+        return hashlib.sha256(json.dumps(chunks, sort_keys=True).encode("utf-8")).hexdigest()
+
+    return Source(BUILTIN_SOURCE, lambda: iter(chunks), content_hash)
+
+
+def _embed_batches(chunks: Iterable[Dict], embedder, batch_size: int,
+                   out_chunks: List[Dict]) -> Iterator[np.ndarray]:
+    batch: List[Dict] = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) == batch_size:
+            yield embedder.embed([c["text"] for c in batch])
+            out_chunks.extend(batch)
+            batch = []
+    if batch:
+        yield embedder.embed([c["text"] for c in batch])
+        out_chunks.extend(batch)
+
+
+def _read_chunks(source: Source) -> Iterator[Dict]:
+    try:
+        yield from source.iter_chunks()
+    except ImportError:
+        print(f"⚠️ pypdf not installed. Skipping {source.name}.")
+        raise
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not read {source.name}: {e}")
+        raise
+
+
+def sync_store(directory: Path, sources: List[Source], embedder,
+               batch_size: int = 64, rebuild: bool = False):
+    """Bring the store in directory up to date with sources
+
+    Only sources whose content hash changed (or that are new) are chunked
+    and embedded; rows of unchanged sources are kept as they are, rows of
+    deleted sources dropped, and a changed source that fails to read keeps
+    its previous rows. A different embedder or chunker version forces a
+    full rebuild. Returns (store, stats).
+    """
+    started = time.perf_counter()
+    directory = Path(directory)
+    manifest = VectorStore.read_manifest(directory) or {}
+    compatible = (not rebuild and manifest.get("embedder") == embedder.name
+                  and manifest.get("chunker_version") == CHUNKER_VERSION and "sources" in manifest)
+    previous: Dict[str, Dict] = manifest["sources"] if compatible else {}
+    store = VectorStore.load(directory) if previous else None
+    if store is None:
+        previous = {}
+
+    fingerprints = {source.name: source.fingerprint(previous.get(source.name)) for source in sources}
+    unchanged = {name for name, fp in fingerprints.items()
+                 if name in previous and previous[name]["hash"] == fp["hash"]}
+    changed = [source for source in sources if source.name not in unchanged]
+    removed = sorted(set(previous) - set(fingerprints))
+    stats = {"added": sum(1 for s in changed if s.name not in previous),
+             "changed": sum(1 for s in changed if s.name in previous),
+             "removed": len(removed), "unchanged": len(unchanged), "embedded_chunks": 0}
+
+    stat_only = any(previous[n].get("mtime_ns") != fingerprints[n].get("mtime_ns") for n in unchanged)
+    if store is not None and not changed and not removed:
+        if stat_only:
+            # Touched but identical files: refresh their size/mtime, leave the data files alone
+            store.manifest = {**store.manifest, "sources": {
+                name: {**fp, "count": previous[name]["count"]} for name, fp in fingerprints.items()}}
+            VectorStore.write_manifest(directory, store.manifest)
+        store.embedder = embedder
+        stats["elapsed_s"] = round(time.perf_counter() - started, 3)
+        return store, stats
+
+    if store is not None:
+        keep = store.chunks.rows_where("source", unchanged)
+        parts = [np.asarray(store.vectors[keep], dtype=np.float32)]
+        chunks = [store.chunks[i] for i in keep]
+    else:
+        parts, chunks = [np.zeros((0, embedder.dim), dtype=np.float32)], []
+
+    counts = {name: previous[name]["count"] for name in unchanged}
+    for source in changed:
+        before = len(chunks)
+        try:
+            parts.extend(_embed_batches(_read_chunks(source), embedder, batch_size, chunks))
+        except (ImportError, OSError, ValueError):
+            del chunks[before:]
+            parts = [np.concatenate(parts)[:before]]
+            if source.name not in previous:
+                # A new unreadable source stays out of the manifest so the next sync retries it
+                fingerprints.pop(source.name)
+                continue
+            # A changed one keeps its previous rows and fingerprint until it reads again
+            rows = store.chunks.rows_where("source", source.name)
+            parts.append(np.asarray(store.vectors[rows], dtype=np.float32))
+            chunks.extend(store.chunks[i] for i in rows)
+            fingerprints[source.name] = {k: v for k, v in previous[source.name].items() if k != "count"}
+            counts[source.name] = previous[source.name]["count"]
+            continue
+        counts[source.name] = len(chunks) - before
+        stats["embedded_chunks"] += counts[source.name]
+
+    sources_manifest = {name: {**fp, "count": counts[name]} for name, fp in fingerprints.items()}
+    content = hashlib.sha256()
+    content.update(f"{CHUNKER_VERSION}\0{embedder.name}\0".encode("utf-8"))
+    for name in sorted(sources_manifest):
+        content.update(f"{name}\0{sources_manifest[name]['hash']}\0".encode("utf-8"))
+    new_manifest = {
+        "content_hash": content.hexdigest(),
+        "embedder": embedder.name,
+        "chunker_version": CHUNKER_VERSION,
+        "dim": embedder.dim,
+        "count": len(chunks),
+        "sources": sources_manifest,
+    }
+    VectorStore(np.concatenate(parts), chunks, new_manifest).save(directory)
+    store = VectorStore.load(directory)
+    store.embedder = embedder
+    stats["elapsed_s"] = round(time.perf_counter() - started, 3)
+    return store, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index photography textbooks incrementally")
+    parser.add_argument("--dir", type=Path, help="Textbook directory (default: KNOWLEDGE_DIR or data/textbooks)")
+    parser.add_argument("--rebuild", action="store_true", help="Re-embed everything")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    from src.embeddings import get_default_embedder
+    from src.rag_pipeline import PhotographyKnowledgeBase
+    from src.utils import load_env_variables
+
+    load_env_variables()
+    sources = [builtin_source(PhotographyKnowledgeBase.get_chunks())] + textbook_sources(args.dir)
+    store, stats = sync_store(PhotographyKnowledgeBase.get_store_dir(), sources, get_default_embedder(),
+                              batch_size=args.batch_size, rebuild=args.rebuild)
+    stats["total_chunks"] = len(store)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
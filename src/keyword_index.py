@@ -0,0 +1,176 @@
+"""
+Keyword Index
+BM25 over the knowledge chunks with compact postings, plus reciprocal-rank fusion
+"""
+
+import json
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.vector_index import top_k
+
+
+_TOKEN = re.compile(r"f/\d+(?:\.\d+)?|\d+/\d+|\d+(?:\.\d+)?|[a-z]+(?:'[a-z]+)?")
+_F_NUMBER = re.compile(r"\bf(\d)")  # f2.8 -> f/2.8
+_ISO = re.compile(r"\biso(\d)")  # iso3200 -> iso 3200
+
+# Queries this short whose best match contains every term skip the vector search
+KEYWORD_ONLY_MAX_TERMS = 4
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in into is it its of on or that the their "
+    "this to was were will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case terms that keep photography jargon intact (f/2.8, 1/250, iso 3200)"""
+    text = _ISO.sub(r"iso \1", _F_NUMBER.sub(r"f/\1", text.lower()))
+    tokens = []
+    for token in _TOKEN.findall(text):
+        if token in STOPWORDS or (len(token) == 1 and token.isalpha()):
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss") and token.isalpha():
+            token = token[:-1]  # crude plural folding: lines -> line
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 with postings packed into flat arrays
+
+    Postings are stored term-major in CSR form: offsets[t]:offsets[t + 1]
+    slices docs (uint32) and weights (float32) for term t. Weights are the
+    full per-posting BM25 contribution, precomputed at build time, so a
+    query is a few slice reads and one scatter-add over matching postings;
+    its cost grows with the postings touched, not with the corpus.
+    """
+
+    def __init__(self, vocabulary: Dict[str, int], offsets: np.ndarray, docs: np.ndarray,
+                 weights: np.ndarray, n_docs: int):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.docs = docs
+        self.weights = weights
+        self.n_docs = n_docs
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.offsets.nbytes + self.docs.nbytes + self.weights.nbytes)
+
+    @classmethod
+    def build(cls, texts: Iterable[str], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        vocabulary: Dict[str, int] = {}
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        freqs: List[int] = []
+        lengths: List[int] = []
+        for doc, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                doc_ids.append(doc)
+                freqs.append(tf)
+
+        terms = np.array(term_ids, dtype=np.int64)
+        order = np.argsort(terms, kind="stable")  # docs stay ascending within a term
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(terms, minlength=len(vocabulary)))
+        docs = np.array(doc_ids, dtype=np.uint32)[order]
+        tf = np.array(freqs, dtype=np.float32)[order]
+
+        n_docs = len(lengths)
+        doc_len = np.array(lengths, dtype=np.float32)
+        avg_len = float(doc_len.mean()) if n_docs else 1.0
+        df = np.diff(offsets).astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        norm = k1 * (1 - b + b * doc_len[docs] / max(avg_len, 1e-9))
+        weights = (np.repeat(idf, np.diff(offsets)) * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+        return cls(vocabulary, offsets, docs, weights, n_docs)
+
+    def search(self, query: str, k: int,
+               rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Top-k docs for query, optionally among the given row ids
+
+        Returns (scores, ids, coverage), where coverage is the fraction of
+        the query's terms each returned doc contains.
+        """
+        terms = set(tokenize(query))
+        known = [self.vocabulary[t] for t in terms if t in self.vocabulary]
+        if not known:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        docs = np.concatenate([self.docs[self.offsets[t]:self.offsets[t + 1]] for t in known])
+        weights = np.concatenate([self.weights[self.offsets[t]:self.offsets[t + 1]] for t in known])
+        if rows is not None:
+            allowed = np.isin(docs, rows)
+            docs, weights = docs[allowed], weights[allowed]
+            if not len(docs):
+                return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        matched, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights).astype(np.float32)
+        hits = np.bincount(inverse)
+        best_scores, positions = top_k(scores[None, :], k)
+        positions = positions[0]
+        return best_scores[0], matched[positions].astype(np.int64), (hits[positions] / len(terms)).astype(np.float32)
+
+    def save(self, path: Path, key: str):
+        """Persist the postings atomically, tagged with the store's content hash"""
+        path = Path(path)
+        tmp = path.with_name(f".{path.name}.tmp")
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        with open(tmp, "wb") as f:
+            np.savez(f, offsets=self.offsets, docs=self.docs, weights=self.weights, key=np.array(key),
+                     n_docs=np.array(self.n_docs), vocabulary=np.array(json.dumps(terms)))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path, key: str) -> Optional["BM25Index"]:
+        """Load saved postings, or None if missing or built from different chunks"""
+        try:
+            with np.load(path) as data:
+                if str(data["key"]) != key:
+                    return None
+                terms = json.loads(str(data["vocabulary"]))
+                return cls({t: i for i, t in enumerate(terms)}, data["offsets"], data["docs"],
+                           data["weights"], int(data["n_docs"]))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @classmethod
+    def load_or_build(cls, chunks: Iterable[Dict], cache_dir: Optional[Path] = None,
+                      cache_key: Optional[str] = None) -> "BM25Index":
+        """Reuse postings saved next to the store; tokenizing every chunk is the slow part"""
+        path = Path(cache_dir) / "keyword-index.npz" if cache_dir and cache_key else None
+        if path is not None and path.exists():
+            index = cls.load(path, cache_key)
+            if index is not None:
+                return index
+        index = cls.build(f"{c['title']}\n{c['text']}" for c in chunks)
+        if path is not None:
+            try:
+                index.save(path, cache_key)
+            except OSError as e:
+                print(f"⚠️ Could not save keyword index: {e}")
+        return index
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """Fuse ranked id lists: each id scores sum(1 / (k + rank)), best first
+
+    Only ranks are used, so BM25 and cosine scores never need to be put on
+    a common scale.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            fused[int(doc)] = fused.get(int(doc), 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
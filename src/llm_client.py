@@ -0,0 +1,379 @@
+"""
+LLM Client
+Connection-pooled asyncio client for the Ollama HTTP API
+"""
+
+import asyncio
+import concurrent.futures
+import copy
+import json
+import os
+import queue
+import threading
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    import httpx
+
+
+class LLMError(RuntimeError):
+    """Raised when the model server fails or returns an error
+
+    status is the HTTP status the server answered with, or None when the
+    request never got a response (connection refused, reset, ...).
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class LLMTimeoutError(LLMError):
+    """Raised when a request exceeds its timeout"""
+
+
+class LLMConfig:
+    """Connection settings for the Ollama server"""
+
+    def __init__(self, base_url: str = "http://localhost:11434", model: str = "llama3.2:3b",
+                 timeout: float = 120.0, connect_timeout: float = 5.0,
+                 max_concurrency: int = 4, max_connections: int = 8,
+                 keep_alive: str = "30m"):
+        # A comma-separated list names several servers to route across
+        self.base_urls = [url.strip().rstrip("/") for url in base_url.split(",") if url.strip()]
+        self.base_url = self.base_urls[0]
+        self.model = model
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.keep_alive = keep_alive
+
+    def for_server(self, base_url: str) -> "LLMConfig":
+        """The same settings pointed at a single server"""
+        config = copy.copy(self)
+        config.base_url = base_url.rstrip("/")
+        config.base_urls = [config.base_url]
+        return config
+
+    @classmethod
+    def from_env(cls) -> "LLMConfig":
+        """Read OLLAMA_* settings from the environment"""
+        return cls(
+            base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
+            model=os.getenv("OLLAMA_MODEL", "llama3.2:3b"),
+            timeout=float(os.getenv("OLLAMA_TIMEOUT", "120")),
+            connect_timeout=float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5")),
+            max_concurrency=int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4")),
+            max_connections=int(os.getenv("OLLAMA_MAX_CONNECTIONS", "8")),
+            keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+        )
+
+
+class AsyncOllamaClient:
+    """Async Ollama client sharing one keep-alive connection pool
+
+    At most max_concurrency requests are in flight; the rest wait on a
+    semaphore instead of opening new connections.
+    """
+
+    def __init__(self, config: Optional[LLMConfig] = None):
+        self.config = config or LLMConfig.from_env()
+        self._http: Optional["httpx.AsyncClient"] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _client(self) -> "httpx.AsyncClient":
+        # Created lazily so the pool and semaphore bind to the running loop
+        # (httpx itself is imported here to keep it off the app's cold start)
+        import httpx
+
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=self.config.base_url,
+                limits=httpx.Limits(
+                    max_connections=self.config.max_connections,
+                    max_keepalive_connections=self.config.max_connections,
+                ),
+                timeout=self._timeout(None),
+            )
+            self._semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        return self._http
+
+    def _timeout(self, timeout: Optional[float]) -> "httpx.Timeout":
+        import httpx
+
+        return httpx.Timeout(timeout or self.config.timeout, connect=self.config.connect_timeout)
+
+    def _payload(self, model: Optional[str], stream: bool, options: Optional[Dict], **fields) -> Dict:
+        payload = {
+            "model": model or self.config.model,
+            "stream": stream,
+            "keep_alive": self.config.keep_alive,
+        }
+        if options:
+            payload["options"] = options
+        payload.update({k: v for k, v in fields.items() if v is not None})
+        return payload
+
+    async def _post(self, path: str, payload: Dict, timeout: Optional[float]) -> Dict:
+        import httpx
+
+        client = self._client()
+        timeout = timeout or self.config.timeout
+        async with self._semaphore:
+            try:
+                response = await asyncio.wait_for(
+                    client.post(path, json=payload, timeout=self._timeout(timeout)),
+                    timeout,
+                )
+            except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+                raise LLMTimeoutError(f"Ollama request timed out after {timeout}s") from e
+            except httpx.HTTPError as e:
+                raise LLMError(f"Ollama request failed: {e}") from e
+        if response.status_code != 200:
+            raise LLMError(f"Ollama returned {response.status_code}: {response.text}", status=response.status_code)
+        return response.json()
+
+    async def _stream(self, path: str, payload: Dict, timeout: Optional[float]) -> AsyncIterator[Dict]:
+        import httpx
+
+        client = self._client()
+        async with self._semaphore:
+            try:
+                async with client.stream("POST", path, json=payload,
+                                         timeout=self._timeout(timeout)) as response:
+                    if response.status_code != 200:
+                        await response.aread()
+                        raise LLMError(f"Ollama returned {response.status_code}: {response.text}",
+                                       status=response.status_code)
+                    async for line in response.aiter_lines():
+                        if line.strip():
+                            chunk = json.loads(line)
+                            if "error" in chunk:
+                                raise LLMError(chunk["error"])
+                            yield chunk
+            except httpx.TimeoutException as e:
+                raise LLMTimeoutError(f"Ollama stream stalled for {timeout or self.config.timeout}s") from e
+            except httpx.HTTPError as e:
+                raise LLMError(f"Ollama request failed: {e}") from e
+
+    async def chat(self, messages: List[Dict], model: Optional[str] = None,
+                   options: Optional[Dict] = None, timeout: Optional[float] = None,
+                   **extra) -> Dict:
+        """Send a chat request and return the complete response"""
+        payload = self._payload(model, False, options, messages=messages, **extra)
+        return await self._post("/api/chat", payload, timeout)
+
+    def chat_stream(self, messages: List[Dict], model: Optional[str] = None,
+                    options: Optional[Dict] = None, timeout: Optional[float] = None,
+                    **extra) -> AsyncIterator[Dict]:
+        """Stream a chat response as Ollama's incremental JSON messages
+
+        The timeout bounds the wait for each chunk. Closing the iterator
+        closes the HTTP stream, which stops generation on the server.
+        """
+        payload = self._payload(model, True, options, messages=messages, **extra)
+        return self._stream("/api/chat", payload, timeout)
+
+    async def generate(self, prompt: str, model: Optional[str] = None, system: Optional[str] = None,
+                       context: Optional[List[int]] = None, options: Optional[Dict] = None,
+                       timeout: Optional[float] = None, **extra) -> Dict:
+        """Send a completion request and return the complete response
+
+        The response's "context" encodes the conversation so far; passing it
+        back with the next prompt continues from there, so only the new
+        prompt has to be evaluated.
+        """
+        payload = self._payload(model, False, options, prompt=prompt, system=system, context=context, **extra)
+        return await self._post("/api/generate", payload, timeout)
+
+    def generate_stream(self, prompt: str, model: Optional[str] = None, system: Optional[str] = None,
+                        context: Optional[List[int]] = None, options: Optional[Dict] = None,
+                        timeout: Optional[float] = None, **extra) -> AsyncIterator[Dict]:
+        """Stream a completion; the final chunk carries the new context"""
+        payload = self._payload(model, True, options, prompt=prompt, system=system, context=context, **extra)
+        return self._stream("/api/generate", payload, timeout)
+
+    async def load_model(self, model: Optional[str] = None,
+                         keep_alive: Optional[str] = None) -> Dict:
+        """Load a model into memory without generating anything
+
+        An empty /api/generate request makes Ollama load the weights and
+        keep them resident for keep_alive, so the first real request skips
+        the load.
+        """
+        import httpx
+
+        client = self._client()
+        payload = {"model": model or self.config.model,
+                   "keep_alive": keep_alive or self.config.keep_alive}
+        try:
+            response = await client.post("/api/generate", json=payload)
+        except httpx.HTTPError as e:
+            raise LLMError(f"Ollama request failed: {e}") from e
+        if response.status_code != 200:
+            raise LLMError(f"Ollama returned {response.status_code}: {response.text}", status=response.status_code)
+        return response.json()
+
+    async def _get(self, path: str, timeout: Optional[float]) -> Dict:
+        import httpx
+
+        client = self._client()
+        try:
+            response = await client.get(path, timeout=self._timeout(timeout))
+        except httpx.TimeoutException as e:
+            raise LLMTimeoutError(f"Ollama {path} timed out") from e
+        except httpx.HTTPError as e:
+            raise LLMError(f"Ollama request failed: {e}") from e
+        if response.status_code != 200:
+            raise LLMError(f"Ollama returned {response.status_code}: {response.text}", status=response.status_code)
+        return response.json()
+
+    async def list_models(self, timeout: Optional[float] = None) -> List[str]:
+        """Models installed on the server (/api/tags)"""
+        return [m["name"] for m in (await self._get("/api/tags", timeout)).get("models", [])]
+
+    async def running_models(self, timeout: Optional[float] = None) -> List[str]:
+        """Models currently loaded in memory (/api/ps)"""
+        return [m["name"] for m in (await self._get("/api/ps", timeout)).get("models", [])]
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+class OllamaClient:
+    """Thread-safe synchronous facade over AsyncOllamaClient
+
+    Runs the async client on one background event loop so every Streamlit
+    session shares a single connection pool and concurrency limit. Any
+    object with the AsyncOllamaClient interface can be passed as aclient.
+    """
+
+    def __init__(self, config: Optional[LLMConfig] = None, aclient=None):
+        self.aclient = aclient or AsyncOllamaClient(config)
+        self.config = self.aclient.config
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="ollama-client", daemon=True)
+        self._thread.start()
+        self._pending: set = set()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _submit(self, coro) -> "concurrent.futures.Future":
+        with self._lock:
+            if self._closed:
+                coro.close()
+                raise LLMError("Ollama client is closed")
+            future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+            self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+        return future
+
+    def run(self, coro):
+        """Run a coroutine on the client's event loop and wait for the result"""
+        return self._submit(coro).result()
+
+    def chat(self, messages: List[Dict], **kwargs) -> Dict:
+        """Blocking chat request"""
+        return self.run(self.aclient.chat(messages, **kwargs))
+
+    def warm_up(self, model: Optional[str] = None) -> bool:
+        """Preload the model so the first request doesn't pay its load time"""
+        try:
+            self.run(self.aclient.load_model(model))
+            return True
+        except LLMError as e:
+            print(f"⚠️ Could not preload {model or self.config.model}: {e}")
+            return False
+
+    def generate(self, prompt: str, **kwargs) -> Dict:
+        """Blocking completion request"""
+        return self.run(self.aclient.generate(prompt, **kwargs))
+
+    def chat_stream(self, messages: List[Dict], **kwargs) -> Iterator[Dict]:
+        """Blocking iterator over streamed chat chunks
+
+        Closing the generator early cancels the request on the event loop.
+        """
+        return self._iterate(lambda: self.aclient.chat_stream(messages, **kwargs))
+
+    def generate_stream(self, prompt: str, **kwargs) -> Iterator[Dict]:
+        """Blocking iterator over streamed completion chunks"""
+        return self._iterate(lambda: self.aclient.generate_stream(prompt, **kwargs))
+
+    def _iterate(self, open_stream) -> Iterator[Dict]:
+        chunks: "queue.Queue" = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for chunk in open_stream():
+                    chunks.put(chunk)
+            except Exception as e:  # delivered to the consuming thread
+                chunks.put(e)
+            finally:
+                # Also on cancellation, which then propagates on the loop
+                chunks.put(done)
+
+        def finished(future):
+            # pump() never ran if the client closed first
+            if not future.cancelled() and future.exception() is not None:
+                chunks.put(future.exception())
+            chunks.put(done)
+
+        future = self._submit(pump())
+        future.add_done_callback(finished)
+        try:
+            while True:
+                item = chunks.get()
+                if item is done:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+    def close(self):
+        """Cancel in-flight requests, close the pool and stop the loop"""
+        async def shutdown():
+            current = asyncio.current_task()
+            for task in asyncio.all_tasks():
+                if task is not current:
+                    task.cancel()
+            await self.aclient.aclose()
+
+        self.run(shutdown())
+        with self._lock:
+            self._closed = True
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        # Requests submitted while shutting down would wait on the stopped loop forever
+        for future in list(self._pending):
+            if not future.done():
+                future.set_exception(LLMError("Ollama client is closed"))
+
+
+_default_client: Optional[OllamaClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_llm_client() -> OllamaClient:
+    """Process-wide client configured from the environment
+
+    When OLLAMA_BASE_URL lists several servers this is an LLMRouter
+    spreading requests across them.
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            config = LLMConfig.from_env()
+            if len(config.base_urls) > 1:
+                from src.llm_router import LLMRouter
+
+                _default_client = LLMRouter.from_env(config)
+            else:
+                _default_client = OllamaClient(config)
+        return _default_client
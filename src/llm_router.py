@@ -0,0 +1,313 @@
+"""
+LLM Router
+Spread model requests across several Ollama servers with health checks and failover
+"""
+
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from src.llm_client import AsyncOllamaClient, LLMConfig, LLMError, LLMTimeoutError, OllamaClient
+from src.telemetry import registry
+
+
+class Backend:
+    """One Ollama server: its connection pool, current load and last known health"""
+
+    def __init__(self, config: LLMConfig):
+        self.url = config.base_url
+        self.client = AsyncOllamaClient(config)
+        self.in_flight = 0
+        self.healthy = True  # until a probe or a request finds otherwise
+        self.draining = False
+        self.models: Optional[List[str]] = None  # installed models, None until probed
+        self.loaded: List[str] = []
+        self.failures = 0
+        self.last_error = ""
+        self.checked_at: Optional[float] = None
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or model in self.models
+
+    def to_dict(self) -> Dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "draining": self.draining,
+            "in_flight": self.in_flight,
+            "loaded": list(self.loaded),
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "checked_at": self.checked_at,
+        }
+
+
+def _retry_elsewhere(error: LLMError) -> bool:
+    """Whether another server might answer: no response, a server fault or a missing model
+
+    Timeouts are not retried, since the same request would most likely
+    take as long again on the next server.
+    """
+    if isinstance(error, LLMTimeoutError):
+        return False
+    return error.status is None or error.status >= 500 or error.status == 404
+
+
+class AsyncLLMRouter:
+    """The AsyncOllamaClient interface over several Ollama servers
+
+    Each request goes to the server with the fewest requests in flight,
+    counting a server that already has the model loaded as `affinity`
+    requests lighter than one that would have to load it first; ties
+    rotate. Draining servers get nothing new, and servers that are
+    unhealthy or lack the model are only tried once the others have
+    failed. A request that gets no response, a 5xx or a 404 is retried on
+    the next server; a stream only fails over before its first chunk. A
+    failure without a response or with a 5xx marks the server unhealthy
+    until a probe of /api/tags and /api/ps, run every health_interval
+    seconds, finds it answering again.
+    """
+
+    def __init__(self, config: Optional[LLMConfig] = None, health_interval: float = 10.0,
+                 affinity: int = 2):
+        self.config = config or LLMConfig.from_env()
+        self.backends = [Backend(self.config.for_server(url)) for url in self.config.base_urls]
+        self.health_interval = health_interval
+        self.affinity = affinity
+        self._turn = 0
+        self._probe: Optional[asyncio.Task] = None
+
+    def backend(self, url: str) -> Backend:
+        for backend in self.backends:
+            if backend.url == url.rstrip("/"):
+                return backend
+        raise KeyError(f"No Ollama server {url} in the router")
+
+    def _ensure_probe(self):
+        # Started on first use so the task belongs to the loop requests run on
+        if self._probe is None and self.health_interval > 0:
+            self._probe = asyncio.get_running_loop().create_task(self._probe_loop())
+
+    async def _probe_loop(self):
+        while True:
+            await self.check_health()
+            await asyncio.sleep(self.health_interval)
+
+    async def _check(self, backend: Backend):
+        timeout = self.config.connect_timeout
+        try:
+            models, loaded = await asyncio.gather(backend.client.list_models(timeout),
+                                                  backend.client.running_models(timeout))
+        except LLMError as e:
+            self._mark_unhealthy(backend, e)
+            return
+        backend.models, backend.loaded = models, loaded
+        backend.healthy = True
+        backend.failures = 0
+        backend.checked_at = time.time()
+
+    async def check_health(self) -> List[Dict]:
+        """Probe every server for health, installed and loaded models"""
+        await asyncio.gather(*(self._check(backend) for backend in self.backends))
+        return [backend.to_dict() for backend in self.backends]
+
+    def _mark_unhealthy(self, backend: Backend, error: LLMError):
+        backend.healthy = False
+        backend.failures += 1
+        backend.last_error = str(error)
+        backend.checked_at = time.time()
+        registry.counter("llm_backend_failures_total", "Requests or probes that found an Ollama server down").inc(
+            backend=backend.url)
+
+    def _candidates(self, model: str) -> List[Backend]:
+        """Servers to try for one request, best first"""
+        count = len(self.backends)
+        self._turn = (self._turn + 1) % count
+
+        def cost(position: int):
+            backend = self.backends[position]
+            penalty = 0 if model in backend.loaded else self.affinity
+            return backend.in_flight + penalty, (position - self._turn) % count
+
+        ranked = [self.backends[i] for i in sorted(range(count), key=cost) if not self.backends[i].draining]
+        if not ranked:
+            raise LLMError("Every Ollama server is draining")
+        preferred = [backend for backend in ranked if backend.healthy and backend.serves(model)]
+        return preferred + [backend for backend in ranked if backend not in preferred]
+
+    @contextmanager
+    def _dispatch(self, backend: Backend) -> Iterator[None]:
+        backend.in_flight += 1
+        backend._idle.clear()
+        registry.counter("llm_backend_requests_total", "Model requests sent to each Ollama server").inc(
+            backend=backend.url)
+        try:
+            yield
+        finally:
+            backend.in_flight -= 1
+            if backend.in_flight == 0:
+                backend._idle.set()
+
+    def _succeeded(self, backend: Backend, model: str):
+        # Ollama loads the model to answer, so it is resident there now
+        backend.healthy = True
+        if model not in backend.loaded:
+            backend.loaded.append(model)
+
+    def _failed(self, backend: Backend, model: str, error: LLMError) -> bool:
+        """Record a failed request and return whether to try the next server"""
+        if error.status == 404:  # model not installed there
+            for models in (backend.loaded, backend.models or []):
+                if model in models:
+                    models.remove(model)
+        elif not isinstance(error, LLMTimeoutError) and (error.status is None or error.status >= 500):
+            self._mark_unhealthy(backend, error)
+        return _retry_elsewhere(error)
+
+    def _failover(self, backend: Backend):
+        registry.counter("llm_failovers_total", "Requests retried on another Ollama server").inc(
+            backend=backend.url)
+
+    async def _call(self, method: str, model: Optional[str], *args, **kwargs) -> Dict:
+        self._ensure_probe()
+        model = model or self.config.model
+        error: Optional[LLMError] = None
+        for backend in self._candidates(model):
+            if error is not None:
+                self._failover(backend)
+            try:
+                with self._dispatch(backend):
+                    response = await getattr(backend.client, method)(*args, model=model, **kwargs)
+            except LLMError as e:
+                if not self._failed(backend, model, e):
+                    raise
+                error = e
+                continue
+            self._succeeded(backend, model)
+            return response
+        raise error
+
+    async def _stream(self, method: str, model: Optional[str], *args, **kwargs) -> AsyncIterator[Dict]:
+        # Fails over only while nothing has been yielded: after the first
+        # chunk the consumer already has part of the answer
+        self._ensure_probe()
+        model = model or self.config.model
+        error: Optional[LLMError] = None
+        for backend in self._candidates(model):
+            if error is not None:
+                self._failover(backend)
+            started = False
+            try:
+                with self._dispatch(backend):
+                    async for chunk in getattr(backend.client, method)(*args, model=model, **kwargs):
+                        started = True
+                        yield chunk
+            except LLMError as e:
+                if not self._failed(backend, model, e) or started:
+                    raise
+                error = e
+                continue
+            self._succeeded(backend, model)
+            return
+        raise error
+
+    async def chat(self, messages: List[Dict], model: Optional[str] = None, **kwargs) -> Dict:
+        """Send a chat request to the best server, failing over to the others"""
+        return await self._call("chat", model, messages, **kwargs)
+
+    def chat_stream(self, messages: List[Dict], model: Optional[str] = None, **kwargs) -> AsyncIterator[Dict]:
+        """Stream a chat response from the best server"""
+        return self._stream("chat_stream", model, messages, **kwargs)
+
+    async def generate(self, prompt: str, model: Optional[str] = None, **kwargs) -> Dict:
+        """Send a completion request to the best server, failing over to the others"""
+        return await self._call("generate", model, prompt, **kwargs)
+
+    def generate_stream(self, prompt: str, model: Optional[str] = None, **kwargs) -> AsyncIterator[Dict]:
+        """Stream a completion from the best server"""
+        return self._stream("generate_stream", model, prompt, **kwargs)
+
+    async def load_model(self, model: Optional[str] = None,
+                         keep_alive: Optional[str] = None) -> Dict[str, Dict]:
+        """Load the model on every server that is not draining
+
+        Returns the responses by server URL; raises only if no server
+        could load it.
+        """
+        model = model or self.config.model
+        targets = [backend for backend in self.backends if not backend.draining]
+        results = await asyncio.gather(*(backend.client.load_model(model, keep_alive) for backend in targets),
+                                       return_exceptions=True)
+        loaded = {}
+        for backend, result in zip(targets, results):
+            if isinstance(result, LLMError):
+                self._failed(backend, model, result)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                self._succeeded(backend, model)
+                loaded[backend.url] = result
+        if not loaded:
+            raise LLMError(f"No Ollama server could load {model}")
+        return loaded
+
+    async def drain(self, url: str, timeout: Optional[float] = None) -> bool:
+        """Send a server no new requests and wait for its in-flight ones
+
+        Returns False if requests were still running after timeout seconds;
+        the server stays draining either way until resume().
+        """
+        backend = self.backend(url)
+        backend.draining = True
+        try:
+            await asyncio.wait_for(backend._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def resume(self, url: str):
+        """Put a drained server back into rotation"""
+        self.backend(url).draining = False
+
+    def get_stats(self) -> Dict:
+        return {"backends": [backend.to_dict() for backend in self.backends]}
+
+    async def aclose(self):
+        if self._probe is not None:
+            self._probe.cancel()
+            self._probe = None
+        await asyncio.gather(*(backend.client.aclose() for backend in self.backends))
+
+
+class LLMRouter(OllamaClient):
+    """Thread-safe synchronous router, usable wherever an OllamaClient is"""
+
+    def __init__(self, config: Optional[LLMConfig] = None, health_interval: float = 10.0,
+                 affinity: int = 2):
+        super().__init__(aclient=AsyncLLMRouter(config, health_interval=health_interval, affinity=affinity))
+
+    @classmethod
+    def from_env(cls, config: Optional[LLMConfig] = None) -> "LLMRouter":
+        """Route across the OLLAMA_BASE_URL servers with OLLAMA_HEALTH_INTERVAL and OLLAMA_AFFINITY"""
+        return cls(
+            config or LLMConfig.from_env(),
+            health_interval=float(os.getenv("OLLAMA_HEALTH_INTERVAL", "10")),
+            affinity=int(os.getenv("OLLAMA_AFFINITY", "2")),
+        )
+
+    def check_health(self) -> List[Dict]:
+        return self.run(self.aclient.check_health())
+
+    def drain(self, url: str, timeout: Optional[float] = None) -> bool:
+        """Stop sending url new requests and wait for the ones it is serving"""
+        return self.run(self.aclient.drain(url, timeout))
+
+    def resume(self, url: str):
+        self.run(self.aclient.resume(url))
+
+    def get_stats(self) -> Dict:
+        return self.aclient.get_stats()
@@ -3,40 +3,135 @@ Photo Analysis Module
 Main analysis functions
 """
 
-from typing import Dict, List
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional
+from src.conversation import ConversationStore
+from src.image_pipeline import image_facts
 from src.rag_pipeline import PhotoAnalyzer, PhotographyKnowledgeBase
 
 
 class PhotographyCoach(PhotoAnalyzer):
     """Photography Coach - extends PhotoAnalyzer with coaching features"""
-    
-    def __init__(self):
-        super().__init__()
+
+    def __init__(self, llm_client=None, max_workers: int = 4,
+                 aspect_timeout: Optional[float] = None, batched: Optional[bool] = None):
+        super().__init__(llm_client)
         self.kb = PhotographyKnowledgeBase()
-    
-    def get_coaching_feedback(self, photo_description: str) -> Dict:
-        """Get comprehensive coaching feedback"""
-        
-        feedback = {
-            "composition": self.analyze_composition(photo_description),
-            "lighting": self.analyze_lighting(photo_description),
-            "storytelling": self.analyze_storytelling(photo_description),
-            "technical": self.analyze_technical(photo_description),
+        self.max_workers = max_workers
+        if aspect_timeout is None:
+            aspect_timeout = float(os.getenv("COACH_ASPECT_TIMEOUT", "90"))
+        self.aspect_timeout = aspect_timeout
+        # One combined prompt suits CPU-bound backends that can't run aspects in parallel
+        if batched is None:
+            batched = os.getenv("COACH_BATCHED_ASPECTS", "0") == "1"
+        self.batched = batched
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._conversations: Optional[ConversationStore] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="coach-aspect"
+            )
+        return self._executor
+
+    def get_coaching_feedback(self, photo_description: str,
+                              aspects: Optional[List[str]] = None,
+                              batched: Optional[bool] = None,
+                              image: Optional[Dict] = None) -> Dict:
+        """Get comprehensive coaching feedback
+
+        Aspects run concurrently; one that fails or exceeds aspect_timeout
+        is reported with status "error"/"timeout" while the others return.
+        The aspect's model request carries the same timeout, so it is
+        abandoned rather than left holding a worker.
+        image is an ingest_image() result whose EXIF and measured metrics
+        are added to the prompts of the aspects they concern.
+        """
+        aspects = list(aspects or self.ASPECTS)
+        batched = self.batched if batched is None else batched
+
+        if batched:
+            try:
+                return self.analyze_aspects_batched(photo_description, aspects, image_facts(image))
+            except Exception as e:
+                return {aspect: {"status": "error", "error": str(e)} for aspect in aspects}
+
+        executor = self._get_executor()
+        # Each task runs in a copy of the caller's context so its spans land in the request trace
+        futures = {
+            aspect: executor.submit(contextvars.copy_context().run,
+                                    getattr(self, f"analyze_{aspect}"), photo_description, image=image)
+            for aspect in aspects
         }
-        
+        wait(futures.values(), timeout=self.aspect_timeout)
+
+        feedback = {}
+        for aspect, future in futures.items():
+            if not future.done():
+                future.cancel()
+                feedback[aspect] = {"status": "timeout"}
+            elif future.exception() is not None:
+                feedback[aspect] = {"status": "error", "error": str(future.exception())}
+            else:
+                feedback[aspect] = future.result()
+
         return feedback
-    
-    def analyze_technical(self, photo_description: str) -> Dict:
-        """Analyze technical aspects"""
-        # TODO: Implement RAG + LLM analysis (Day 2)
-        return {"status": "coming_day_2"}
-    
-    def get_improvement_suggestions(self, photo_description: str) -> List[str]:
-        """Get specific improvement suggestions"""
-        # TODO: Implement (Day 2)
-        return ["Suggestions coming day 2"]
-    
-    def rate_photo(self, photo_description: str) -> int:
-        """Rate photo from 1-10"""
-        # TODO: Implement (Day 2)
-        return 0
+
+    def analyze_technical(self, photo_description: str, image: Optional[Dict] = None) -> Dict:
+        """Analyze technical aspects, grounded in EXIF and metrics when an image is given"""
+        return self._analyze_aspect("technical", photo_description, image_facts(image, "technical"))
+
+    def get_improvement_suggestions(self, photo_description: str, image: Optional[Dict] = None,
+                                    analysis: Optional[Dict] = None) -> List[str]:
+        """Get specific improvement suggestions from the structured analysis
+
+        Pass an analysis already at hand (get_full_analysis() or
+        get_tiered_analysis()) to reuse it instead of asking the model again.
+        """
+        if self.llm is None:
+            return ["Suggestions coming day 2"]
+        if analysis is None:
+            analysis = self.get_full_analysis(photo_description, image=image)
+        return [suggestion for aspect in self.ASPECTS if analysis.get(aspect, {}).get("status") == "ok"
+                for suggestion in analysis[aspect]["suggestions"]]
+
+    def rate_photo(self, photo_description: str, image: Optional[Dict] = None,
+                   analysis: Optional[Dict] = None) -> int:
+        """Rate photo from 1-10 (0 when no rating could be produced), reusing analysis if given"""
+        if self.llm is None:
+            return 0
+        if analysis is None:
+            analysis = self.get_full_analysis(photo_description, image=image)
+        return analysis["overall_rating"]
+
+    @property
+    def conversations(self) -> ConversationStore:
+        """Follow-up conversations, sharing this coach's model client and prompt budget"""
+        if self._conversations is None:
+            self._conversations = ConversationStore.from_env(self.llm, self.prompts)
+        return self._conversations
+
+    def start_conversation(self, session_id: str, photo_description: str,
+                           image: Optional[Dict] = None) -> Iterator[str]:
+        """Stream a first analysis that later follow_up() calls continue from"""
+        facts = image_facts(image)
+        if facts:
+            photo_description += "\n\n" + "\n".join(facts)
+        return self.conversations.start(session_id, photo_description)
+
+    def follow_up(self, session_id: str, question: str) -> Iterator[str]:
+        """Stream the answer to a follow-up question about the session's photo
+
+        Only the question is sent while the model context from the previous
+        turn is held; otherwise a short summary of the conversation is.
+        """
+        return self.conversations.ask(session_id, question)
+
+    def close(self):
+        """Shut down the aspect worker pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,345 @@
+"""
+Portfolio History
+Append-only SQLite store of past analyses with monthly score aggregates for progress views
+"""
+
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from src.telemetry import registry
+from src.utils import get_project_root
+
+
+OVERALL = "overall"
+
+_RATING_TEXT = re.compile(r"(\d+(?:\.\d+)?)\s*/\s*10\b")
+_STOP = object()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    description TEXT NOT NULL,
+    feedback TEXT NOT NULL,
+    model TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_user_time ON analyses (user_id, created_at);
+
+CREATE TABLE IF NOT EXISTS scores (
+    analysis_id INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    aspect TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    rating INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_analysis ON scores (analysis_id);
+CREATE INDEX IF NOT EXISTS scores_user_aspect_time ON scores (user_id, aspect, created_at);
+CREATE INDEX IF NOT EXISTS scores_user_aspect_rating ON scores (user_id, aspect, rating);
+
+CREATE TABLE IF NOT EXISTS monthly_scores (
+    user_id TEXT NOT NULL,
+    aspect TEXT NOT NULL,
+    month TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    rating_sum INTEGER NOT NULL,
+    rating_min INTEGER NOT NULL,
+    rating_max INTEGER NOT NULL,
+    PRIMARY KEY (user_id, aspect, month)
+) WITHOUT ROWID;
+"""
+
+_UPSERT_MONTH = """
+    INSERT INTO monthly_scores VALUES (?, ?, ?, 1, ?, ?, ?)
+    ON CONFLICT (user_id, aspect, month) DO UPDATE SET
+        count = count + 1,
+        rating_sum = rating_sum + excluded.rating_sum,
+        rating_min = MIN(rating_min, excluded.rating_min),
+        rating_max = MAX(rating_max, excluded.rating_max)
+"""
+
+
+def month_of(timestamp: float) -> str:
+    """UTC calendar month of a timestamp, as YYYY-MM"""
+    return time.strftime("%Y-%m", time.gmtime(timestamp))
+
+
+def recent_months(months: int, now: Optional[float] = None) -> List[str]:
+    """The last `months` calendar months up to and including now's, oldest first"""
+    year, month = time.gmtime(time.time() if now is None else now)[:2]
+    keys = []
+    for _ in range(months):
+        keys.append(f"{year:04d}-{month:02d}")
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return keys[::-1]
+
+
+def ratings_from_analysis(analysis: Dict) -> Dict[str, int]:
+    """Aspect ratings from a structured analysis, plus the overall rating"""
+    ratings = {aspect: result["rating"] for aspect, result in analysis.items()
+               if isinstance(result, dict) and result.get("status") == "ok" and "rating" in result}
+    if analysis.get("overall_rating"):
+        ratings[OVERALL] = int(analysis["overall_rating"])
+    return ratings
+
+
+def history_analysis(analysis: Dict, escalated: Sequence[str] = ()) -> Optional[Dict]:
+    """The part of a structured analysis worth keeping in history, or None
+
+    Failed aspects are left out and the overall rating is taken from the
+    rest. If every aspect sent to the model failed, nothing is kept: the
+    fast tier's aspects alone would skew progress().
+    """
+    from src.structured_output import overall_rating
+
+    ok = {aspect: result for aspect, result in analysis.items()
+          if isinstance(result, dict) and result.get("status") == "ok"}
+    if not ok or (escalated and not any(aspect in ok for aspect in escalated)):
+        return None
+    return {**ok, "overall_rating": overall_rating(ok)}
+
+
+def ratings_from_text(feedback: str) -> Dict[str, int]:
+    """The overall "X/10" rating from free-text feedback, if it gives one"""
+    matches = _RATING_TEXT.findall(feedback)
+    if not matches:
+        return {}
+    return {OVERALL: int(min(10, max(1, round(float(matches[-1])))))}
+
+
+class PortfolioStore:
+    """Per-user history of analyses and their ratings, for tracking progress
+
+    record() only queues the analysis: a background thread appends queued
+    analyses in batches, one transaction each, so the request path never
+    waits on disk. If the queue is full the analysis is dropped rather than
+    blocking. Each transaction also folds the ratings into monthly_scores
+    (count, sum, min and max per user, aspect and month), so progress() reads
+    at most one row per aspect and month however long the history grows.
+    Rows are never updated or deleted; rebuild_aggregates() recomputes the
+    monthly table from the raw scores.
+    """
+
+    def __init__(self, db_path: Path, max_pending: int = 1024, batch_size: int = 64):
+        self.db_path = Path(db_path)
+        self.batch_size = batch_size
+        self.stats = {"recorded": 0, "written": 0, "dropped": 0}
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        self._writer.commit()
+        self._reader = self._connect()
+        self._thread = threading.Thread(target=self._write_loop, name="portfolio-writer", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls) -> "PortfolioStore":
+        db_path = os.getenv("PORTFOLIO_DB") or str(get_project_root() / "data" / "portfolio.sqlite3")
+        return cls(db_path, max_pending=int(os.getenv("PORTFOLIO_MAX_PENDING", "1024")))
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30.0)
+        # WAL lets page loads read while the writer appends
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def record(self, user_id: str, description: str, ratings: Dict[str, int], feedback: str = "",
+               model: str = "", created_at: Optional[float] = None) -> bool:
+        """Queue an analysis for writing; False if it was dropped because the queue is full"""
+        item = (user_id, time.time() if created_at is None else created_at, description, feedback, model,
+                {aspect: int(rating) for aspect, rating in ratings.items()})
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.stats["dropped"] += 1
+            registry.counter("portfolio_dropped_total", "Analyses not saved to history (queue full)").inc()
+            print("⚠️ Portfolio history queue is full; analysis not saved")
+            return False
+        with self._lock:
+            self.stats["recorded"] += 1
+        return True
+
+    def flush(self):
+        """Block until every queued analysis has been written"""
+        self._queue.join()
+
+    def close(self):
+        """Write what is queued, then stop the writer and close the database"""
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._writer.close()
+        with self._lock:
+            self._reader.close()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not _STOP and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            items = [item for item in batch if item is not _STOP]
+            try:
+                if items:
+                    self._write(items)
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not save portfolio history: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(items) < len(batch):
+                return
+
+    def _write(self, items: List[tuple]):
+        with self._write_lock, self._writer:
+            for user_id, created_at, description, feedback, model, ratings in items:
+                cursor = self._writer.execute(
+                    "INSERT INTO analyses (user_id, created_at, description, feedback, model) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (user_id, created_at, description, feedback, model),
+                )
+                month = month_of(created_at)
+                self._writer.executemany(
+                    "INSERT INTO scores VALUES (?, ?, ?, ?, ?)",
+                    [(cursor.lastrowid, user_id, aspect, created_at, rating) for aspect, rating in ratings.items()],
+                )
+                self._writer.executemany(
+                    _UPSERT_MONTH,
+                    [(user_id, aspect, month, rating, rating, rating) for aspect, rating in ratings.items()],
+                )
+        with self._lock:
+            self.stats["written"] += len(items)
+        registry.counter("portfolio_writes_total", "Analyses appended to history").inc(len(items))
+
+    def rebuild_aggregates(self):
+        """Recompute monthly_scores from the raw scores (after an import or a crash mid-migration)"""
+        self.flush()
+        with self._write_lock, self._writer:
+            self._writer.execute("DELETE FROM monthly_scores")
+            self._writer.execute("""
+                INSERT INTO monthly_scores
+                SELECT user_id, aspect, strftime('%Y-%m', created_at, 'unixepoch'),
+                       COUNT(*), SUM(rating), MIN(rating), MAX(rating)
+                FROM scores GROUP BY 1, 2, 3
+            """)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _query(self, sql: str, params: Sequence) -> List[tuple]:
+        with self._lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    def progress(self, user_id: str, months: int = 6, aspects: Optional[Sequence[str]] = None,
+                 now: Optional[float] = None) -> Dict[str, Dict]:
+        """Monthly mean ratings per aspect over the last `months` months
+
+        Returns {aspect: {"months": [{"month", "count", "mean"}, ...],
+        "count": n, "mean": m}} with every month in the window listed, oldest
+        first (count 0 and mean None where there were no analyses).
+        """
+        keys = recent_months(months, now)
+        rows = self._query(
+            "SELECT aspect, month, count, rating_sum FROM monthly_scores "
+            "WHERE user_id = ? AND month >= ? AND month <= ?",
+            (user_id, keys[0], keys[-1]),
+        )
+        by_aspect: Dict[str, Dict[str, tuple]] = {}
+        for aspect, month, count, total in rows:
+            by_aspect.setdefault(aspect, {})[month] = (count, total)
+
+        result = {}
+        for aspect in (aspects if aspects is not None else sorted(by_aspect)):
+            monthly = by_aspect.get(aspect, {})
+            count = sum(c for c, _ in monthly.values())
+            total = sum(t for _, t in monthly.values())
+            result[aspect] = {
+                "months": [{"month": key, "count": monthly.get(key, (0, 0))[0],
+                            "mean": round(monthly[key][1] / monthly[key][0], 2) if key in monthly else None}
+                           for key in keys],
+                "count": count,
+                "mean": round(total / count, 2) if count else None,
+            }
+        return result
+
+    def history(self, user_id: str, limit: int = 20, before: Optional[float] = None) -> List[Dict]:
+        """The user's most recent analyses with their ratings, newest first
+
+        Pass the created_at of the last row seen as `before` for the next page.
+        """
+        rows = self._query(
+            "SELECT id, created_at, description, feedback, model FROM analyses "
+            "WHERE user_id = ? AND created_at < ? ORDER BY created_at DESC LIMIT ?",
+            (user_id, float("inf") if before is None else before, limit),
+        )
+        return self._with_ratings(rows)
+
+    def best(self, user_id: str, aspect: str = OVERALL, limit: int = 5) -> List[Dict]:
+        """The user's highest-rated analyses for one aspect, most recent first among ties"""
+        ids = [row[0] for row in self._query(
+            "SELECT analysis_id FROM scores WHERE user_id = ? AND aspect = ? "
+            "ORDER BY rating DESC, created_at DESC LIMIT ?",
+            (user_id, aspect, limit),
+        )]
+        if not ids:
+            return []
+        rows = self._query(
+            f"SELECT id, created_at, description, feedback, model FROM analyses "
+            f"WHERE id IN ({','.join('?' * len(ids))})",
+            ids,
+        )
+        order = {analysis_id: i for i, analysis_id in enumerate(ids)}
+        return self._with_ratings(sorted(rows, key=lambda row: order[row[0]]))
+
+    def _with_ratings(self, rows: List[tuple]) -> List[Dict]:
+        if not rows:
+            return []
+        ratings: Dict[int, Dict[str, int]] = {}
+        for analysis_id, aspect, rating in self._query(
+            f"SELECT analysis_id, aspect, rating FROM scores "
+            f"WHERE analysis_id IN ({','.join('?' * len(rows))})",
+            [row[0] for row in rows],
+        ):
+            ratings.setdefault(analysis_id, {})[aspect] = rating
+        return [{"id": analysis_id, "created_at": created_at, "description": description,
+                 "feedback": feedback, "model": model, "ratings": ratings.get(analysis_id, {})}
+                for analysis_id, created_at, description, feedback, model in rows]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["pending"] = self._queue.qsize()
+        return stats
+
+
+_portfolio_store: Optional[PortfolioStore] = None
+_portfolio_store_lock = threading.Lock()
+
+
+def get_portfolio_store() -> Optional[PortfolioStore]:
+    """Process-wide history store configured from PORTFOLIO_* settings (None if disabled)"""
+    global _portfolio_store
+    if os.getenv("PORTFOLIO", "1") == "0":
+        return None
+    with _portfolio_store_lock:
+        if _portfolio_store is None:
+            _portfolio_store = PortfolioStore.from_env()
+        return _portfolio_store
@@ -0,0 +1,202 @@
+"""
+Prompt Builder
+Token-budgeted prompt assembly with a stable, cacheable system prefix
+"""
+
+import math
+import os
+import re
+from typing import Callable, Dict, List, Optional
+
+
+# Instructions live in the system message and never change between requests,
+# so Ollama can reuse the KV cache for this prefix instead of re-prefilling it.
+# Anything request-specific (knowledge, photo, aspect name) goes after it.
+FEEDBACK_SYSTEM = """You are a photography expert giving feedback on a photo.
+Use the PRINCIPLES provided when they apply. Provide brief feedback on:
+- Composition (what works, what to improve)
+- Lighting (quality and tips)
+- Rating (X/10) with one key improvement
+
+Keep it concise and specific."""
+
+ASPECT_SYSTEM = """You are a photography expert analyzing one aspect of a photo.
+Use the PRINCIPLES provided and any MEASURED FACTS, which are exact.
+Give what works, what to improve and one specific suggestion. Keep it concise."""
+
+BATCHED_SYSTEM = """You are a photography expert analyzing several aspects of a photo.
+Use the PRINCIPLES provided and any MEASURED FACTS, which are exact.
+For each aspect give what works, what to improve and one specific suggestion.
+Answer with exactly the markdown headings requested, in order."""
+
+STRUCTURED_SYSTEM = """You are a photography expert analyzing several aspects of a photo.
+Use the PRINCIPLES provided and any MEASURED FACTS, which are exact.
+Answer in JSON only: one object per requested aspect, in order, each with
+"strengths", "improvements" and "suggestions" (lists of short, specific
+sentences) and "rating" (an integer from 1 to 10)."""
+
+FOLLOW_UP_SYSTEM = """You are a photography expert answering follow-up questions about a photo
+you have already reviewed. The SUMMARY recalls the photo, your analysis and the
+conversation so far. Answer the QUESTION briefly and specifically."""
+
+# Chat-template tokens added around each message by the model
+MESSAGE_OVERHEAD = 4
+# The photo description is never cut below this many characters
+MIN_DESCRIPTION_CHARS = 200
+
+_TOKEN_PIECES = re.compile(r"[A-Za-z]+|\d|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Conservative token count for Llama-family BPE vocabularies
+
+    Takes the larger of one token per word/digit/symbol and one per 3.5
+    characters, which over-counts English prose slightly rather than under.
+    """
+    if not text:
+        return 0
+    return max(len(_TOKEN_PIECES.findall(text)), math.ceil(len(text) / 3.5))
+
+
+class Prompt:
+    """Chat messages plus the token accounting used to build them"""
+
+    def __init__(self, messages: List[Dict], tokens: int, budget: int,
+                 sources: List[Dict], options: Dict):
+        self.messages = messages
+        self.tokens = tokens
+        self.budget = budget
+        self.sources = sources
+        self.options = options
+
+    @property
+    def system(self) -> str:
+        return self.messages[0]["content"]
+
+    @property
+    def user(self) -> str:
+        return self.messages[-1]["content"]
+
+
+class PromptBuilder:
+    """Fit retrieved knowledge into the model's context window
+
+    The input budget is the context window minus the tokens reserved for
+    the answer. Knowledge chunks are taken round-robin across aspects in
+    descending score order, so every aspect gets its best chunk before any
+    aspect gets a second, and chunks that would overflow are skipped. At
+    most max_chunks_per_aspect are used even when more would fit, since
+    every extra token is prefill time on a CPU-bound model.
+    """
+
+    def __init__(self, context_window: int = 4096, max_output_tokens: int = 512,
+                 max_chunks_per_aspect: int = 3,
+                 count_tokens: Callable[[str], int] = estimate_tokens):
+        if max_output_tokens >= context_window:
+            raise ValueError("max_output_tokens must be smaller than context_window")
+        self.context_window = context_window
+        self.max_output_tokens = max_output_tokens
+        self.max_chunks_per_aspect = max_chunks_per_aspect
+        self.count_tokens = count_tokens
+
+    @classmethod
+    def from_env(cls) -> "PromptBuilder":
+        """Builder sized from OLLAMA_NUM_CTX, OLLAMA_NUM_PREDICT and PROMPT_MAX_CHUNKS"""
+        return cls(
+            context_window=int(os.getenv("OLLAMA_NUM_CTX", "4096")),
+            max_output_tokens=int(os.getenv("OLLAMA_NUM_PREDICT", "512")),
+            max_chunks_per_aspect=int(os.getenv("PROMPT_MAX_CHUNKS", "3")),
+        )
+
+    @property
+    def input_budget(self) -> int:
+        return self.context_window - self.max_output_tokens
+
+    @property
+    def options(self) -> Dict:
+        # A constant num_ctx matters: changing it between requests makes
+        # Ollama reload the model and discard its KV cache.
+        return {"num_ctx": self.context_window, "num_predict": self.max_output_tokens}
+
+    def count_messages(self, messages: List[Dict]) -> int:
+        return sum(self.count_tokens(m["content"]) + MESSAGE_OVERHEAD for m in messages)
+
+    @staticmethod
+    def _render_user(knowledge: Dict[str, List[Dict]], description: str,
+                     facts: Optional[List[str]], instruction: str) -> str:
+        parts = []
+        if any(knowledge.values()):
+            blocks = [
+                f"{aspect.upper()}:\n" + "\n\n".join(c["text"].strip() for c in chunks)
+                for aspect, chunks in knowledge.items() if chunks
+            ]
+            parts.append("PRINCIPLES:\n" + "\n\n".join(blocks))
+        parts.append(f"PHOTO: {description}")
+        if facts:
+            parts.append("MEASURED FACTS:\n" + "\n".join(f"- {fact}" for fact in facts))
+        if instruction:
+            parts.append(instruction)
+        return "\n\n".join(parts)
+
+    def _fit_description(self, system: str, description: str,
+                         facts: Optional[List[str]], instruction: str) -> str:
+        """Trim an oversized description so the prompt without knowledge fits"""
+        while True:
+            messages = [{"role": "system", "content": system},
+                        {"role": "user", "content": self._render_user({}, description, facts, instruction)}]
+            over = self.count_messages(messages) - self.input_budget
+            if over <= 0 or len(description) <= MIN_DESCRIPTION_CHARS:
+                return description
+            keep = max(MIN_DESCRIPTION_CHARS, len(description) - math.ceil(over * 4) - 16)
+            description = description[:keep].rsplit(" ", 1)[0] + " …"
+
+    def build(self, system: str, photo_description: str,
+              candidates: Optional[Dict[str, List[Dict]]] = None,
+              facts: Optional[List[str]] = None, instruction: str = "") -> Prompt:
+        """Assemble system + user messages within the input budget
+
+        candidates maps aspect -> retrieved chunks (dicts with "text" and
+        optionally "score"), best first.
+        """
+        candidates = candidates or {}
+        description = self._fit_description(system, photo_description.strip(), facts, instruction)
+        system_message = {"role": "system", "content": system}
+
+        def render(selected: Dict[str, List[Dict]]) -> List[Dict]:
+            return [system_message,
+                    {"role": "user", "content": self._render_user(selected, description, facts, instruction)}]
+
+        selected: Dict[str, List[Dict]] = {aspect: [] for aspect in candidates}
+        remaining = {aspect: list(chunks) for aspect, chunks in candidates.items()}
+        used = self.count_messages(render(selected))
+        seen = set()
+        progress = True
+        while progress:
+            progress = False
+            for aspect, pool in remaining.items():
+                while pool and len(selected[aspect]) < self.max_chunks_per_aspect:
+                    chunk = pool.pop(0)
+                    key = chunk.get("id", chunk["text"])
+                    if key in seen:
+                        continue
+                    # +8 covers the section heading and separators added with the chunk
+                    cost = self.count_tokens(chunk["text"]) + 8
+                    if used + cost <= self.input_budget:
+                        selected[aspect].append(chunk)
+                        seen.add(key)
+                        used += cost
+                        progress = True
+                        break
+
+        # Token counts are not strictly additive; drop the weakest chunks until it fits
+        messages = render(selected)
+        tokens = self.count_messages(messages)
+        while tokens > self.input_budget and any(selected.values()):
+            aspect, chunks = min(((a, c) for a, c in selected.items() if c),
+                                 key=lambda item: item[1][-1].get("score", 0.0))
+            chunks.pop()
+            messages = render(selected)
+            tokens = self.count_messages(messages)
+
+        sources = [chunk for chunks in selected.values() for chunk in chunks]
+        return Prompt(messages, tokens, self.input_budget, sources, self.options)
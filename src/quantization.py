@@ -0,0 +1,171 @@
+"""
+Vector Quantization
+Compact float16, int8 and product-quantized codes for the knowledge index
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+
+# Rows scored per block, so decoding never materializes a full float32 copy
+SCORE_BLOCK_ROWS = 16_384
+
+
+class Float16Codec:
+    """Half-precision copy of the vectors: 2 bytes per dimension"""
+
+    name = "float16"
+    row_axis = 0
+
+    def fit(self, vectors: np.ndarray) -> "Float16Codec":
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.asarray(vectors, dtype=np.float16)
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        out = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+            block = codes[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            out[:, start:start + len(block)] = queries @ block.T
+        return out
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> "Float16Codec":
+        return cls()
+
+
+class Int8Codec:
+    """Per-dimension affine scalar quantization: 1 byte per dimension
+
+    x ≈ offset + scale * code, so q·x = q·offset + (q * scale)·code and the
+    scan runs directly on the codes without decoding them.
+    """
+
+    name = "int8"
+    row_axis = 0
+
+    def __init__(self, offset: Optional[np.ndarray] = None, scale: Optional[np.ndarray] = None):
+        self.offset = offset
+        self.scale = scale
+
+    def fit(self, vectors: np.ndarray) -> "Int8Codec":
+        low = vectors.min(axis=0).astype(np.float32)
+        high = vectors.max(axis=0).astype(np.float32)
+        self.offset = low
+        self.scale = np.maximum(high - low, 1e-12) / 255
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.empty(vectors.shape, dtype=np.uint8)
+        for start in range(0, len(vectors), SCORE_BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+            codes[start:start + len(block)] = np.clip(np.rint((block - self.offset) / self.scale), 0, 255)
+        return codes
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        bias = queries @ self.offset
+        scaled = queries * self.scale
+        out = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+            block = codes[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            out[:, start:start + len(block)] = scaled @ block.T
+        return out + bias[:, None]
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"offset": self.offset, "scale": self.scale}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> "Int8Codec":
+        return cls(state["offset"], state["scale"])
+
+
+def _nearest(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    distances = (centroids ** 2).sum(axis=1) - 2 * x @ centroids.T
+    return distances.argmin(axis=1)
+
+
+def _kmeans(x: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest(x, centroids)
+        counts = np.bincount(assign, minlength=k)
+        filled = counts > 0  # empty clusters keep their previous centroid
+        for d in range(x.shape[1]):
+            sums = np.bincount(assign, weights=x[:, d], minlength=k)
+            centroids[filled, d] = sums[filled] / counts[filled]
+    return centroids
+
+
+class ProductQuantizer:
+    """Product quantization: one byte per sub-vector of sub_dim dimensions
+
+    Each vector is split into m sub-vectors, each replaced by the id of its
+    nearest centroid in a per-subspace codebook of up to 256 entries
+    (trained with k-means on a sample). Scores are looked up per query from
+    an (m, 256) table of sub-vector inner products, so the scan touches
+    only the m-byte codes. Codes are stored subspace-major, (m, n), which
+    keeps each table lookup pass sequential in memory.
+    """
+
+    name = "pq"
+    row_axis = 1
+
+    def __init__(self, sub_dim: int = 8, train_size: int = 16_384, iterations: int = 12, seed: int = 0,
+                 centroids: Optional[np.ndarray] = None):
+        self.sub_dim = sub_dim
+        self.train_size = train_size
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids = centroids  # (m, ksub, sub_dim)
+
+    def fit(self, vectors: np.ndarray) -> "ProductQuantizer":
+        n, dim = vectors.shape
+        if dim % self.sub_dim:
+            raise ValueError(f"Dimension {dim} is not divisible by sub_dim {self.sub_dim}")
+        rng = np.random.default_rng(self.seed)
+        sample_rows = np.sort(rng.choice(n, min(n, self.train_size), replace=False))
+        sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+        ksub = min(256, len(sample))
+        m = dim // self.sub_dim
+        self.centroids = np.stack([
+            _kmeans(np.ascontiguousarray(sample[:, j * self.sub_dim:(j + 1) * self.sub_dim]),
+                    ksub, self.iterations, rng)
+            for j in range(m)
+        ]).astype(np.float32)
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        m = len(self.centroids)
+        codes = np.empty((m, len(vectors)), dtype=np.uint8)
+        for start in range(0, len(vectors), SCORE_BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+            for j in range(m):
+                sub = block[:, j * self.sub_dim:(j + 1) * self.sub_dim]
+                codes[j, start:start + len(block)] = _nearest(sub, self.centroids[j])
+        return codes
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        m = len(self.centroids)
+        # lookup[q, j, c] = <query q's j-th sub-vector, centroid c of subspace j>
+        lookup = np.einsum("qjd,jcd->qjc", queries.reshape(len(queries), m, self.sub_dim), self.centroids)
+        out = np.zeros((len(queries), codes.shape[1]), dtype=np.float32)
+        for q in range(len(queries)):
+            for j in range(m):
+                out[q] += lookup[q, j][codes[j]]
+        return out
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"centroids": self.centroids}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, np.ndarray]) -> "ProductQuantizer":
+        centroids = state["centroids"]
+        return cls(sub_dim=centroids.shape[2], centroids=centroids)
+
+
+CODECS = {codec.name: codec for codec in (Float16Codec, Int8Codec, ProductQuantizer)}
@@ -3,13 +3,38 @@ RAG Pipeline for Photography Knowledge Base
 Day 1: Foundation & Structure
 """
 
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional, Tuple
 from pathlib import Path
+import json
+import os
+import re
+import threading
+import time
+
+from src.fast_tier import FastTier
+from src.image_pipeline import image_facts
+from src.prompt_builder import ASPECT_SYSTEM, BATCHED_SYSTEM, STRUCTURED_SYSTEM, PromptBuilder
+from src.structured_output import (
+    IncrementalJSONParser, StructuredOutputError, analysis_schema, aspect_schema,
+    overall_rating, repair_json, validate_aspect,
+)
+from src.telemetry import record_llm_usage, record_span, registry, span
+from src.utils import get_project_root
+
+
+# Each ranking fused in hybrid search is this many times deeper than k
+FUSION_DEPTH_FACTOR = 5
 
 
 class PhotographyKnowledgeBase:
     """Photography knowledge base for RAG system"""
     
+    SECTIONS = ("composition", "lighting", "storytelling", "technical")
+    
+    _vector_store = None
+    _indexes: Dict[str, object] = {}
+    _lock = threading.RLock()
+    
     COMPOSITION_KNOWLEDGE = """
     COMPOSITION PRINCIPLES:
     
@@ -210,30 +235,375 @@ class PhotographyKnowledgeBase:
     def get_technical_knowledge(cls) -> str:
         """Return technical knowledge only"""
         return cls.TECHNICAL_KNOWLEDGE
+    
+    @classmethod
+    def get_section_knowledge(cls, section: str) -> str:
+        """Return knowledge for one section by name"""
+        if section not in cls.SECTIONS:
+            raise ValueError(f"Unknown section: {section}")
+        return getattr(cls, f"{section.upper()}_KNOWLEDGE")
+    
+    @classmethod
+    def get_chunks(cls) -> List[Dict]:
+        """Split every section into subsection-sized chunks"""
+        from src.vector_store import chunk_section
+        
+        chunks = []
+        for section in cls.SECTIONS:
+            chunks.extend(chunk_section(section, cls.get_section_knowledge(section)))
+        return chunks
+    
+    @staticmethod
+    def get_store_dir() -> Path:
+        """Directory holding the persisted knowledge index"""
+        return get_project_root() / "data" / "vector_stores" / "knowledge"
+    
+    @classmethod
+    def get_vector_store(cls, embedder=None, store_dir: Optional[Path] = None,
+                         textbook_dir: Optional[Path] = None):
+        """Return the embedded knowledge index, re-embedding only what changed
+        
+        The index holds the built-in sections plus any textbooks under
+        data/textbooks (see src.ingestion); only new or modified files are
+        embedded when it is opened.
+        """
+        with cls._lock:
+            if cls._vector_store is None or embedder is not None or store_dir is not None:
+                from src.embedding_service import get_embedding_service
+                from src.ingestion import builtin_source, sync_store, textbook_sources
+                
+                # The service micro-batches concurrent query embeddings
+                embedder = embedder or get_embedding_service()
+                sources = [builtin_source(cls.get_chunks())] + textbook_sources(textbook_dir)
+                cls._vector_store, _ = sync_store(store_dir or cls.get_store_dir(), sources, embedder)
+                cls._indexes = {}
+            return cls._vector_store
+    
+    @classmethod
+    def get_index(cls, backend: Optional[str] = None):
+        """Return the search index over the knowledge vectors for a backend"""
+        from src.vector_index import build_index
+        
+        with cls._lock:
+            store = cls.get_vector_store()
+            key = backend or "default"
+            if key not in cls._indexes:
+                cls._indexes[key] = build_index(store.vectors, backend, cache_dir=store.directory,
+                                                cache_key=store.content_hash)
+            return cls._indexes[key]
+    
+    @classmethod
+    def get_keyword_index(cls):
+        """Return the BM25 index over the same chunks as the vector store"""
+        from src.keyword_index import BM25Index
+        
+        with cls._lock:
+            store = cls.get_vector_store()
+            if "bm25" not in cls._indexes:
+                cls._indexes["bm25"] = BM25Index.load_or_build(store.chunks, cache_dir=store.directory,
+                                                               cache_key=store.content_hash)
+            return cls._indexes["bm25"]
+    
+    @classmethod
+    def search(cls, query: str, k: int = 4, section: Optional[str] = None,
+               backend: Optional[str] = None, mode: Optional[str] = None) -> List[Dict]:
+        """Return the k chunks most relevant to query, optionally within one section
+        
+        mode (RETRIEVAL_MODE, default "hybrid") is "vector", "keyword" or
+        "hybrid": BM25 and vector rankings fused by reciprocal rank. A short
+        query whose top BM25 hit contains every term (e.g. "f/2.8 bokeh") is
+        answered from the keyword index alone, skipping the embedding call.
+        """
+        if section is not None and section not in cls.SECTIONS:
+            raise ValueError(f"Unknown section: {section}")
+        mode = mode or os.getenv("RETRIEVAL_MODE", "hybrid")
+        if mode not in ("vector", "keyword", "hybrid"):
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+        
+        store = cls.get_vector_store()
+        rows = store.section_rows(section) if section else None
+        if mode == "vector":
+            index = cls.get_index(backend)
+            with span("retrieval"):
+                query_vector = store.embedder.embed([query])[0]
+                scores, ids = index.search(query_vector, k, rows)
+            return [
+                {**store.chunks[i], "score": float(score)}
+                for score, i in zip(scores[0], ids[0])
+                if i >= 0
+            ]
+        
+        from src.keyword_index import KEYWORD_ONLY_MAX_TERMS, reciprocal_rank_fusion, tokenize
+        
+        keyword = cls.get_keyword_index()
+        fetch = max(k * FUSION_DEPTH_FACTOR, k)
+        with span("retrieval", mode=mode):
+            _, keyword_ids, coverage = keyword.search(query, fetch, rows)
+            obvious = (len(coverage) > 0 and coverage[0] == 1.0
+                       and len(set(tokenize(query))) <= KEYWORD_ONLY_MAX_TERMS)
+            rankings = [keyword_ids]
+            if mode == "hybrid" and not obvious:
+                query_vector = store.embedder.embed([query])[0]
+                _, ids = cls.get_index(backend).search(query_vector, fetch, rows)
+                rankings.insert(0, [i for i in ids[0] if i >= 0])
+            elif mode == "hybrid":
+                registry.counter("retrieval_embedding_skipped_total",
+                                 "Hybrid searches answered from the keyword index alone").inc()
+            fused = reciprocal_rank_fusion(rankings)[:k]
+        
+        return [{**store.chunks[i], "score": score} for i, score in fused]
 
 
 class PhotoAnalyzer:
     """Photo analysis using RAG"""
     
-    def __init__(self):
-        self.knowledge = PhotographyKnowledgeBase()
+    ASPECTS = PhotographyKnowledgeBase.SECTIONS
     
-    def analyze_composition(self, photo_description: str) -> Dict:
+    def __init__(self, llm_client=None, prompt_builder: Optional[PromptBuilder] = None):
+        self.knowledge = PhotographyKnowledgeBase()
+        self.llm = llm_client
+        self.prompts = prompt_builder or PromptBuilder.from_env()
+        # Bounds each aspect's model request, so a timed-out aspect frees its worker
+        self.aspect_timeout: Optional[float] = None
+        # Keyword rules answer the clear-cut aspects before any model call
+        self.fast_tier = FastTier.from_env(self.knowledge) if os.getenv("FAST_TIER", "1") == "1" else None
+    
+    def _retrieve(self, photo_description: str, aspect: str, k: int = 6) -> List[Dict]:
+        """Retrieve candidate knowledge chunks for one aspect, best first"""
+        return self.knowledge.search(photo_description, k=k, section=aspect)
+    
+    def _analyze_aspect(self, aspect: str, photo_description: str,
+                        facts: Optional[List[str]] = None) -> Dict:
+        """Run RAG + LLM analysis for a single aspect"""
+        if self.llm is None:
+            return {"status": "coming_day_2"}
+        
+        prompt = self.prompts.build(
+            ASPECT_SYSTEM, photo_description,
+            {aspect: self._retrieve(photo_description, aspect)}, facts,
+            instruction=f"Analyze the {aspect} of this photo.",
+        )
+        
+        with span("llm_generation", aspect=aspect):
+            response = self.llm.chat(prompt.messages, options=prompt.options, timeout=self.aspect_timeout)
+        record_llm_usage(response)
+        return {
+            "status": "ok",
+            "feedback": response["message"]["content"],
+            "sources": [c["title"] for c in prompt.sources],
+        }
+    
+    def analyze_aspects_batched(self, photo_description: str,
+                                aspects: Optional[List[str]] = None,
+                                facts: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Analyze several aspects with one combined prompt (one model round-trip)"""
+        aspects = list(aspects or self.ASPECTS)
+        if self.llm is None:
+            return {aspect: {"status": "coming_day_2"} for aspect in aspects}
+        
+        candidates = {aspect: self._retrieve(photo_description, aspect) for aspect in aspects}
+        headings = "\n".join(f"## {aspect.title()}" for aspect in aspects)
+        prompt = self.prompts.build(
+            BATCHED_SYSTEM, photo_description, candidates, facts,
+            instruction=f"Answer with these headings:\n{headings}",
+        )
+        
+        with span("llm_generation", aspect="batched"):
+            response = self.llm.chat(prompt.messages, options=prompt.options)
+        record_llm_usage(response)
+        sections = self._split_batched_response(response["message"]["content"])
+        
+        results = {}
+        for aspect in aspects:
+            if aspect in sections:
+                results[aspect] = {
+                    "status": "ok",
+                    "feedback": sections[aspect],
+                    "sources": [c["title"] for c in prompt.sources if c["section"] == aspect],
+                }
+            else:
+                results[aspect] = {"status": "error", "error": "missing from batched response"}
+        return results
+    
+    @staticmethod
+    def _split_batched_response(text: str) -> Dict[str, str]:
+        """Split a '## Aspect' headed response into {aspect: body}"""
+        sections = {}
+        parts = re.split(r"^#{1,6}\s*\**([A-Za-z]+)\**\s*:?\s*$", text, flags=re.MULTILINE)
+        for heading, body in zip(parts[1::2], parts[2::2]):
+            sections[heading.lower()] = body.strip()
+        return sections
+    
+    def analyze_composition(self, photo_description: str, image: Optional[Dict] = None) -> Dict:
         """Analyze photo composition"""
-        # TODO: Implement RAG + LLM analysis (Day 2)
-        return {"status": "coming_day_2"}
+        return self._analyze_aspect("composition", photo_description, image_facts(image, "composition"))
     
-    def analyze_lighting(self, photo_description: str) -> Dict:
+    def analyze_lighting(self, photo_description: str, image: Optional[Dict] = None) -> Dict:
         """Analyze lighting"""
-        # TODO: Implement RAG + LLM analysis (Day 2)
-        return {"status": "coming_day_2"}
+        return self._analyze_aspect("lighting", photo_description, image_facts(image, "lighting"))
     
-    def analyze_storytelling(self, photo_description: str) -> Dict:
+    def analyze_storytelling(self, photo_description: str, image: Optional[Dict] = None) -> Dict:
         """Analyze storytelling"""
-        # TODO: Implement RAG + LLM analysis (Day 2)
-        return {"status": "coming_day_2"}
-    
-    def get_full_analysis(self, photo_description: str) -> Dict:
-        """Get complete analysis"""
-        # TODO: Implement full pipeline (Day 2)
-        return {"status": "coming_day_2"}
+        return self._analyze_aspect("storytelling", photo_description, image_facts(image, "storytelling"))
+    
+    def _parse_member(self, aspect: str, raw: str) -> Dict:
+        """Validate one aspect's JSON, repairing only that fragment if needed"""
+        try:
+            return validate_aspect(json.loads(raw))
+        except ValueError:
+            pass
+        repairs = registry.counter("structured_repairs_total", "Malformed structured-output fragments repaired")
+        try:
+            data = validate_aspect(repair_json(raw))
+            repairs.inc(kind="local")
+            return data
+        except StructuredOutputError:
+            pass
+        
+        # Ask the model to fix just this fragment, not to redo the analysis
+        messages = [
+            {"role": "system", "content": STRUCTURED_SYSTEM},
+            {"role": "user", "content": f"This \"{aspect}\" object is malformed:\n{raw}\n\n"
+                                        "Return it corrected as JSON, keeping its content."},
+        ]
+        with span("llm_generation", aspect=f"{aspect}_repair"):
+            response = self.llm.chat(messages, options=self.prompts.options, format=aspect_schema())
+        record_llm_usage(response)
+        repairs.inc(kind="model")
+        return validate_aspect(repair_json(response["message"]["content"]))
+    
+    def _regenerate_aspect(self, aspect: str, photo_description: str,
+                           candidates: List[Dict], facts: Optional[List[str]]) -> Dict:
+        """Structured analysis of one aspect the combined answer left out"""
+        prompt = self.prompts.build(
+            STRUCTURED_SYSTEM, photo_description, {aspect: candidates}, facts,
+            instruction=f"Aspects, in order: {aspect}",
+        )
+        with span("llm_generation", aspect=aspect):
+            response = self.llm.chat(prompt.messages, options=prompt.options, format=analysis_schema([aspect]))
+        record_llm_usage(response)
+        registry.counter("structured_repairs_total").inc(kind="regenerated")
+        data = repair_json(response["message"]["content"])
+        return validate_aspect(data.get(aspect, data) if isinstance(data, dict) else data)
+    
+    def stream_full_analysis(self, photo_description: str, aspects: Optional[List[str]] = None,
+                             image: Optional[Dict] = None) -> Iterator[Tuple[str, Dict]]:
+        """Yield (aspect, result) as each aspect's JSON object closes in the stream
+        
+        One request, constrained to analysis_schema() through Ollama's
+        format option, covers every aspect. Results hold strengths,
+        improvements, suggestions (lists) and a 1-10 rating. A member that
+        does not parse is repaired on its own, and aspects missing from the
+        answer are regenerated one by one, so a slip in one aspect never
+        costs the whole generation. Failures yield status "error".
+        """
+        aspects = list(aspects or self.ASPECTS)
+        if self.llm is None:
+            for aspect in aspects:
+                yield aspect, {"status": "coming_day_2"}
+            return
+        
+        facts = image_facts(image)
+        candidates = {aspect: self._retrieve(photo_description, aspect) for aspect in aspects}
+        prompt = self.prompts.build(
+            STRUCTURED_SYSTEM, photo_description, candidates, facts,
+            instruction=f"Aspects, in order: {', '.join(aspects)}",
+        )
+        sources = {aspect: [c["title"] for c in prompt.sources if c["section"] == aspect] for aspect in aspects}
+        
+        def result(aspect: str, raw: str) -> Dict:
+            try:
+                return {"status": "ok", **self._parse_member(aspect, raw), "sources": sources[aspect]}
+            except Exception as e:
+                return {"status": "error", "error": str(e)}
+        
+        parser = IncrementalJSONParser()
+        done = set()
+        failure = None
+        waiting = 0.0  # model time only, not the consumer's rendering
+        stream = self.llm.chat_stream(prompt.messages, options=prompt.options, format=analysis_schema(aspects))
+        try:
+            while True:
+                tick = time.perf_counter()
+                chunk = next(stream, None)
+                waiting += time.perf_counter() - tick
+                if chunk is None:
+                    break
+                if chunk.get("done"):
+                    record_llm_usage(chunk)
+                for key, raw in parser.feed(chunk.get("message", {}).get("content", "")):
+                    if key in candidates and key not in done:
+                        done.add(key)
+                        yield key, result(key, raw)
+        except Exception as e:
+            failure = e
+        finally:
+            stream.close()
+            record_span("llm_generation", waiting, aspect="structured")
+        
+        for key, raw in parser.finish():
+            if key in candidates and key not in done and failure is None:
+                done.add(key)
+                yield key, result(key, raw)
+        for aspect in aspects:
+            if aspect in done:
+                continue
+            if failure is not None:
+                yield aspect, {"status": "error", "error": str(failure)}
+                continue
+            try:
+                data = self._regenerate_aspect(aspect, photo_description, candidates[aspect],
+                                               image_facts(image, aspect))
+                yield aspect, {"status": "ok", **data, "sources": sources[aspect]}
+            except Exception as e:
+                yield aspect, {"status": "error", "error": str(e)}
+    
+    def get_full_analysis(self, photo_description: str, aspects: Optional[List[str]] = None,
+                          image: Optional[Dict] = None) -> Dict:
+        """Get complete structured analysis: {aspect: result, ..., "overall_rating": int}"""
+        if self.llm is None:
+            return {"status": "coming_day_2"}
+        analysis = dict(self.stream_full_analysis(photo_description, aspects, image))
+        analysis["overall_rating"] = overall_rating(analysis)
+        return analysis
+    
+    def fast_analysis(self, photo_description: str, aspects: Optional[List[str]] = None,
+                      image: Optional[Dict] = None, depth: bool = False) -> Dict[str, Dict]:
+        """The aspects the fast tier answers confidently: {aspect: result}
+        
+        Results have the structured fields plus "tier": "fast" and a
+        0-1 "confidence"; aspects it is unsure of are left out, as is
+        everything when depth is asked for.
+        """
+        if self.fast_tier is None:
+            return {}
+        if depth:
+            self.fast_tier.skip(len(aspects or self.ASPECTS))
+            return {}
+        text = "\n".join([photo_description] + image_facts(image))
+        results = self.fast_tier.analyze(text, list(aspects or self.ASPECTS))
+        return {aspect: result for aspect, result in results.items() if result["absorbed"]}
+    
+    def stream_tiered_analysis(self, photo_description: str, aspects: Optional[List[str]] = None,
+                               image: Optional[Dict] = None, depth: bool = False) -> Iterator[Tuple[str, Dict]]:
+        """Yield the fast tier's answers at once, then the model's for the aspects it left
+        
+        depth=True skips the fast tier, for when the user asks for a full
+        model analysis. Model results are tagged "tier": "model".
+        """
+        aspects = list(aspects or self.ASPECTS)
+        fast = self.fast_analysis(photo_description, aspects, image, depth)
+        for aspect in aspects:
+            if aspect in fast:
+                yield aspect, fast[aspect]
+        escalated = [aspect for aspect in aspects if aspect not in fast]
+        if escalated:
+            for aspect, result in self.stream_full_analysis(photo_description, escalated, image):
+                yield aspect, {**result, "tier": "model"}
+    
+    def get_tiered_analysis(self, photo_description: str, aspects: Optional[List[str]] = None,
+                            image: Optional[Dict] = None, depth: bool = False) -> Dict:
+        """Structured analysis from the fast tier where it is confident, the model elsewhere"""
+        analysis = dict(self.stream_tiered_analysis(photo_description, aspects, image, depth))
+        analysis["overall_rating"] = overall_rating(analysis)
+        return analysis
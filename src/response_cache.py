@@ -0,0 +1,244 @@
+"""
+Response Cache
+Exact + embedding-similarity cache for LLM feedback, with LRU/TTL eviction
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+
+def normalize_description(text: str) -> str:
+    """Case-fold, collapse whitespace and drop punctuation that doesn't change meaning"""
+    text = re.sub(r"[^\w\s/.%°-]", " ", text.lower())
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" .")
+
+
+class ResponseCache:
+    """Bounded cache of generated feedback keyed on description, model and prompt version
+
+    Lookups try an exact match on the normalized description first, then the
+    most similar cached description for the same model and prompt version if
+    its cosine similarity clears similarity_threshold. Entries expire after
+    ttl_seconds and the least recently used entry is evicted when full. With
+    db_path set, entries are mirrored to SQLite and reloaded on start.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 7 * 24 * 3600,
+                 similarity_threshold: Optional[float] = 0.95, embedder=None,
+                 db_path: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._embedder = embedder
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._vectors: Optional[np.ndarray] = None
+        self._slot_valid = np.zeros(max_entries, dtype=bool)
+        self._slot_namespace = [""] * max_entries
+        self._slot_key = [""] * max_entries
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0}
+
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path is not None:
+            self._open_db(Path(db_path))
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            from src.embedding_service import get_embedding_service
+            self._embedder = get_embedding_service()
+        return self._embedder
+
+    @staticmethod
+    def _namespace(model: str, prompt_version: str) -> str:
+        return f"{model}\0{prompt_version}"
+
+    @staticmethod
+    def _key(namespace: str, normalized: str) -> str:
+        return hashlib.sha256(f"{namespace}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def _semantic_enabled(self) -> bool:
+        return self.similarity_threshold is not None and self.similarity_threshold < 1.0
+
+    def _embed(self, normalized: str) -> Optional[np.ndarray]:
+        if not self._semantic_enabled():
+            return None
+        return self.embedder.embed([normalized])[0]
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, description: str, model: str, prompt_version: str) -> Optional[str]:
+        """Return a cached response, or None on a miss"""
+        namespace = self._namespace(model, prompt_version)
+        normalized = normalize_description(description)
+        key = self._key(namespace, normalized)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry):
+                self._entries.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                return entry["response"]
+            if entry is not None:
+                self._remove(key)
+            if not (self._semantic_enabled() and self._entries):
+                self.stats["misses"] += 1
+                return None
+
+        # Embed outside the lock so concurrent exact lookups aren't held up
+        vector = self._embed(normalized)
+        with self._lock:
+            key = self._nearest(namespace, vector)
+            if key is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["semantic_hits"] += 1
+            return self._entries[key]["response"]
+
+    def put(self, description: str, model: str, prompt_version: str, response: str):
+        """Store a response, evicting the least recently used entry if full"""
+        namespace = self._namespace(model, prompt_version)
+        normalized = normalize_description(description)
+        key = self._key(namespace, normalized)
+        vector = self._embed(normalized)
+        entry = {
+            "namespace": namespace,
+            "normalized": normalized,
+            "response": response,
+            "created_at": time.time(),
+        }
+
+        with self._lock:
+            self._insert(key, entry, vector)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, namespace, normalized, response, entry["created_at"],
+                     self._embedder_name(), None if vector is None else vector.tobytes()),
+                )
+                self._db.commit()
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters and overall hit rate"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["exact_hits"] + stats["semantic_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    # ------------------------------------------------------------------
+    # Internals (callers hold the lock)
+    # ------------------------------------------------------------------
+
+    def _expired(self, entry: Dict) -> bool:
+        return time.time() - entry["created_at"] > self.ttl_seconds
+
+    def _nearest(self, namespace: str, vector: np.ndarray) -> Optional[str]:
+        if self._vectors is None:
+            return None
+        candidates = self._slot_valid.copy()
+        for slot in np.flatnonzero(candidates):
+            candidates[slot] = self._slot_namespace[slot] == namespace
+        if not candidates.any():
+            return None
+        scores = np.where(candidates, self._vectors @ vector, -np.inf)
+        slot = int(np.argmax(scores))
+        if scores[slot] < self.similarity_threshold:
+            return None
+        key = self._slot_key[slot]
+        if self._expired(self._entries[key]):
+            self._remove(key)
+            return None
+        return key
+
+    def _insert(self, key: str, entry: Dict, vector: Optional[np.ndarray]):
+        if key in self._entries:
+            self._remove(key, from_db=False)
+        while len(self._entries) >= self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+        slot = self._free_slots.pop()
+        entry["slot"] = slot
+        self._entries[key] = entry
+        self._slot_key[slot] = key
+        self._slot_namespace[slot] = entry["namespace"]
+        if vector is not None:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            self._vectors[slot] = vector
+            self._slot_valid[slot] = True
+
+    def _remove(self, key: str, from_db: bool = True):
+        entry = self._entries.pop(key)
+        slot = entry["slot"]
+        self._slot_valid[slot] = False
+        self._slot_key[slot] = ""
+        self._free_slots.append(slot)
+        if from_db and self._db is not None:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+
+    # ------------------------------------------------------------------
+    # SQLite persistence
+    # ------------------------------------------------------------------
+
+    def _embedder_name(self) -> str:
+        return self._embedder.name if self._embedder is not None else ""
+
+    def _open_db(self, db_path: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                normalized TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                embedder TEXT,
+                vector BLOB
+            )
+        """)
+        self._db.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        self._db.commit()
+
+        rows = self._db.execute(
+            "SELECT key, namespace, normalized, response, created_at, embedder, vector "
+            "FROM responses ORDER BY created_at DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for key, namespace, normalized, response, created_at, embedder, blob in reversed(rows):
+            vector = None
+            if self._semantic_enabled():
+                if blob is not None and embedder == self.embedder.name:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                else:
+                    vector = self._embed(normalized)
+            entry = {
+                "namespace": namespace,
+                "normalized": normalized,
+                "response": response,
+                "created_at": created_at,
+            }
+            self._insert(key, entry, vector)
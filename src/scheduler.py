@@ -0,0 +1,396 @@
+"""
+Request Scheduler
+Bounded, session-fair queue in front of the local model
+"""
+
+import contextvars
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from src.telemetry import record_span, registry
+
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+
+class SchedulerError(RuntimeError):
+    """Base class for scheduler rejections"""
+
+
+class SchedulerBusyError(SchedulerError):
+    """The queue (or the caller's share of it) is full"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RequestExpiredError(SchedulerError):
+    """The request waited longer than max_wait and was dropped unrun"""
+
+
+class RequestCancelledError(SchedulerError):
+    """Every caller waiting on the request cancelled it"""
+
+
+class _Job:
+    """One unit of model work, shared by every ticket coalesced onto it"""
+
+    def __init__(self, seq: int, key: Optional[str], session_id: str, fn: Callable,
+                 priority: int, context: contextvars.Context):
+        self.seq = seq
+        self.key = key
+        self.session_id = session_id
+        self.fn = fn
+        self.priority = priority
+        self.context = context
+        self.state = "queued"
+        self.chunks: List[Any] = []
+        self.streaming = False
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.changed = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "failed", "cancelled", "expired")
+
+    def publish(self, chunk):
+        with self.changed:
+            self.chunks.append(chunk)
+            self.changed.notify_all()
+
+    def set_state(self, state: str, result: Any = None, error: Optional[BaseException] = None):
+        with self.changed:
+            self.state = state
+            self.result = result
+            self.error = error
+            self.changed.notify_all()
+
+
+class Ticket:
+    """A caller's handle on a scheduled request"""
+
+    def __init__(self, scheduler: "RequestScheduler", job: _Job, coalesced: bool):
+        self._scheduler = scheduler
+        self._job = job
+        self.coalesced = coalesced
+        self._cancelled = False
+
+    @property
+    def status(self) -> str:
+        """queued, running, done, failed, cancelled or expired"""
+        return "cancelled" if self._cancelled else self._job.state
+
+    def position(self) -> int:
+        """1-based place in the dispatch order; 0 once the request is running"""
+        return self._scheduler.position(self._job)
+
+    def wait_started(self, timeout: Optional[float] = None) -> bool:
+        """Block until the request leaves the queue; False on timeout"""
+        with self._job.changed:
+            return self._job.changed.wait_for(lambda: self._job.state != "queued", timeout)
+
+    def stream(self) -> Iterator[Any]:
+        """Yield the request's output chunks as they are produced
+
+        Coalesced tickets replay chunks published before they attached.
+        Closing the iterator early cancels this ticket.
+        """
+        job = self._job
+        index = 0
+        reported_wait = False
+        try:
+            while True:
+                with job.changed:
+                    job.changed.wait_for(lambda: len(job.chunks) > index or job.finished)
+                    chunks = job.chunks[index:]
+                    state = job.state
+                if not reported_wait and job.started_at is not None:
+                    record_span("queue_wait", job.started_at - job.submitted_at)
+                    reported_wait = True
+                for chunk in chunks:
+                    yield chunk
+                index += len(chunks)
+                if state in ("done", "failed", "cancelled", "expired") and index == len(job.chunks):
+                    break
+            self._raise_for_state()
+            if not job.streaming and job.result is not None:
+                yield job.result
+        finally:
+            if not job.finished:
+                self.cancel()
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """Wait for completion and return the result (joined text for streams)"""
+        job = self._job
+        with job.changed:
+            if not job.changed.wait_for(lambda: job.finished, timeout):
+                raise TimeoutError("request did not finish in time")
+        self._raise_for_state()
+        return "".join(job.chunks) if job.streaming else job.result
+
+    def _raise_for_state(self):
+        job = self._job
+        if job.state == "failed":
+            raise job.error
+        if job.state == "expired":
+            raise RequestExpiredError("request expired in the queue")
+        if job.state == "cancelled":
+            raise RequestCancelledError("request was cancelled")
+
+    def cancel(self):
+        """Detach from the request; it is dropped once no ticket is waiting on it"""
+        if not self._cancelled:
+            self._cancelled = True
+            self._scheduler._release(self._job)
+
+
+class RequestScheduler:
+    """Serialize model requests across sessions with fair, bounded queueing
+
+    max_active requests run at once (1 suits a CPU-bound model). Waiting
+    requests are kept per session and dispatched by priority, then
+    round-robin across sessions, so one user's burst cannot starve another.
+    Submissions are rejected with SchedulerBusyError when the queue or the
+    session's share of it is full, requests that waited longer than
+    max_wait are dropped, and a request whose key matches one already
+    queued or running shares its output instead of generating again.
+    """
+
+    def __init__(self, max_active: int = 1, max_queue: int = 32,
+                 max_per_session: int = 2, max_wait: Optional[float] = 300.0):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.max_per_session = max_per_session
+        self.max_wait = max_wait
+        self._queues: Dict[str, Deque[_Job]] = {}
+        self._last_served: Dict[str, int] = {}
+        self._by_key: Dict[str, _Job] = {}
+        self._running: List[_Job] = []
+        self._queued = 0
+        self._seq = itertools.count()
+        self._dispatches = itertools.count()
+        self._service_time = 30.0  # moving average of run time, for retry_after hints
+        self._lock = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._closed = False
+        self.stats = {"submitted": 0, "coalesced": 0, "rejected": 0, "expired": 0,
+                      "cancelled": 0, "completed": 0, "failed": 0}
+
+    @classmethod
+    def from_env(cls) -> "RequestScheduler":
+        max_wait = float(os.getenv("SCHEDULER_MAX_WAIT", "300"))
+        return cls(
+            max_active=int(os.getenv("SCHEDULER_MAX_ACTIVE", "1")),
+            max_queue=int(os.getenv("SCHEDULER_MAX_QUEUE", "32")),
+            max_per_session=int(os.getenv("SCHEDULER_MAX_PER_SESSION", "2")),
+            max_wait=max_wait or None,
+        )
+
+    def _count(self, name: str):
+        self.stats[name] += 1
+        registry.counter(f"scheduler_{name}_total", f"Scheduler requests {name}").inc()
+
+    def _ensure_workers(self):
+        while len(self._workers) < self.max_active:
+            worker = threading.Thread(target=self._work, name=f"scheduler-{len(self._workers)}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, session_id: str, fn: Callable[[], Any], key: Optional[str] = None,
+               priority: int = PRIORITY_INTERACTIVE) -> Ticket:
+        """Queue fn() for a session and return a Ticket
+
+        fn may return a value or an iterator of chunks (e.g. streamed
+        tokens). Requests with the same key share one execution.
+        """
+        with self._lock:
+            if self._closed:
+                raise SchedulerError("scheduler is shut down")
+            if key is not None and key in self._by_key:
+                job = self._by_key[key]
+                job.subscribers += 1
+                self._count("coalesced")
+                return Ticket(self, job, coalesced=True)
+
+            retry_after = round(self._service_time * (self._queued + 1) / self.max_active, 1)
+            if self._queued >= self.max_queue:
+                self._count("rejected")
+                raise SchedulerBusyError("The coach is at capacity. Please try again shortly.", retry_after)
+            queue = self._queues.setdefault(session_id, deque())
+            if len(queue) >= self.max_per_session:
+                self._count("rejected")
+                raise SchedulerBusyError("You already have requests waiting. Please wait for them to finish.",
+                                         retry_after)
+
+            job = _Job(next(self._seq), key, session_id, fn, priority, contextvars.copy_context())
+            job.subscribers = 1
+            queue.append(job)
+            self._queued += 1
+            if key is not None:
+                self._by_key[key] = job
+            self._count("submitted")
+            self._ensure_workers()
+            self._lock.notify()
+            return Ticket(self, job, coalesced=False)
+
+    def _pick(self, heads: Dict[str, _Job], last_served: Dict[str, int]) -> Optional[str]:
+        if not heads:
+            return None
+        return min(heads, key=lambda s: (heads[s].priority, last_served.get(s, -1), heads[s].seq))
+
+    def _dispatch_order(self) -> List[_Job]:
+        """Order in which the currently queued jobs would be dispatched"""
+        queues = {s: list(q) for s, q in self._queues.items() if q}
+        last_served = dict(self._last_served)
+        order = []
+        tick = max(last_served.values(), default=0) + 1
+        while queues:
+            session = self._pick({s: q[0] for s, q in queues.items()}, last_served)
+            order.append(queues[session].pop(0))
+            if not queues[session]:
+                del queues[session]
+            last_served[session] = tick
+            tick += 1
+        return order
+
+    def position(self, job: _Job) -> int:
+        with self._lock:
+            if job.state != "queued":
+                return 0
+            order = self._dispatch_order()
+            return order.index(job) + 1 if job in order else 0
+
+    def _remove_queued(self, job: _Job):
+        queue = self._queues.get(job.session_id)
+        if queue and job in queue:
+            queue.remove(job)
+            self._queued -= 1
+            if not queue:
+                del self._queues[job.session_id]
+        if job.key is not None and self._by_key.get(job.key) is job:
+            del self._by_key[job.key]
+
+    def _release(self, job: _Job):
+        with self._lock:
+            job.subscribers -= 1
+            if job.subscribers > 0 or job.finished:
+                return
+            self._count("cancelled")
+            if job.state == "queued":
+                self._remove_queued(job)
+                job.set_state("cancelled")
+            else:
+                # The worker stops at the next chunk; until then the job must
+                # not take new subscribers, who would only see it cancelled
+                if job.key is not None and self._by_key.get(job.key) is job:
+                    del self._by_key[job.key]
+                job.set_state("cancelled")
+
+    def _next_job(self) -> Optional[_Job]:
+        """Pop the next runnable job (called with the lock held)"""
+        while True:
+            heads = {s: q[0] for s, q in self._queues.items() if q}
+            session = self._pick(heads, self._last_served)
+            if session is None:
+                return None
+            job = heads[session]
+            self._remove_queued(job)
+            if self.max_wait is not None and time.monotonic() - job.submitted_at > self.max_wait:
+                self._count("expired")
+                job.set_state("expired")
+                continue
+            self._last_served[session] = next(self._dispatches)
+            if job.key is not None:
+                self._by_key[job.key] = job  # still joinable while running
+            return job
+
+    def _work(self):
+        while True:
+            with self._lock:
+                job = None
+                while not self._closed:
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    self._lock.wait()
+                if job is None:
+                    return
+                self._running.append(job)
+            try:
+                job.context.run(self._run, job)
+            finally:
+                with self._lock:
+                    self._running.remove(job)
+                    if job.key is not None and self._by_key.get(job.key) is job:
+                        del self._by_key[job.key]
+                    if job.started_at is not None:
+                        elapsed = time.monotonic() - job.started_at
+                        self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+
+    def _run(self, job: _Job):
+        job.started_at = time.monotonic()
+        job.set_state("running")
+        try:
+            output = job.fn()
+            if isinstance(output, (str, bytes, dict)) or not hasattr(output, "__iter__"):
+                job.set_state("done", result=output)
+            else:
+                job.streaming = True
+                try:
+                    for chunk in output:
+                        if job.state == "cancelled":
+                            break
+                        job.publish(chunk)
+                finally:
+                    close = getattr(output, "close", None)
+                    if close is not None:
+                        close()
+                if job.state != "cancelled":
+                    job.set_state("done")
+            if job.state == "done":
+                with self._lock:
+                    self._count("completed")
+        except Exception as e:
+            with self._lock:
+                self._count("failed")
+            job.set_state("failed", error=e)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "queued": self._queued, "running": len(self._running),
+                    "sessions_waiting": sum(1 for q in self._queues.values() if q)}
+
+    def shutdown(self):
+        """Stop accepting work and let the workers exit once idle"""
+        with self._lock:
+            self._closed = True
+            for queue in self._queues.values():
+                for job in queue:
+                    job.set_state("cancelled")
+            self._queues.clear()
+            self._by_key.clear()
+            self._queued = 0
+            self._lock.notify_all()
+
+
+_scheduler: Optional[RequestScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """Process-wide scheduler configured from SCHEDULER_* settings"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler.from_env()
+        return _scheduler
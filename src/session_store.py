@@ -0,0 +1,71 @@
+"""
+Session Store
+Per-session analysis results bounded by count and size
+"""
+
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, MutableMapping, Optional
+
+
+class SessionResults:
+    """Most recent results of one browser session, least recently used evicted first
+
+    Every open session keeps its own instance in session_state, so these
+    limits are what keep server memory flat as sessions pile up. The
+    newest result is always kept, even if it alone exceeds max_bytes.
+    """
+
+    def __init__(self, max_entries: int = 5, max_bytes: int = 512 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "SessionResults":
+        return cls(
+            max_entries=int(os.getenv("SESSION_MAX_RESULTS", "5")),
+            max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(512 * 1024))),
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    @staticmethod
+    def _size(key: str, result: Dict) -> int:
+        return len(key) + len(json.dumps(result, default=str))
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: str, result: Dict):
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[1]
+        size = self._size(key, result)
+        self._entries[key] = (result, size)
+        self.nbytes += size
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self.nbytes > self.max_bytes):
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.nbytes -= evicted
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+
+def session_results(state: MutableMapping) -> SessionResults:
+    """The session's result store, created on first use"""
+    if "results" not in state:
+        state["results"] = SessionResults.from_env()
+    return state["results"]
@@ -0,0 +1,200 @@
+"""
+Structured Output
+JSON-schema analysis results, parsed incrementally as the model streams them
+"""
+
+import json
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+LIST_FIELDS = ("strengths", "improvements", "suggestions")
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_RATING = re.compile(r"\d+(?:\.\d+)?")
+
+
+class StructuredOutputError(ValueError):
+    """Raised when a fragment cannot be parsed or fails the schema"""
+
+
+def aspect_schema() -> Dict:
+    """JSON schema of one aspect's analysis"""
+    return {
+        "type": "object",
+        "properties": {
+            **{field: {"type": "array", "items": {"type": "string"}} for field in LIST_FIELDS},
+            "rating": {"type": "integer", "minimum": 1, "maximum": 10},
+        },
+        "required": [*LIST_FIELDS, "rating"],
+    }
+
+
+def analysis_schema(aspects: Sequence[str]) -> Dict:
+    """JSON schema for Ollama's format option: one object per aspect, in order"""
+    return {
+        "type": "object",
+        "properties": {aspect: aspect_schema() for aspect in aspects},
+        "required": list(aspects),
+    }
+
+
+def validate_aspect(data) -> Dict:
+    """Check one aspect's object against the schema, coercing near misses
+
+    A lone string where a list is expected becomes a one-item list, and
+    ratings such as "7/10" or 7.5 become integers clamped to 1-10.
+    """
+    if not isinstance(data, dict):
+        raise StructuredOutputError(f"expected an object, got {type(data).__name__}")
+    result = {}
+    for field in LIST_FIELDS:
+        value = data.get(field)
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list):
+            raise StructuredOutputError(f"'{field}' is missing or not a list")
+        result[field] = [str(item).strip() for item in value if str(item).strip()]
+
+    rating = data.get("rating")
+    if isinstance(rating, str):
+        match = _RATING.search(rating)
+        rating = float(match.group()) if match else None
+    if isinstance(rating, bool) or not isinstance(rating, (int, float)):
+        raise StructuredOutputError("'rating' is missing or not a number")
+    result["rating"] = int(min(10, max(1, round(rating))))
+    return result
+
+
+def overall_rating(results: Dict[str, Dict]) -> int:
+    """Mean of the successful aspects' ratings, rounded (0 if there are none)"""
+    ratings = [r["rating"] for r in results.values() if isinstance(r, dict) and r.get("status") == "ok"]
+    return round(sum(ratings) / len(ratings)) if ratings else 0
+
+
+def _close_open_structures(text: str) -> str:
+    """Terminate an unterminated string and close unbalanced brackets"""
+    stack: List[str] = []
+    in_string = escape = False
+    for ch in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack and stack[-1] == ch:
+            stack.pop()
+    if in_string:
+        text += '"'
+    return text.rstrip().rstrip(",") + "".join(reversed(stack))
+
+
+def repair_json(fragment: str):
+    """Parse a JSON fragment, fixing the slips small models commonly make
+
+    Tries, in order: code fences, trailing commas, Python literals, single
+    quotes and truncation (unclosed strings and brackets). Raises
+    StructuredOutputError if none of them yields valid JSON.
+    """
+    text = _FENCE.sub("", fragment.strip())
+    attempts = [text]
+    text = _TRAILING_COMMA.sub(r"\1", text)
+    attempts.append(text)
+    text = re.sub(r"\b(True|False|None)\b", lambda m: _PY_LITERALS[m.group()], text)
+    attempts.append(text)
+    if '"' not in text:
+        text = text.replace("'", '"')
+        attempts.append(text)
+    attempts.append(_TRAILING_COMMA.sub(r"\1", _close_open_structures(text)))
+    for attempt in attempts:
+        try:
+            return json.loads(attempt)
+        except ValueError:
+            continue
+    raise StructuredOutputError(f"unparseable fragment: {fragment[:80]!r}")
+
+
+class IncrementalJSONParser:
+    """Split a streamed JSON object into its top-level members as they close
+
+    feed() takes text as it arrives and returns (key, raw_value) for every
+    member whose value completed in it, so each aspect can be parsed and
+    shown while the rest is still generating. Values are returned as raw
+    text, letting the caller repair one malformed member without touching
+    the others. Text before the opening brace (a preamble or code fence)
+    is skipped.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.closed = False
+        self._pos = 0
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._key: Optional[str] = None
+        self._key_start: Optional[int] = None
+        self._value_start: Optional[int] = None
+
+    def _emit(self, end: int) -> Tuple[str, str]:
+        member = (self._key, self.buffer[self._value_start:end].strip())
+        self._key = self._value_start = None
+        return member
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        self.buffer += text
+        members = []
+        while self._pos < len(self.buffer) and not self.closed:
+            ch = self.buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._value_start is None:
+                        raw = self.buffer[self._key_start:self._pos + 1]
+                        try:
+                            self._key = json.loads(raw)
+                        except ValueError:
+                            self._key = raw.strip('"')
+            elif not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+            elif ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None:
+                    self._key_start = self._pos
+            elif ch == ":" and self._depth == 1 and self._key is not None and self._value_start is None:
+                self._value_start = self._pos + 1
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._value_start is not None:
+                    members.append(self._emit(self._pos + 1))
+                elif self._depth == 0:
+                    if self._value_start is not None:
+                        members.append(self._emit(self._pos))
+                    self.closed = True
+            elif ch == "," and self._depth == 1 and self._value_start is not None:
+                members.append(self._emit(self._pos))
+            self._pos += 1
+        return members
+
+    def finish(self) -> List[Tuple[str, str]]:
+        """The member cut off by the end of the stream, if any (for repair)"""
+        if self.closed or self._value_start is None:
+            return []
+        return [self._emit(len(self.buffer))]
@@ -0,0 +1,404 @@
+"""
+Telemetry
+In-process metrics registry, request spans and opt-in per-request profiling
+"""
+
+import bisect
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.utils import get_project_root
+
+
+METRIC_PREFIX = "photo_coach_"
+
+# Seconds; spans range from sub-millisecond retrieval to minute-long generations
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+RATE_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 200)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Dict] = None) -> str:
+    pairs = list(key) + sorted((extra or {}).items())
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    """Monotonic counter, one series per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def prometheus_lines(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(k)} {v:g}" for k, v in self._values.items()]
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {_format_labels(k) or "total": v for k, v in self._values.items()}
+
+
+class Histogram:
+    """Fixed-bucket histogram with sum and count, one series per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series: Dict[LabelKey, Dict] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+                self._series[key] = series
+            series["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside the matching bucket"""
+        series = self._series.get(_label_key(labels))
+        if not series or not series["count"]:
+            return None
+        return self._quantile(series, q)
+
+    def _quantile(self, series: Dict, q: float) -> float:
+        rank = q * series["count"]
+        cumulative = 0
+        for i, count in enumerate(series["counts"]):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def prometheus_lines(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, series in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, {'le': f'{bound:g}'})} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series['sum']:g}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                _format_labels(key) or "total": {
+                    "count": s["count"],
+                    "sum": round(s["sum"], 6),
+                    "p50": round(self._quantile(s, 0.5), 6),
+                    "p95": round(self._quantile(s, 0.95), 6),
+                    "p99": round(self._quantile(s, 0.99), 6),
+                }
+                for key, s in self._series.items() if s["count"]
+            }
+
+
+class MetricsRegistry:
+    """Named counters and histograms exportable as Prometheus text or JSON"""
+
+    def __init__(self, prefix: str = METRIC_PREFIX):
+        self.prefix = prefix
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help_text: str, **kwargs):
+        full_name = self.prefix + name
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = cls(full_name, help_text, **kwargs)
+                self._metrics[full_name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str = "") -> Counter:
+        return self._get(Counter, name, help_text)
+
+    def histogram(self, name: str, help_text: str = "", buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            items = sorted(self._metrics.items())
+        lines = []
+        for name, metric in items:
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.prometheus_lines())
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> Dict:
+        with self._lock:
+            items = sorted(self._metrics.items())
+        return {name: metric.to_dict() for name, metric in items}
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+registry = MetricsRegistry()
+
+
+# ----------------------------------------------------------------------
+# Request traces and spans
+# ----------------------------------------------------------------------
+
+class RequestTrace:
+    """Span timings collected for a single request"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.spans: List[Tuple[str, float]] = []
+        self.duration: Optional[float] = None
+        self.profile_path: Optional[str] = None
+
+    def add(self, name: str, seconds: float):
+        self.spans.append((name, seconds))
+
+    def summary(self) -> Dict[str, float]:
+        """Total milliseconds per span name"""
+        totals: Dict[str, float] = {}
+        for name, seconds in self.spans:
+            totals[name] = totals.get(name, 0.0) + seconds * 1000
+        return {name: round(ms, 2) for name, ms in totals.items()}
+
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("photo_coach_trace", default=None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+def record_span(name: str, seconds: float, **labels):
+    """Record an already-measured duration as a span"""
+    registry.histogram("span_seconds", "Duration of pipeline stages").observe(seconds, span=name, **labels)
+    trace = current_trace()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+@contextmanager
+def span(name: str, **labels) -> Iterator[None]:
+    """Time a block and record it under photo_coach_span_seconds{span=name}"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start, **labels)
+
+
+def record_cpu(name: str, seconds: float, **labels):
+    """Record CPU time spent on the calling thread under photo_coach_cpu_seconds{span=name}"""
+    registry.histogram("cpu_seconds", "Server CPU time per stage").observe(seconds, span=name, **labels)
+
+
+def cpu_timed(name: str, **labels):
+    """Decorator recording the CPU time of each call with record_cpu"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.thread_time()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record_cpu(name, time.thread_time() - start, **labels)
+        return wrapper
+    return decorate
+
+
+def record_llm_usage(response: Dict, **labels):
+    """Record token counts and throughput from an Ollama final response/chunk"""
+    prompt_tokens = response.get("prompt_eval_count") or 0
+    completion_tokens = response.get("eval_count") or 0
+    tokens = registry.counter("llm_tokens_total", "Tokens processed by the model")
+    tokens.inc(prompt_tokens, kind="prompt", **labels)
+    tokens.inc(completion_tokens, kind="completion", **labels)
+    registry.counter("llm_requests_total", "Completed model requests").inc(**labels)
+
+    eval_ns = response.get("eval_duration") or 0
+    if completion_tokens and eval_ns:
+        registry.histogram("llm_tokens_per_second", "Generation throughput",
+                           buckets=RATE_BUCKETS).observe(completion_tokens / (eval_ns / 1e9), **labels)
+    prompt_ns = response.get("prompt_eval_duration") or 0
+    if prompt_ns:
+        record_span("llm_prefill", prompt_ns / 1e9, **labels)
+    load_ns = response.get("load_duration") or 0
+    if load_ns:
+        record_span("llm_load", load_ns / 1e9, **labels)
+
+
+# ----------------------------------------------------------------------
+# Opt-in profiling
+# ----------------------------------------------------------------------
+
+# One profile at a time per process: Python 3.12+ refuses a second active cProfile
+_profile_lock = threading.Lock()
+
+
+def _profile_mode() -> str:
+    return os.getenv("PROFILE_REQUESTS", "").lower()
+
+
+def _start_profiler(mode: str, name: str):
+    """Start profiling this request, or return None if another request is being profiled"""
+    if not _profile_lock.acquire(blocking=False):
+        print(f"⚠️ Another request is being profiled. Not profiling {name}.")
+        return None
+    try:
+        if mode == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+
+                profiler = Profiler()
+                profiler.start()
+                return mode, profiler
+            except ImportError:
+                print("⚠️ pyinstrument not installed. Falling back to cProfile.")
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return "cprofile", profiler
+    except ValueError as e:  # a profiler outside this module is active
+        _profile_lock.release()
+        print(f"⚠️ Could not profile {name}: {e}")
+        return None
+
+
+def _stop_profiler(kind: str, profiler, name: str) -> str:
+    try:
+        return _write_profile(kind, profiler, name)
+    finally:
+        _profile_lock.release()
+
+
+def _write_profile(kind: str, profiler, name: str) -> str:
+    profile_dir = Path(os.getenv("PROFILE_DIR") or get_project_root() / "data" / "profiles")
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    stem = profile_dir / f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{os.getpid()}-{threading.get_ident()}"
+    if kind == "pyinstrument":
+        profiler.stop()
+        path = stem.with_suffix(".html")
+        path.write_text(profiler.output_html(), encoding="utf-8")
+    else:
+        profiler.disable()
+        path = stem.with_suffix(".prof")
+        profiler.dump_stats(str(path))
+    return str(path)
+
+
+@contextmanager
+def track_request(name: str, **labels) -> Iterator[RequestTrace]:
+    """Collect spans for one request and record its total latency
+
+    With PROFILE_REQUESTS=cprofile (or =pyinstrument) the request is also
+    profiled and the result written under data/profiles/. Only one request
+    per process is profiled at a time; others overlapping it run unprofiled.
+    """
+    trace = RequestTrace(name)
+    token = _current_trace.set(trace)
+    profiler = None
+    start = time.perf_counter()
+    try:
+        mode = _profile_mode()
+        if mode in ("1", "cprofile", "pyinstrument"):
+            profiler = _start_profiler(mode, name)
+        yield trace
+    finally:
+        trace.duration = time.perf_counter() - start
+        if profiler is not None:
+            trace.profile_path = _stop_profiler(*profiler, name)
+        registry.histogram("request_seconds", "End-to-end request latency").observe(
+            trace.duration, request=name, **labels
+        )
+        _current_trace.reset(token)
+
+
+# ----------------------------------------------------------------------
+# Export endpoint
+# ----------------------------------------------------------------------
+
+def _metrics_handler():
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.startswith("/metrics.json"):
+                body = json.dumps(registry.to_json(), indent=2).encode("utf-8")
+                content_type = "application/json"
+            elif self.path.startswith("/metrics"):
+                body = registry.to_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return MetricsHandler
+
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1"):
+    """Serve /metrics (Prometheus text) and /metrics.json once per process"""
+    from http.server import ThreadingHTTPServer
+
+    global _metrics_server
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            _metrics_server = ThreadingHTTPServer((host, port), _metrics_handler())
+            _metrics_server.daemon_threads = True
+            threading.Thread(target=_metrics_server.serve_forever, name="metrics", daemon=True).start()
+        return _metrics_server
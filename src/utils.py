@@ -18,6 +18,9 @@ def ensure_directories_exist():
         get_project_root() / "data",
         get_project_root() / "data" / "sample_photos",
         get_project_root() / "data" / "vector_stores",
+        get_project_root() / "data" / "cache",
+        get_project_root() / "data" / "image_cache",
+        get_project_root() / "data" / "textbooks",
     ]
     
     for dir_path in dirs:
@@ -35,14 +38,55 @@ def load_env_variables():
         print("⚠️ .env file not found. Using defaults.")
 
 
+def format_aspect_feedback(result: Dict) -> str:
+    """Format one aspect's analysis result as markdown"""
+    status = result.get("status", "ok")
+    if status != "ok":
+        return f"⚠️ {result.get('error', status)}\n"
+    if "feedback" in result:  # free-text analysis
+        return f"{result['feedback']}\n"
+    
+    formatted = f"**Rating:** {result['rating']}/10\n"
+    if result.get("tier") == "fast":
+        formatted += f"*⚡ Instant answer from the knowledge base (confidence {result['confidence']:.0%})*\n"
+    for field in ("strengths", "improvements", "suggestions"):
+        if result.get(field):
+            formatted += f"\n**{field.title()}**\n"
+            formatted += "".join(f"- {item}\n" for item in result[field])
+    return formatted
+
+
 def format_feedback(analysis_dict: Dict) -> str:
-    """Format analysis dictionary into readable feedback"""
+    """Format analysis dictionary into readable feedback
+    
+    Aspect results (from get_full_analysis or get_coaching_feedback) are
+    rendered as rating and bullet lists; other values are shown as is.
+    """
     if not analysis_dict:
         return "No analysis available."
     
     formatted = ""
     for key, value in analysis_dict.items():
         formatted += f"\n### {key.replace('_', ' ').title()}\n"
-        formatted += f"{value}\n"
+        if isinstance(value, dict):
+            formatted += format_aspect_feedback(value)
+        elif key.endswith("rating"):
+            formatted += f"{value}/10\n"
+        else:
+            formatted += f"{value}\n"
     
     return formatted
+
+
+def format_knowledge(knowledge: str) -> str:
+    """Format a knowledge-base section as markdown: subsection names in bold, bullets as is"""
+    lines = []
+    for line in knowledge.strip().splitlines():
+        line = line.strip()
+        if line.endswith(":") and not line.startswith("-"):
+            if line[:-1].isupper():  # the section title, shown as the tab heading
+                continue
+            line = f"**{line[:-1]}**"
+        lines.append(line)
+    
+    return "\n".join(lines).strip()
@@ -0,0 +1,227 @@
+"""
+Vector Index Backends
+Exact (NumPy), quantized and approximate (faiss) top-k search over normalized vectors
+"""
+
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src.quantization import CODECS
+
+
+# Below this many rows an exact scan beats any approximate structure
+EXACT_SCAN_THRESHOLD = 20_000
+
+QUANTIZED_BACKENDS = tuple(CODECS)
+
+
+def _as_query_matrix(queries: np.ndarray) -> np.ndarray:
+    queries = np.asarray(queries, dtype=np.float32)
+    if queries.ndim == 1:
+        queries = queries[None, :]
+    return np.ascontiguousarray(queries)
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (scores, positions) of the k best entries per row, best first"""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.float32), empty.astype(np.int64)
+    if k < scores.shape[1]:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part_scores, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+
+class NumpyIndex:
+    """Exact inner-product search: one matrix-vector product per query batch"""
+
+    name = "exact"
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.vectors.nbytes)
+
+    def search(self, queries: np.ndarray, k: int,
+               rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Search all rows, or only the given row ids; returns (scores, ids)"""
+        queries = _as_query_matrix(queries)
+        if rows is None:
+            return top_k(queries @ self.vectors.T, k)
+        scores, positions = top_k(queries @ self.vectors[rows].T, k)
+        return scores, rows[positions]
+
+
+class QuantizedIndex:
+    """Scan over compact codes, then re-rank the best candidates exactly
+
+    Only the codes stay resident; the full-precision vectors (memory-mapped
+    from the store) are read back for the top `rerank` candidates of each
+    query, which recovers most of the recall lost to quantization.
+    """
+
+    def __init__(self, vectors: np.ndarray, mode: str = "int8", rerank: int = 64,
+                 codec=None, codes: Optional[np.ndarray] = None):
+        if codec is None:
+            codec = CODECS[mode]().fit(vectors)
+            codes = codec.encode(vectors)
+        self.vectors = vectors
+        self.codec = codec
+        self.codes = codes
+        self.rerank = rerank
+        self.name = f"{mode}+rerank" if rerank else mode
+
+    def __len__(self) -> int:
+        return int(self.codes.shape[self.codec.row_axis])
+
+    @property
+    def nbytes(self) -> int:
+        """Resident bytes: codes plus codebooks (re-ranked rows are paged in on demand)"""
+        return int(self.codes.nbytes + sum(a.nbytes for a in self.codec.state().values()))
+
+    def search(self, queries: np.ndarray, k: int,
+               rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Search all rows, or only the given row ids; returns (scores, ids)"""
+        queries = _as_query_matrix(queries)
+        codes = self.codes if rows is None else np.take(self.codes, rows, axis=self.codec.row_axis)
+        scores, positions = top_k(self.codec.scores(queries, codes), max(k, self.rerank))
+        ids = positions if rows is None else rows[positions]
+        if not self.rerank:
+            return scores[:, :k], ids[:, :k]
+
+        exact_scores, exact_ids = [], []
+        for query, candidates in zip(queries, ids):
+            candidates = np.sort(candidates)  # sequential reads from the memory map
+            exact = np.asarray(self.vectors[candidates], dtype=np.float32) @ query
+            order = np.argsort(-exact, kind="stable")[:k]
+            exact_scores.append(exact[order])
+            exact_ids.append(candidates[order])
+        return np.array(exact_scores, dtype=np.float32), np.array(exact_ids, dtype=np.int64)
+
+    def save(self, path: Path, key: str):
+        """Persist codes and codebooks atomically, tagged with the store's content hash"""
+        path = Path(path)
+        tmp = path.with_name(f".{path.name}.tmp")
+        state = {f"state_{name}": value for name, value in self.codec.state().items()}
+        with open(tmp, "wb") as f:
+            np.savez(f, codes=self.codes, mode=np.array(self.codec.name), key=np.array(key), **state)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path, vectors: np.ndarray, key: str,
+             rerank: int = 64) -> Optional["QuantizedIndex"]:
+        """Load saved codes, or None if missing or built from different vectors"""
+        try:
+            with np.load(path) as data:
+                if str(data["key"]) != key:
+                    return None
+                mode = str(data["mode"])
+                codes = data["codes"]
+                state = {name[6:]: data[name] for name in data.files if name.startswith("state_")}
+        except (OSError, ValueError, KeyError):
+            return None
+        codec = CODECS[mode].from_state(state)
+        if codes.shape[codec.row_axis] != len(vectors):
+            return None
+        return cls(vectors, mode, rerank, codec, codes)
+
+    @classmethod
+    def load_or_build(cls, vectors: np.ndarray, mode: str, cache_dir: Optional[Path] = None,
+                      cache_key: Optional[str] = None) -> "QuantizedIndex":
+        """Reuse codes saved next to the store; training PQ codebooks is the slow part"""
+        rerank = int(os.getenv("VECTOR_RERANK", "64"))
+        path = Path(cache_dir) / f"index-{mode}.npz" if cache_dir and cache_key else None
+        if path is not None and path.exists():
+            index = cls.load(path, vectors, cache_key, rerank)
+            if index is not None:
+                return index
+        index = cls(vectors, mode, rerank)
+        if path is not None:
+            try:
+                index.save(path, cache_key)
+            except OSError as e:
+                print(f"⚠️ Could not save {mode} index codes: {e}")
+        return index
+
+
+class FaissIndex:
+    """Approximate inner-product search using faiss HNSW or IVF"""
+
+    def __init__(self, vectors: np.ndarray, kind: str = "hnsw", hnsw_m: int = 32,
+                 ef_search: int = 128, nlist: Optional[int] = None, nprobe: int = 16):
+        import faiss
+
+        self.exact = NumpyIndex(vectors)
+        dim = self.exact.vectors.shape[1]
+        if kind == "hnsw":
+            index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = max(2 * hnsw_m, 40)
+            index.hnsw.efSearch = ef_search
+        elif kind == "ivf":
+            nlist = nlist or max(1, int(np.sqrt(len(vectors))))
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(self.exact.vectors)
+            index.nprobe = nprobe
+        else:
+            raise ValueError(f"Unknown faiss index kind: {kind}")
+        index.add(self.exact.vectors)
+        self.index = index
+        self.name = f"faiss-{kind}"
+
+    def __len__(self) -> int:
+        return len(self.exact)
+
+    def search(self, queries: np.ndarray, k: int,
+               rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Search all rows, or only the given row ids; returns (scores, ids)"""
+        queries = _as_query_matrix(queries)
+        if rows is None:
+            scores, ids = self.index.search(queries, min(k, len(self)))
+            return scores, ids.astype(np.int64)
+        if len(rows) <= EXACT_SCAN_THRESHOLD:
+            return self.exact.search(queries, k, rows)
+
+        # Over-fetch and filter; fall back to an exact scan if the filter is too selective
+        fetch = min(len(self), k * max(4, len(self) // len(rows)))
+        scores, ids = self.index.search(queries, fetch)
+        allowed = np.isin(ids, rows)
+        if (allowed.sum(axis=1) < min(k, len(rows))).any():
+            return self.exact.search(queries, k, rows)
+        order = np.argsort(~allowed, axis=1, kind="stable")[:, :k]
+        return (np.take_along_axis(scores, order, axis=1),
+                np.take_along_axis(ids, order, axis=1).astype(np.int64))
+
+
+def build_index(vectors: np.ndarray, backend: Optional[str] = None,
+                cache_dir: Optional[Path] = None, cache_key: Optional[str] = None):
+    """Build a search index
+
+    backend is 'exact', 'float16', 'int8', 'pq', 'hnsw', 'ivf' or 'auto'.
+    Quantized codes are cached in cache_dir when a cache_key is given.
+    """
+    backend = backend or os.getenv("VECTOR_INDEX_BACKEND", "auto")
+    if backend == "auto":
+        backend = "exact" if len(vectors) < EXACT_SCAN_THRESHOLD else "hnsw"
+    if backend == "exact":
+        return NumpyIndex(vectors)
+    if backend in QUANTIZED_BACKENDS:
+        return QuantizedIndex.load_or_build(vectors, backend, cache_dir, cache_key)
+    try:
+        return FaissIndex(vectors, kind=backend)
+    except ImportError:
+        print("⚠️ faiss not installed. Using exact vector search.")
+        return NumpyIndex(vectors)
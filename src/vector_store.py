@@ -0,0 +1,262 @@
+"""
+Vector Store
+Chunking, embedding and on-disk persistence for the knowledge index
+"""
+
+import json
+import os
+import re
+import textwrap
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+
+CHUNKER_VERSION = "1"
+
+_BULLET = re.compile(r"^[-•*]\s+")
+
+
+def chunk_text(text: str, max_chars: int = 600, overlap: int = 80) -> List[str]:
+    """Greedily pack paragraphs into chunks of at most max_chars characters"""
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+    chunks: List[str] = []
+    current = ""
+    for paragraph in paragraphs:
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind(" ", 0, max_chars)
+            cut = cut if cut > max_chars // 2 else max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:cut].strip())
+            paragraph = paragraph[max(cut - overlap, 1):].strip()
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_section(section: str, text: str, max_chars: int = 600) -> List[Dict]:
+    """Split a knowledge section into one chunk per titled subsection
+
+    Subsections are lines ending in ':' followed by bullet points, the layout
+    used by the PhotographyKnowledgeBase strings.
+    """
+    lines = textwrap.dedent(text).strip().splitlines()
+    groups: List[List[str]] = []
+    for line in lines[1:]:  # first line is the section header
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped.endswith(":") and not _BULLET.match(stripped):
+            groups.append([stripped])
+        elif groups:
+            groups[-1].append(stripped)
+        else:
+            groups.append([stripped])
+
+    chunks = []
+    for group in groups:
+        title = group[0].rstrip(":") if group[0].endswith(":") else ""
+        body = "\n".join(group)
+        for part in chunk_text(body, max_chars=max_chars):
+            chunks.append({
+                "id": f"{section}-{len(chunks)}",
+                "section": section,
+                "title": title,
+                "text": part,
+                "source": "builtin",
+            })
+    return chunks
+
+
+class ChunkTable:
+    """Chunk metadata held column-wise in flat arrays instead of per-chunk dicts
+
+    Free-text columns (id, title, text) are UTF-8 bytes in one blob sliced by
+    an offsets array; the blob can stay memory-mapped, so chunk text is only
+    paged in for the rows a search returns. Low-cardinality columns
+    (section, source) are small integer codes into a list of labels. Rows
+    come back as ordinary dicts, so callers index and iterate it like the
+    list it replaces.
+    """
+
+    STRING_COLUMNS = ("id", "title", "text")
+    CATEGORICAL_COLUMNS = ("section", "source")
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray, codes: Dict[str, np.ndarray],
+                 labels: Dict[str, List[str]]):
+        self.blob = blob  # uint8
+        self.offsets = offsets  # (len(STRING_COLUMNS), n + 1) int64
+        self.codes = codes
+        self.labels = labels
+        self._label_ids = {name: {label: i for i, label in enumerate(values)} for name, values in labels.items()}
+
+    @classmethod
+    def from_dicts(cls, chunks: List[Dict]) -> "ChunkTable":
+        n = len(chunks)
+        offsets = np.zeros((len(cls.STRING_COLUMNS), n + 1), dtype=np.int64)
+        parts: List[bytes] = []
+        position = 0
+        for j, name in enumerate(cls.STRING_COLUMNS):
+            encoded = [str(c.get(name, "")).encode("utf-8") for c in chunks]
+            offsets[j, 0] = position
+            offsets[j, 1:] = position + np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=n))
+            position = int(offsets[j, -1])
+            parts.extend(encoded)
+        blob = np.frombuffer(b"".join(parts), dtype=np.uint8)
+
+        codes, labels = {}, {}
+        for name in cls.CATEGORICAL_COLUMNS:
+            values = [str(c.get(name, "")) for c in chunks]
+            labels[name] = sorted(set(values))
+            ids = {label: i for i, label in enumerate(labels[name])}
+            dtype = np.uint16 if len(ids) <= np.iinfo(np.uint16).max else np.int32
+            codes[name] = np.fromiter((ids[v] for v in values), dtype=dtype, count=n)
+        return cls(blob, offsets, codes, labels)
+
+    def __len__(self) -> int:
+        return self.offsets.shape[1] - 1
+
+    def _string(self, column: int, row: int) -> str:
+        start, end = self.offsets[column, row], self.offsets[column, row + 1]
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+    def __getitem__(self, row: int) -> Dict:
+        row = int(row)
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(f"chunk row {row} out of range")
+        chunk = {name: self._string(j, row) for j, name in enumerate(self.STRING_COLUMNS)}
+        for name in self.CATEGORICAL_COLUMNS:
+            chunk[name] = self.labels[name][self.codes[name][row]]
+        return chunk
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def rows_where(self, column: str, values: Union[str, Iterable[str]]) -> np.ndarray:
+        """Row ids whose categorical column equals a value (or any of several)"""
+        values = [values] if isinstance(values, str) else list(values)
+        wanted = [self._label_ids[column][v] for v in values if v in self._label_ids[column]]
+        return np.flatnonzero(np.isin(self.codes[column], wanted)).astype(np.int64)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.blob.nbytes + self.offsets.nbytes + sum(c.nbytes for c in self.codes.values()))
+
+    def write(self, strings_file, columns_file):
+        """Write the string blob (.npy, mmap-able) and the remaining columns (.npz)"""
+        np.save(strings_file, self.blob)
+        arrays = {f"codes_{name}": codes for name, codes in self.codes.items()}
+        np.savez(columns_file, offsets=self.offsets, labels=np.array(json.dumps(self.labels)), **arrays)
+
+    @classmethod
+    def read(cls, strings_path: Path, columns_path: Path, mmap: bool = True) -> "ChunkTable":
+        blob = np.load(strings_path, mmap_mode="r" if mmap else None)
+        with np.load(columns_path) as data:
+            labels = json.loads(str(data["labels"]))
+            codes = {name: data[f"codes_{name}"] for name in cls.CATEGORICAL_COLUMNS}
+            offsets = data["offsets"]
+        return cls(blob, offsets, codes, labels)
+
+
+class VectorStore:
+    """Embedded chunks: a float32 matrix plus column-wise chunk metadata"""
+
+    VECTORS_FILE = "vectors.npy"
+    STRINGS_FILE = "chunk_strings.npy"
+    COLUMNS_FILE = "chunk_columns.npz"
+    MANIFEST_FILE = "manifest.json"
+    LEGACY_CHUNKS_FILE = "chunks.json"  # metadata format before ChunkTable
+
+    def __init__(self, vectors: np.ndarray, chunks: Union[ChunkTable, List[Dict]], manifest: Dict,
+                 embedder=None):
+        if len(vectors) != len(chunks):
+            raise ValueError(f"{len(vectors)} vectors for {len(chunks)} chunks")
+        self.vectors = vectors
+        self.chunks = chunks if isinstance(chunks, ChunkTable) else ChunkTable.from_dicts(chunks)
+        self.manifest = manifest
+        self.embedder = embedder
+        self.directory: Optional[Path] = None
+        self._section_rows: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    @property
+    def dim(self) -> int:
+        return int(self.vectors.shape[1])
+
+    @property
+    def content_hash(self) -> str:
+        return self.manifest["content_hash"]
+
+    def section_rows(self, section: str) -> np.ndarray:
+        """Row ids of all chunks belonging to a section"""
+        if section not in self._section_rows:
+            self._section_rows[section] = self.chunks.rows_where("section", section)
+        return self._section_rows[section]
+
+    def save(self, directory: Path):
+        """Write the store atomically: files are renamed into place last"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp_vectors = directory / f".{self.VECTORS_FILE}.tmp"
+        with open(tmp_vectors, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.vectors, dtype=np.float32))
+        tmp_strings = directory / f".{self.STRINGS_FILE}.tmp"
+        tmp_columns = directory / f".{self.COLUMNS_FILE}.tmp"
+        with open(tmp_strings, "wb") as strings, open(tmp_columns, "wb") as columns:
+            self.chunks.write(strings, columns)
+
+        os.replace(tmp_vectors, directory / self.VECTORS_FILE)
+        os.replace(tmp_strings, directory / self.STRINGS_FILE)
+        os.replace(tmp_columns, directory / self.COLUMNS_FILE)
+        # Manifest goes last so a crash mid-save never pairs it with old data
+        self.write_manifest(directory, self.manifest)
+        (directory / self.LEGACY_CHUNKS_FILE).unlink(missing_ok=True)
+
+    @classmethod
+    def write_manifest(cls, directory: Path, manifest: Dict):
+        """Replace the manifest atomically, leaving the data files as they are"""
+        tmp_manifest = Path(directory) / f".{cls.MANIFEST_FILE}.tmp"
+        tmp_manifest.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        os.replace(tmp_manifest, Path(directory) / cls.MANIFEST_FILE)
+
+    @classmethod
+    def read_manifest(cls, directory: Path) -> Optional[Dict]:
+        """Return the stored manifest, or None if there is no store"""
+        path = Path(directory) / cls.MANIFEST_FILE
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> Optional["VectorStore"]:
+        """Load a saved store; vectors and chunk text are memory-mapped read-only by default"""
+        directory = Path(directory)
+        manifest = cls.read_manifest(directory)
+        if manifest is None:
+            return None
+        try:
+            vectors = np.load(directory / cls.VECTORS_FILE, mmap_mode="r" if mmap else None)
+            chunks = ChunkTable.read(directory / cls.STRINGS_FILE, directory / cls.COLUMNS_FILE, mmap=mmap)
+        except (OSError, ValueError, KeyError):
+            return None
+        if len(vectors) != manifest.get("count") or len(chunks) != len(vectors):
+            return None
+        store = cls(vectors, chunks, manifest)
+        store.directory = directory
+        return store
+
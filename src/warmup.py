@@ -0,0 +1,68 @@
+"""
+Warm Start
+Preload the model, embedder and knowledge index off the request path
+"""
+
+import os
+import threading
+from typing import List
+
+from src.telemetry import span
+
+
+def warm_up_model(client=None) -> bool:
+    """Ask Ollama to load the chat model and keep it resident for keep_alive"""
+    from src.llm_client import get_llm_client
+
+    client = client or get_llm_client()
+    with span("warm_up", stage="model"):
+        return client.warm_up()
+
+
+def warm_up_knowledge():
+    """Load the embedder and the persisted knowledge index (building it if stale)"""
+    from src.rag_pipeline import PhotographyKnowledgeBase
+
+    with span("warm_up", stage="knowledge"):
+        store = PhotographyKnowledgeBase.get_vector_store()
+        PhotographyKnowledgeBase.get_index()
+        store.embedder.embed(["warm up"])  # first call initializes model kernels
+
+
+def warm_start(client=None, wait: bool = False) -> List[threading.Thread]:
+    """Run both warm-ups on background threads
+
+    The model load happens inside the Ollama process, so it overlaps with
+    loading the index here. Set WARM_START=0 to skip (e.g. in tests).
+    """
+    if os.getenv("WARM_START", "1") == "0":
+        return []
+    threads = [
+        threading.Thread(target=_quietly, args=(warm_up_model, client), name="warm-model", daemon=True),
+        threading.Thread(target=_quietly, args=(warm_up_knowledge,), name="warm-knowledge", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+    if wait:
+        for thread in threads:
+            thread.join()
+    return threads
+
+
+def _quietly(fn, *args):
+    try:
+        fn(*args)
+    except Exception as e:  # warm-up is best effort; the first request will retry
+        print(f"⚠️ Warm-up step {fn.__name__} failed: {e}")
+
+
+def main():
+    """python -m src.warmup: preload everything and exit (e.g. in a start script)"""
+    from src.utils import load_env_variables
+
+    load_env_variables()
+    warm_start(wait=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+Shared pytest configuration
+"""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_environment(monkeypatch):
+    """Keep tests off the persistent response cache and model downloads"""
+    monkeypatch.setenv("RESPONSE_CACHE", "0")
+    monkeypatch.setenv("EMBEDDING_MODEL", "hashing")
+
+
+@pytest.fixture(autouse=True)
+def isolated_knowledge_store(monkeypatch, tmp_path):
+    """Build the knowledge index under tmp_path, never over the developer's data/"""
+    from src import ingestion
+    from src.rag_pipeline import PhotographyKnowledgeBase
+
+    monkeypatch.setattr(PhotographyKnowledgeBase, "get_store_dir",
+                        staticmethod(lambda: tmp_path / "vector_stores" / "knowledge"))
+    monkeypatch.setattr(ingestion, "get_textbook_dir", lambda: tmp_path / "textbooks")
+    monkeypatch.setattr(PhotographyKnowledgeBase, "_vector_store", None)
+    monkeypatch.setattr(PhotographyKnowledgeBase, "_indexes", {})
+    yield
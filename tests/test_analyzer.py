@@ -0,0 +1,51 @@
+"""
+End-to-end tests for the coaching pipeline against the local Ollama stub
+"""
+
+import time
+
+import pytest
+
+from src.llm_client import LLMConfig, LLMTimeoutError, OllamaClient
+from src.photo_analyzer import PhotographyCoach
+from tools.ollama_stub import StubOllamaServer
+
+
+def test_coaching_feedback_covers_every_aspect_under_jitter():
+    with StubOllamaServer(latency=0.01, jitter=0.05, seed=1, parallel=2) as server:
+        client = OllamaClient(LLMConfig(base_url=server.base_url, timeout=5.0))
+        coach = PhotographyCoach(client)
+        feedback = coach.get_coaching_feedback("Mountain lake at golden hour with a pine tree on the left third.")
+        coach.close()
+        client.close()
+
+    assert [feedback[a]["status"] for a in coach.ASPECTS] == ["ok"] * 4
+    assert all(feedback[a]["sources"] for a in coach.ASPECTS)
+    assert server.stats["requests"] == 4
+
+
+def test_slow_aspects_time_out_without_holding_back_the_rest():
+    def reply(messages):
+        if "technical" in messages[-1]["content"].lower().split("analyze the ")[-1]:
+            time.sleep(1.0)
+        return "Fine."
+
+    with StubOllamaServer(reply=reply) as server:
+        client = OllamaClient(LLMConfig(base_url=server.base_url, timeout=5.0))
+        coach = PhotographyCoach(client, aspect_timeout=0.5)
+        started = time.perf_counter()
+        feedback = coach.get_coaching_feedback("Street portrait in harsh midday sun.")
+        elapsed = time.perf_counter() - started
+        # The timed-out request itself is abandoned, not left running on the worker
+        started = time.perf_counter()
+        with pytest.raises(LLMTimeoutError):
+            coach.analyze_technical("Street portrait in harsh midday sun.")
+        abandoned_after = time.perf_counter() - started
+        coach.close()
+        client.close()
+
+    assert feedback["technical"]["status"] == "timeout"
+    assert all(feedback[a]["status"] == "ok" for a in ("composition", "lighting", "storytelling"))
+    assert elapsed < 1.0
+    assert abandoned_after < 0.9
+    assert PhotographyCoach(aspect_timeout=0).aspect_timeout == 0  # explicit values are kept, even 0
@@ -0,0 +1,122 @@
+"""
+Tests for batch runs: resume, error retries, backoff and bounded read-ahead
+"""
+
+import csv
+import json
+import threading
+import time
+
+from src import batch_runner
+from src.batch_runner import BatchRunner
+from src.llm_client import LLMConfig, OllamaClient
+from src.photo_analyzer import PhotographyCoach
+from tools.ollama_stub import StubOllamaServer
+
+
+def read_lines(path):
+    return [json.loads(line) for line in open(path, encoding="utf-8")] if path.exists() else []
+
+
+def test_reruns_resume_from_the_checkpoint_and_retry_failures(tmp_path):
+    with open(tmp_path / "catalog.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, ["photo", "notes"])
+        writer.writeheader()
+        writer.writerows([{"photo": "a", "notes": "Lake at dawn"}, {"photo": "b", "notes": "Broken"},
+                          {"photo": "c", "notes": "Street at night"}, {"photo": "a", "notes": "Lake again"}])
+    output = tmp_path / "results.jsonl"
+    calls = []
+
+    def flaky(description):
+        calls.append(description)
+        if description == "Broken":
+            raise RuntimeError("model unavailable")
+        return {"composition": {"status": "ok", "feedback": description}}
+
+    first = BatchRunner(flaky, workers=2, retries=1, retry_backoff=0).run(
+        tmp_path / "catalog.csv", output, id_field="photo", description_field="notes")
+    errors = read_lines(tmp_path / "results.errors.jsonl")
+
+    calls.clear()
+    second = BatchRunner(lambda description: {"composition": {"status": "ok", "feedback": description}}).run(
+        tmp_path / "catalog.csv", output, id_field="photo", description_field="notes")
+
+    assert sorted(line["id"] for line in read_lines(output)) == ["a", "b", "c"]
+    assert errors == [{"id": "b", "error": "model unavailable"}]
+    assert (first["succeeded"], first["failed"], first["retries"], first["skipped"]) == (2, 1, 1, 1)
+    assert (second["processed"], second["skipped"]) == (1, 3)
+    assert [line["feedback"]["composition"]["feedback"] for line in read_lines(output) if line["id"] == "a"] == [
+        "Lake at dawn"]  # the repeated id was not analyzed again
+
+
+def test_retries_back_off_and_read_ahead_is_bounded(tmp_path, monkeypatch):
+    (tmp_path / "photos.jsonl").write_text(
+        "".join(json.dumps({"id": str(i), "description": f"Photo {i}"}) + "\n" for i in range(10)), encoding="utf-8")
+    attempts = []
+
+    def fails_twice(description):
+        attempts.append(time.perf_counter())
+        if len(attempts) < 3:
+            raise TimeoutError("busy")
+        return {}
+
+    runner = BatchRunner(fails_twice, workers=1, retries=2, retry_backoff=0.05)
+    one = tmp_path / "one.jsonl"
+    one.write_text('{"id": "1", "description": "One photo"}\n', encoding="utf-8")
+    stats = runner.run(one, tmp_path / "one-out.jsonl")
+    assert stats["succeeded"] == 1 and stats["retries"] == 2
+    assert attempts[1] - attempts[0] >= 0.05 and attempts[2] - attempts[1] >= 0.1
+
+    read = []
+    records = batch_runner.iter_records
+    monkeypatch.setattr(batch_runner, "iter_records", lambda *args: (read.append(r) or r for r in records(*args)))
+    gate = threading.Event()
+    runner = BatchRunner(lambda description: gate.wait(5) and {}, workers=1, max_pending=2)
+    thread = threading.Thread(target=runner.run, args=(tmp_path / "photos.jsonl", tmp_path / "out.jsonl"))
+    thread.start()
+    time.sleep(0.2)
+    read_while_blocked = len(read)
+    gate.set()
+    thread.join(5)
+
+    assert read_while_blocked == 3  # two in flight, the third waits for a slot
+    assert runner.stats["succeeded"] == 10
+
+
+def test_a_model_outage_is_a_failure_that_resume_retries(tmp_path):
+    photos = tmp_path / "photos.jsonl"
+    photos.write_text('{"id": "1", "description": "Harbour at dawn"}\n'
+                      '{"id": "2", "description": "Street at night"}\n', encoding="utf-8")
+    output = tmp_path / "results.jsonl"
+
+    with StubOllamaServer() as server:
+        coach = PhotographyCoach(OllamaClient(LLMConfig(base_url=server.base_url, timeout=5.0)), batched=False)
+        server.fail_status = 500
+        down = BatchRunner(coach.get_coaching_feedback, workers=2, retries=1, retry_backoff=0).run(photos, output)
+        server.fail_status = 0
+        up = BatchRunner(coach.get_coaching_feedback, workers=2, retries=1, retry_backoff=0).run(photos, output)
+        coach.close()
+
+    assert (down["succeeded"], down["failed"], down["retries"]) == (0, 2, 2)
+    assert [line["error"].startswith("every aspect failed") for line in
+            read_lines(tmp_path / "results.errors.jsonl")] == [True, True]
+    assert (up["processed"], up["succeeded"], up["skipped"]) == (2, 2, 0)
+    assert all(aspect["status"] == "ok" for line in read_lines(output) for aspect in line["feedback"].values())
+
+
+def test_partial_results_are_written_and_analyzed_again_on_resume(tmp_path):
+    photos = tmp_path / "photos.jsonl"
+    photos.write_text('{"id": "1", "description": "Harbour at dawn"}\n', encoding="utf-8")
+    output = tmp_path / "results.jsonl"
+
+    def lighting_times_out(description):
+        return {"composition": {"status": "ok"}, "lighting": {"status": "timeout"}}
+
+    first = BatchRunner(lighting_times_out, retries=0).run(photos, output)
+    second = BatchRunner(lambda description: {"composition": {"status": "ok"}, "lighting": {"status": "ok"}}
+                         ).run(photos, output)
+    third = BatchRunner(lighting_times_out).run(photos, output)
+
+    assert (first["succeeded"], first["partial"]) == (1, 1)
+    assert [line.get("incomplete") for line in read_lines(output)] == [["lighting"], None]
+    assert second["processed"] == 1 and third["skipped"] == 1
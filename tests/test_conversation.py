@@ -0,0 +1,63 @@
+"""
+Tests for follow-up conversations against the local stub server
+"""
+
+import time
+
+import pytest
+
+from src.conversation import ConversationStore
+from src.llm_client import LLMConfig, OllamaClient
+from src.photo_analyzer import PhotographyCoach
+from tools.ollama_stub import DEFAULT_REPLY, StubOllamaServer
+
+DESCRIPTION = "Mountain landscape at sunset with golden hour light on the peaks and a stream as a leading line."
+
+
+def test_follow_up_sends_only_the_question_with_the_previous_context():
+    with StubOllamaServer(prefill_delay=0.001) as server:
+        client = OllamaClient(LLMConfig(base_url=server.base_url, timeout=5.0))
+        coach = PhotographyCoach(client)
+
+        start = time.perf_counter()
+        analysis = "".join(coach.start_conversation("s1", DESCRIPTION))
+        first_s = time.perf_counter() - start
+        first = server.last_request
+
+        start = time.perf_counter()
+        answer = "".join(coach.follow_up("s1", "How would I fix the lighting?"))
+        follow_up_s = time.perf_counter() - start
+        follow_up = server.last_request
+        stats = coach.conversations.get_stats()
+        client.close()
+
+    assert analysis == answer == DEFAULT_REPLY
+    assert "PRINCIPLES" in first["prompt"] and "context" not in first
+    assert follow_up["prompt"] == "How would I fix the lighting?" and "system" not in follow_up
+    assert len(follow_up["context"]) > 0
+    assert follow_up_s < first_s / 3
+    assert stats["context_turns"] == 1 and stats["context_tokens"] > len(follow_up["context"])
+
+
+def test_evicted_conversation_continues_from_summary_and_idle_ones_expire():
+    with StubOllamaServer() as server:
+        client = OllamaClient(LLMConfig(base_url=server.base_url, timeout=5.0))
+        store = ConversationStore(client, max_context_tokens=1, summary_tokens=200)
+        "".join(store.start("a", DESCRIPTION))
+        "".join(store.start("b", "Portrait with soft window light from the left."))
+        assert store.get_stats()["evicted"] == 2  # each context alone is over the budget
+
+        "".join(store.ask("a", "Should I crop tighter?"))
+        summary_request = server.last_request
+        store.seed("c", "Street scene at night", "**Rating:** 6/10")
+        store.idle_ttl = 0
+        with pytest.raises(KeyError):
+            store.ask("b", "What about the background?")
+        client.close()
+
+    assert "context" not in summary_request
+    assert summary_request["prompt"].startswith("SUMMARY:\nPHOTO: Mountain landscape")
+    assert "ANALYSIS: " in summary_request["prompt"]
+    assert summary_request["prompt"].endswith("QUESTION: Should I crop tighter?")
+    assert store.stats["summary_turns"] == 1 and store.stats["expired"] == 3
+    assert store.context_tokens == 0
@@ -0,0 +1,58 @@
+"""
+Tests for the micro-batching embedding service
+"""
+
+import threading
+
+import numpy as np
+
+from src.embedding_service import EmbeddingService
+from src.embeddings import HashingEmbedder
+
+
+class RecordingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(len(texts))
+        return super().embed(texts)
+
+
+def test_concurrent_queries_share_batches_and_match_direct_embedding():
+    embedder = RecordingEmbedder()
+    service = EmbeddingService(embedder, max_batch_size=16, max_wait_ms=50)
+    queries = [f"portrait with window light number {i}" for i in range(12)]
+    results = {}
+    barrier = threading.Barrier(len(queries))
+
+    def query(text):
+        barrier.wait()
+        results[text] = service.embed([text])[0]
+
+    threads = [threading.Thread(target=query, args=(q,)) for q in queries]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    expected = HashingEmbedder().embed(queries)
+    for i, text in enumerate(queries):
+        np.testing.assert_allclose(results[text], expected[i], atol=1e-6)
+    assert len(embedder.calls) < len(queries)
+    assert service.get_stats()["mean_batch_size"] > 1
+
+
+def test_repeated_strings_are_cached_and_bulk_calls_bypass_the_window():
+    embedder = RecordingEmbedder()
+    service = EmbeddingService(embedder, max_batch_size=4, max_wait_ms=1)
+
+    first = service.embed(["golden hour", "golden hour", "blue hour"])
+    again = service.embed(["blue hour"])
+    assert embedder.calls == [2]
+    np.testing.assert_array_equal(first[2], again[0])
+    assert service.get_stats()["cache_hits"] == 1
+
+    service.embed([f"chunk {i}" for i in range(10)])
+    assert embedder.calls[1:] == [4, 4, 2]
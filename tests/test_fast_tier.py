@@ -0,0 +1,62 @@
+"""
+Tests for the keyword fast tier and escalation of the aspects it leaves to the model
+"""
+
+import json
+import time
+
+from src.fast_tier import FastTier
+from src.llm_client import LLMConfig, OllamaClient
+from src.photo_analyzer import PhotographyCoach
+from src.rag_pipeline import PhotographyKnowledgeBase
+from tools.ollama_stub import StubOllamaServer
+
+STREET = ("Urban street scene with commuters in motion. Harsh midday sun from the side creating strong "
+          "shadows and high contrast. No leading lines; the horizon is tilted and the sky overexposed.")
+
+
+def test_clear_cues_answer_from_the_knowledge_base_in_milliseconds():
+    tier = FastTier(PhotographyKnowledgeBase)
+    start = time.perf_counter()
+    results = tier.analyze(STREET, PhotographyKnowledgeBase.SECTIONS)
+    elapsed = time.perf_counter() - start
+
+    lighting = results["lighting"]
+    assert lighting["absorbed"] and lighting["confidence"] == 0.75  # harsh light, side lighting
+    assert lighting["improvements"] == ["Harsh vs Soft Light: Harsh: Direct sun, creates strong shadows (dramatic)"]
+    assert lighting["sources"] == ["Harsh vs Soft Light", "Side Lighting"]
+    assert lighting["suggestions"][0].startswith("Shoot in the golden hour")
+    assert lighting["rating"] < 6 and lighting["tier"] == "fast"
+    assert results["technical"]["absorbed"] and len(results["technical"]["improvements"]) == 2
+    assert results["composition"]["confidence"] == 0.0  # "No leading lines" is negated
+    assert elapsed < 0.05
+
+    one_rule = tier.analyze_aspect("lighting", "Harsh midday sun with strong shadows.")
+    assert one_rule["confidence"] == 0.5 and not one_rule["absorbed"]  # three phrases, one subsection
+    mixed = tier.analyze_aspect("lighting", "Soft window light, but harsh midday sun on the wall.")
+    assert mixed["confidence"] < tier.min_confidence  # soft and harsh: ambiguous
+    assert tier.get_stats() == {"requests": 1, "absorbed": 0, "skipped": 0, "aspects": 4, "aspects_absorbed": 2,
+                                "absorbed_fraction": 0.0, "aspect_absorbed_fraction": 0.5}
+
+
+def test_only_low_confidence_aspects_reach_the_model_unless_depth_is_asked():
+    def reply(messages):
+        aspects = messages[-1]["content"].split("Aspects, in order: ")[-1].split(", ")
+        return json.dumps({aspect: {"strengths": ["Model view"], "improvements": [], "suggestions": [],
+                                    "rating": 7} for aspect in aspects})
+
+    with StubOllamaServer(reply=reply) as server:
+        coach = PhotographyCoach(OllamaClient(LLMConfig(base_url=server.base_url, timeout=5.0)))
+        tiered = coach.get_tiered_analysis(STREET)
+        escalated_schema = server.last_request["format"]
+        deep = coach.get_tiered_analysis(STREET, depth=True)
+        stats = coach.fast_tier.get_stats()
+        coach.close()
+
+    assert {a: tiered[a]["tier"] for a in coach.ASPECTS} == {
+        "composition": "model", "lighting": "fast", "storytelling": "model", "technical": "fast"}
+    assert escalated_schema["required"] == ["composition", "storytelling"]
+    assert all(deep[a]["tier"] == "model" for a in coach.ASPECTS)
+    assert server.stats["requests"] == 2
+    assert tiered["overall_rating"] == round((tiered["lighting"]["rating"] + tiered["technical"]["rating"] + 14) / 4)
+    assert stats["requests"] == 2 and stats["skipped"] == 1 and stats["aspect_absorbed_fraction"] == 2 / 8
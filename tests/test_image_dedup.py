@@ -0,0 +1,77 @@
+"""
+Tests for perceptual hashing and near-duplicate reuse in batch runs
+"""
+
+import json
+import random
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+from src.batch_runner import BatchRunner
+from src.image_dedup import DuplicateIndex, MultiIndexHash, hamming, perceptual_hashes
+from src.image_pipeline import ImageCache
+
+
+def scene(seed, size=(480, 360)):
+    rng = np.random.default_rng(seed)
+    pixels = np.empty((size[1], size[0], 3))
+    pixels[...] = rng.uniform(60, 220, 3)
+    for _ in range(4):
+        x, y = rng.integers(0, size[0] - 120), rng.integers(0, size[1] - 90)
+        pixels[y:y + rng.integers(40, 90), x:x + rng.integers(40, 120)] = rng.uniform(0, 255, 3)
+    return Image.fromarray(pixels.astype(np.uint8))
+
+
+def distances(a, b):
+    a, b = perceptual_hashes(a), perceptual_hashes(b)
+    return tuple(hamming(int(a[name], 16), int(b[name], 16)) for name in ("phash", "dhash"))
+
+
+def test_edited_variants_match_and_multi_index_search_is_exact(tmp_path):
+    original = scene(0)
+    edited = ImageEnhance.Brightness(original.crop((8, 6, 472, 354))).enhance(1.08).resize((240, 180))
+    assert all(d <= 6 for d in distances(original, edited))
+    assert all(d > 14 for d in distances(original, scene(1)))
+
+    index = DuplicateIndex(tmp_path / "duplicates.jsonl")
+    assert index.add("a", perceptual_hashes(original)) == ("a", 0)
+    assert index.add("b", perceptual_hashes(scene(1)))[0] == "b"
+    assert index.add("c", perceptual_hashes(edited))[0] == "a"
+    reloaded = DuplicateIndex(tmp_path / "duplicates.jsonl")
+    assert reloaded.representative("c") == "a" and list(reloaded.clusters()) == [["a", "c"]]
+
+    rng = random.Random(0)
+    keys = [rng.getrandbits(64) for _ in range(2000)]
+    keys += [key ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for key in keys[:200]]
+    search = MultiIndexHash()
+    for i, key in enumerate(keys):
+        search.add(key, i)
+    for query in keys[:50] + [rng.getrandbits(64) for _ in range(20)]:
+        expected = sorted(i for i, key in enumerate(keys) if hamming(query, key) <= 10)
+        assert sorted(i for _, i in search.search(query, 10)) == expected
+
+
+def test_batch_runs_analyze_one_photo_per_cluster(tmp_path):
+    scene(0).save(tmp_path / "burst_1.jpg", quality=90)
+    ImageEnhance.Contrast(scene(0)).enhance(1.1).save(tmp_path / "burst_2.jpg", quality=70)
+    scene(1).save(tmp_path / "other.jpg", quality=90)
+    records = [{"id": name, "description": f"Photo {name}", "path": f"{name}.jpg"}
+               for name in ("burst_1", "burst_2", "other")]
+    (tmp_path / "catalog.jsonl").write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+
+    calls = []
+
+    def analyze(description, image=None):
+        calls.append(description)
+        return {"composition": {"status": "ok", "analysis": f"Feedback for {description}"}}
+
+    runner = BatchRunner(analyze, workers=2, dedup=DuplicateIndex(), image_cache=ImageCache(tmp_path / "cache"))
+    stats = runner.run(tmp_path / "catalog.jsonl", tmp_path / "results.jsonl", image_field="path")
+
+    lines = {line["id"]: line for line in map(json.loads, open(tmp_path / "results.jsonl", encoding="utf-8"))}
+    assert sorted(calls) == ["Photo burst_1", "Photo other"]
+    assert stats["deduplicated"] == 1 and stats["succeeded"] == 3
+    assert lines["burst_2"]["duplicate_of"] == "burst_1"
+    assert lines["burst_2"]["feedback"] == lines["burst_1"]["feedback"]
+    assert "duplicate_of" not in lines["other"]
@@ -0,0 +1,59 @@
+"""
+Tests for the image metrics engine on synthetic images with known answers
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from src.image_metrics import compute_metrics, metrics_facts
+from src.image_pipeline import image_facts
+
+SIZE = (480, 640)  # height, width
+
+
+def horizon(degrees: float) -> np.ndarray:
+    """Sky over land, split by an anti-aliased line rising to the right at the given angle"""
+    ys, xs = np.mgrid[:SIZE[0], :SIZE[1]]
+    t = math.radians(degrees)
+    sky = np.clip(0.5 - ((ys - SIZE[0] / 2) + (xs - SIZE[1] / 2) * math.tan(t)) * math.cos(t), 0, 1)[..., None]
+    return (sky * np.array([150, 180, 220]) + (1 - sky) * np.array([60, 90, 40])).astype(np.uint8)
+
+
+def subject_at(fx: float, fy: float) -> np.ndarray:
+    image = np.full((*SIZE, 3), (90, 120, 150), np.uint8)
+    x, y = int(fx * SIZE[1]), int(fy * SIZE[0])
+    image[y - 25:y + 25, x - 25:x + 25] = (230, 40, 30)
+    return image
+
+
+@pytest.mark.parametrize("degrees", [0, 5, -8])
+def test_horizon_tilt_is_measured(degrees):
+    tilt = compute_metrics(horizon(degrees))["horizon_tilt_deg"]
+    assert tilt == pytest.approx(degrees, abs=0.5)
+
+
+def test_subject_placement_on_a_third_versus_centred():
+    on_third = compute_metrics(subject_at(1 / 3, 1 / 3))["thirds"]
+    centred = compute_metrics(subject_at(1 / 2, 1 / 2))["thirds"]
+
+    assert on_third["placement"] == "thirds" and on_third["thirds_ratio"] > 2
+    assert centred["placement"] == "centre" and centred["centre_ratio"] > on_third["centre_ratio"]
+    assert "rule-of-thirds intersection" in metrics_facts(compute_metrics(subject_at(2 / 3, 2 / 3)), "composition")[0]
+    assert compute_metrics(np.full((*SIZE, 3), 128, np.uint8))["thirds"]["placement"] == "none"
+
+
+def test_clipped_highlights_and_shadows_reach_technical_and_lighting_facts():
+    image = np.zeros((*SIZE, 3), np.uint8)
+    image[:SIZE[0] // 4] = 255
+    image[SIZE[0] // 4:SIZE[0] // 2] = 128
+    metrics = compute_metrics(image)
+    exposure = metrics["exposure"]
+    assert exposure["clipped_highlights"] == pytest.approx(0.25, abs=0.01)
+    assert exposure["crushed_shadows"] == pytest.approx(0.5, abs=0.01)
+
+    lighting = image_facts({"metrics": metrics}, "lighting")
+    assert lighting == [f for f in image_facts({"metrics": metrics}, "technical") if f.startswith("Exposure")]
+    assert "(blown highlights)" in lighting[0] and "(crushed shadows)" in lighting[0]
+    assert sum(f.startswith("Exposure") for f in image_facts({"metrics": metrics})) == 1
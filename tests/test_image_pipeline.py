@@ -0,0 +1,74 @@
+"""
+Tests for image ingestion: bounded decoding, EXIF and the content-hash cache
+"""
+
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, JpegImagePlugin
+
+from src import image_pipeline
+from src.image_pipeline import ImageCache, extract_exif, format_camera_settings, ingest_image, open_image
+
+
+def jpeg_bytes(size=(4000, 3000), exif=None) -> bytes:
+    rng = np.random.default_rng(0)
+    pixels = np.repeat(np.repeat(rng.integers(0, 255, (size[1] // 100, size[0] // 100, 3)), 100, 0), 100, 1)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8)).save(buffer, "JPEG", quality=80, **({"exif": exif} if exif else {}))
+    return buffer.getvalue()
+
+
+def test_large_jpegs_decode_in_draft_mode_within_the_size_bound(monkeypatch):
+    decoded = []
+    draft = JpegImagePlugin.JpegImageFile.draft
+
+    def record(self, mode, size):
+        result = draft(self, mode, size)
+        decoded.append(self.size)
+        return result
+
+    monkeypatch.setattr(JpegImagePlugin.JpegImageFile, "draft", record)
+
+    image, _, original_size = open_image(jpeg_bytes(), max_size=1024)
+
+    assert decoded[0] == (2000, 1500)  # libjpeg scaled by 1/2 before decoding
+    assert original_size == (4000, 3000)
+    assert max(image.size) == 1024 and image.mode == "RGB"
+
+
+def test_exif_settings_and_orientation_are_extracted():
+    exif = Image.Exif()
+    exif[0x010F] = "Fujifilm"
+    exif[0x0110] = "X-T4"
+    exif[0x0112] = 6  # rotated: stored landscape, shown portrait
+    details = exif.get_ifd(0x8769)
+    details.update({0x829D: 2.8, 0x829A: 1 / 250, 0x8827: 400, 0x920A: 56.0})
+
+    image, raw, original_size = open_image(jpeg_bytes((800, 600), exif.tobytes()))
+    settings = extract_exif(raw)
+
+    assert image.size == original_size == (600, 800)
+    assert settings == {"aperture": 2.8, "shutter_seconds": 0.004, "iso": 400, "focal_length_mm": 56.0,
+                        "make": "Fujifilm", "camera": "X-T4"}
+    assert format_camera_settings(settings) == "f/2.8, 1/250s, ISO 400, 56mm"
+
+
+def test_cache_serves_repeat_uploads_until_features_version_changes(tmp_path, monkeypatch):
+    data = jpeg_bytes((1200, 800))
+    cache = ImageCache(tmp_path)
+    first = ingest_image(io.BytesIO(data), cache)
+    with pytest.raises(OSError):  # what the upload panel and batch runner catch
+        ingest_image(io.BytesIO(b"not an image"), cache)
+
+    def no_decode(*args, **kwargs):
+        raise AssertionError("cached image decoded again")
+
+    monkeypatch.setattr(image_pipeline, "open_image", no_decode)
+    assert ingest_image(data, cache) == first
+    assert first["analysis_size"] == [1024, 683] and first["original_size"] == [1200, 800]
+
+    monkeypatch.setattr(image_pipeline, "FEATURES_VERSION", image_pipeline.FEATURES_VERSION + 1)
+    with pytest.raises(AssertionError, match="decoded again"):
+        ingest_image(data, cache)
@@ -0,0 +1,30 @@
+"""
+Cold-start guard: app-facing modules must not import heavy dependencies
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+HEAVY_MODULES = ("numpy", "httpx", "faiss", "cv2", "PIL", "sentence_transformers", "torch")
+
+
+@pytest.mark.parametrize("module", ["src", "src.feedback", "src.image_pipeline", "src.scheduler",
+                                    "src.session_store", "src.structured_output", "src.telemetry",
+                                    "src.utils", "src.rag_pipeline", "src.photo_analyzer", "src.warmup"])
+def test_module_import_stays_lightweight(module):
+    probe = f"import sys, {module}; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", probe], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.split() == []
+
+
+def test_package_exports_resolve_lazily():
+    probe = ("import sys, src; before = 'src.rag_pipeline' in sys.modules; "
+             "src.PhotoAnalyzer; print(before, 'src.rag_pipeline' in sys.modules)")
+    result = subprocess.run([sys.executable, "-c", probe], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ["False", "True"]
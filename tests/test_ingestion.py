@@ -0,0 +1,109 @@
+"""
+Tests for incremental textbook ingestion
+"""
+
+import os
+
+from src.embeddings import HashingEmbedder
+from src.ingestion import builtin_source, iter_file_chunks, sync_store, textbook_sources
+from src.rag_pipeline import PhotographyKnowledgeBase
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__()
+        self.embedded = 0
+
+    def embed(self, texts):
+        self.embedded += len(texts)
+        return super().embed(texts)
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def test_markdown_is_chunked_by_heading_and_filed_by_section(tmp_path):
+    book = tmp_path / "field_guide.md"
+    write(book, "# Golden Hour\n\nWarm, low light with long shadows.\n\n"
+                "# Aperture\n\nA wide aperture such as f/1.8 blurs the background.\n")
+
+    chunks = list(iter_file_chunks(book, "textbooks/field_guide.md"))
+
+    assert [c["title"] for c in chunks] == ["Golden Hour", "Aperture"]
+    assert [c["section"] for c in chunks] == ["lighting", "technical"]
+    assert chunks[1]["id"] == "textbooks/field_guide.md#1"
+
+
+def test_only_changed_files_are_re_embedded(tmp_path):
+    books, store_dir = tmp_path / "textbooks", tmp_path / "store"
+    write(books / "lighting" / "window_light.md", "# Window Light\n\nSoft side light from a window.\n")
+    write(books / "composition.txt", "Place the horizon on a third.\n\nUse leading lines.\n")
+    write(books / "story.md", "# Moments\n\nWait for the decisive moment.\n")
+    builtin = builtin_source(PhotographyKnowledgeBase.get_chunks())
+    embedder = CountingEmbedder()
+
+    store, stats = sync_store(store_dir, [builtin] + textbook_sources(books), embedder)
+    assert stats["added"] == 4 and embedder.embedded == len(store)
+    builtin_rows = sum(1 for c in store.chunks if c["source"] == "builtin")
+
+    embedder.embedded = 0
+    store, stats = sync_store(store_dir, [builtin] + textbook_sources(books), embedder)
+    assert stats["unchanged"] == 4 and embedder.embedded == 0
+
+    write(books / "story.md", "# Moments\n\nWait for the decisive moment.\n\n# Emotion\n\nShow a feeling.\n")
+    (books / "composition.txt").unlink()
+    write(books / "exposure.md", "# Exposure\n\nCheck the histogram for clipped highlights.\n")
+    os.utime(books / "lighting" / "window_light.md")  # touched, content unchanged
+
+    store, stats = sync_store(store_dir, [builtin] + textbook_sources(books), embedder)
+
+    assert (stats["added"], stats["changed"], stats["removed"], stats["unchanged"]) == (1, 1, 1, 2)
+    assert embedder.embedded == stats["embedded_chunks"] == 3
+    sources = {c["source"] for c in store.chunks}
+    assert "textbooks/composition.txt" not in sources
+    assert sum(1 for c in store.chunks if c["source"] == "builtin") == builtin_rows
+    assert len(store.vectors) == len(store.chunks) == store.manifest["count"]
+    exposure = [c for c in store.chunks if c["source"] == "textbooks/exposure.md"]
+    assert [c["section"] for c in exposure] == ["technical"]
+
+
+def test_a_changed_file_that_fails_to_read_keeps_its_previous_rows(tmp_path):
+    books, store_dir = tmp_path / "textbooks", tmp_path / "store"
+    write(books / "story.md", "# Moments\n\nWait for the decisive moment.\n")
+    write(books / "exposure.md", "# Exposure\n\nCheck the histogram for clipped highlights.\n")
+    store, _ = sync_store(store_dir, textbook_sources(books), HashingEmbedder())
+    story_rows = [c for c in store.chunks if c["source"] == "textbooks/story.md"]
+
+    def unreadable():
+        raise OSError("truncated")
+
+    write(books / "story.md", "# Moments\n\nWait for the decisive moment.\n\n# Emotion\n\nShow a feeling.\n")
+    write(books / "exposure.md", "# Exposure\n\nExpose to the right.\n")
+    sources = textbook_sources(books)
+    sources[1].iter_chunks = unreadable  # story.md
+    store, stats = sync_store(store_dir, sources, HashingEmbedder())
+
+    assert stats["changed"] == 2 and stats["embedded_chunks"] == 1
+    assert [c for c in store.chunks if c["source"] == "textbooks/story.md"] == story_rows
+    assert len(store.vectors) == len(store.chunks) == store.manifest["count"] == 2
+
+    store, stats = sync_store(store_dir, textbook_sources(books), HashingEmbedder())
+    assert stats["changed"] == 1  # retried once it reads again
+    assert [c["title"] for c in store.chunks if c["source"] == "textbooks/story.md"] == ["Moments", "Emotion"]
+
+
+def test_touching_a_file_rewrites_only_the_manifest(tmp_path):
+    books, store_dir = tmp_path / "textbooks", tmp_path / "store"
+    write(books / "story.md", "# Moments\n\nWait for the decisive moment.\n")
+    sync_store(store_dir, textbook_sources(books), HashingEmbedder())
+    data_files = {path.name: path.stat().st_mtime_ns for path in store_dir.iterdir() if path.suffix != ".json"}
+
+    os.utime(books / "story.md", ns=(1, 1))
+    store, stats = sync_store(store_dir, textbook_sources(books), HashingEmbedder())
+
+    assert stats["unchanged"] == 1 and stats["embedded_chunks"] == 0
+    assert {path.name: path.stat().st_mtime_ns for path in store_dir.iterdir() if path.suffix != ".json"} == data_files
+    assert store.manifest["sources"]["textbooks/story.md"]["mtime_ns"] == 1
+    assert sync_store(store_dir, textbook_sources(books), HashingEmbedder())[0].manifest == store.manifest
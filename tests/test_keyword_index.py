@@ -0,0 +1,53 @@
+"""
+Tests for BM25 keyword search and hybrid retrieval
+"""
+
+from src.embeddings import HashingEmbedder
+from src.keyword_index import BM25Index, reciprocal_rank_fusion, tokenize
+from src.rag_pipeline import PhotographyKnowledgeBase
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        return super().embed(texts)
+
+
+def test_jargon_survives_tokenizing_and_ranks_first():
+    assert tokenize("Shot at F2.8, ISO3200 and 1/250s") == ["shot", "f/2.8", "iso", "3200", "1/250"]
+
+    index = BM25Index.build([
+        "Open the aperture to f/2.8 for creamy bokeh behind the subject.",
+        "Stop down to f/8 for landscapes that are sharp front to back.",
+        "Blue hour light is soft and cool after sunset.",
+    ])
+    scores, ids, coverage = index.search("bokeh at f/2.8", k=3)
+    assert ids[0] == 0 and coverage[0] == 1.0
+    assert list(scores) == sorted(scores, reverse=True)
+
+    _, ids, _ = index.search("f/2.8 light", k=3, rows=[1, 2])
+    assert list(ids) == [2]
+    assert reciprocal_rank_fusion([[1, 2, 3], [3, 1]])[0][0] == 1
+
+
+def test_hybrid_search_skips_the_embedding_for_obvious_keyword_hits(tmp_path, monkeypatch):
+    monkeypatch.setattr(PhotographyKnowledgeBase, "_vector_store", None)
+    monkeypatch.setattr(PhotographyKnowledgeBase, "_indexes", {})
+    books = tmp_path / "textbooks"
+    books.mkdir()
+    (books / "lenses.md").write_text("# Bokeh\n\nAt f/2.8 a portrait lens renders smooth bokeh.\n", encoding="utf-8")
+    embedder = CountingEmbedder()
+    PhotographyKnowledgeBase.get_vector_store(embedder, store_dir=tmp_path / "store", textbook_dir=books)
+    embedder.calls = 0
+
+    results = PhotographyKnowledgeBase.search("f/2.8 bokeh", k=3, section="technical")
+    assert results[0]["source"] == "textbooks/lenses.md"
+    assert embedder.calls == 0
+
+    results = PhotographyKnowledgeBase.search("A portrait with a softly blurred background", k=3)
+    assert embedder.calls == 1 and len(results) == 3
+    assert all(r["section"] == "lighting" for r in PhotographyKnowledgeBase.search("blue hour", section="lighting"))
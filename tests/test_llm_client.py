@@ -0,0 +1,117 @@
+"""
+Tests for the pooled Ollama client against the local stub server
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.feedback import generate_photography_feedback, stream_photography_feedback
+from src.llm_client import AsyncOllamaClient, LLMConfig, LLMError, LLMTimeoutError, OllamaClient
+from tools.ollama_stub import DEFAULT_REPLY, StubOllamaServer
+
+
+def make_config(server, **kwargs) -> LLMConfig:
+    return LLMConfig(base_url=server.base_url, timeout=kwargs.pop("timeout", 5.0), **kwargs)
+
+
+def test_concurrent_requests_reuse_pooled_connections():
+    with StubOllamaServer(latency=0.02) as server:
+        async def run():
+            client = AsyncOllamaClient(make_config(server, max_concurrency=2, max_connections=2))
+            messages = [{"role": "user", "content": "hi"}]
+            responses = await asyncio.gather(*[client.chat(messages) for _ in range(10)])
+            await client.aclose()
+            return responses
+
+        responses = asyncio.run(run())
+
+    assert [r["message"]["content"] for r in responses] == [DEFAULT_REPLY] * 10
+    assert server.stats["requests"] == 10
+    assert server.stats["connections"] <= 2
+
+
+def test_stream_yields_tokens_in_order():
+    with StubOllamaServer() as server:
+        client = OllamaClient(make_config(server))
+        chunks = list(client.chat_stream([{"role": "user", "content": "hi"}]))
+        client.close()
+
+    assert chunks[-1]["done"] is True
+    assert "".join(c["message"]["content"] for c in chunks) == DEFAULT_REPLY
+
+
+def test_request_timeout_raises():
+    with StubOllamaServer(latency=1.0) as server:
+        client = OllamaClient(make_config(server, timeout=0.1))
+        with pytest.raises(LLMTimeoutError):
+            client.chat([{"role": "user", "content": "hi"}])
+        client.close()
+
+
+def test_server_error_surfaces_in_feedback():
+    with StubOllamaServer() as server:
+        server.fail_status = 500
+        client = OllamaClient(make_config(server))
+        with pytest.raises(LLMError):
+            client.chat([{"role": "user", "content": "hi"}])
+        feedback = generate_photography_feedback("Mountain landscape at sunset", client=client)
+        client.close()
+
+    assert feedback.startswith("Error:")
+
+
+def test_closing_feedback_stream_cancels_generation():
+    with StubOllamaServer(token_delay=0.05) as server:
+        client = OllamaClient(make_config(server))
+        tokens = stream_photography_feedback("Mountain landscape at sunset", client=client)
+        first = next(tokens)
+        tokens.close()
+        deadline = time.monotonic() + 2
+        while not server.stats["cancelled"] and time.monotonic() < deadline:
+            time.sleep(0.02)
+        client.close()
+
+    assert first
+    assert server.stats["cancelled"] == 1
+    assert server.stats["tokens_sent"] < len(DEFAULT_REPLY.split(" "))
+
+
+def test_closing_a_stream_cancels_its_task_on_the_loop():
+    client = OllamaClient(LLMConfig(base_url="http://127.0.0.1:9"))
+    tasks = []
+
+    async def endless():
+        tasks.append(asyncio.current_task())
+        yield {"response": "first"}
+        await asyncio.sleep(60)
+        yield {"response": "never"}
+
+    stream = client._iterate(endless)
+    assert next(stream) == {"response": "first"}
+    stream.close()
+    client.run(asyncio.sleep(0.05))  # let the loop process the cancellation
+    client.close()
+
+    assert tasks[0].cancelled()
+
+
+def test_warm_up_loads_model_without_generating():
+    with StubOllamaServer() as server:
+        client = OllamaClient(make_config(server))
+        assert client.warm_up()
+        client.close()
+
+    assert server.loaded_models == [client.config.model]
+    assert server.stats["tokens_sent"] == 0
+
+
+def test_requests_after_close_fail_instead_of_hanging():
+    with StubOllamaServer() as server:
+        client = OllamaClient(make_config(server))
+        client.close()
+        with pytest.raises(LLMError):
+            client.chat([{"role": "user", "content": "hi"}])
+        with pytest.raises(LLMError):
+            list(client.chat_stream([{"role": "user", "content": "hi"}]))
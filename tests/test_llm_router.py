@@ -0,0 +1,82 @@
+"""
+Tests for routing model requests across several stub Ollama servers
+"""
+
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.feedback import stream_photography_feedback
+from src.llm_client import LLMConfig
+from src.llm_router import LLMRouter
+from tools.ollama_stub import DEFAULT_REPLY, StubOllamaServer
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def make_router(*urls, **kwargs) -> LLMRouter:
+    return LLMRouter(LLMConfig(base_url=",".join(urls), timeout=5.0), health_interval=0, **kwargs)
+
+
+def test_dispatch_prefers_loaded_model_then_spreads_load():
+    with StubOllamaServer(latency=0.1) as cold, StubOllamaServer(latency=0.1) as warm:
+        warm.loaded_models.append("llama3.2:3b")
+        router = make_router(cold.base_url, warm.base_url)
+        health = router.check_health()
+        router.chat(MESSAGES)
+        assert (cold.stats["requests"], warm.stats["requests"]) == (0, 1)
+
+        with ThreadPoolExecutor(8) as pool:
+            replies = list(pool.map(lambda _: router.chat(MESSAGES), range(8)))
+        router.close()
+
+    assert [backend["loaded"] for backend in health] == [[], ["llama3.2:3b"]]
+    assert [r["message"]["content"] for r in replies] == [DEFAULT_REPLY] * 8
+    assert cold.stats["requests"] >= 2 and warm.stats["requests"] >= 4
+
+
+def test_fails_over_and_recovers_after_health_check():
+    # A bound socket that never listens: connections to it are refused
+    with socket.socket() as down, StubOllamaServer() as failing, StubOllamaServer() as ok:
+        down.bind(("127.0.0.1", 0))
+        down_url = "http://127.0.0.1:%d" % down.getsockname()[1]
+        failing.fail_status = 500
+        router = make_router(down_url, failing.base_url, ok.base_url)
+        replies = [router.chat(MESSAGES)["message"]["content"] for _ in range(3)]
+        streamed = "".join(stream_photography_feedback("Mountain landscape at sunset", client=router))
+        unhealthy = [b["url"] for b in router.get_stats()["backends"] if not b["healthy"]]
+
+        failing.fail_status = 0
+        health = router.check_health()
+        router.close()
+
+    assert replies == [DEFAULT_REPLY] * 3
+    assert streamed == DEFAULT_REPLY
+    assert failing.base_url in unhealthy and ok.base_url not in unhealthy
+    assert [b["healthy"] for b in health] == [False, True, True]
+    assert ok.stats["requests"] == 4
+
+
+def test_drain_waits_for_in_flight_requests():
+    with StubOllamaServer(token_delay=0.02) as first, StubOllamaServer() as second:
+        router = make_router(first.base_url, second.base_url)
+        stream = router.chat_stream(MESSAGES)
+        next(stream)
+        busy = first if first.stats["requests"] else second
+
+        drained = []
+        drainer = threading.Thread(target=lambda: drained.append(router.drain(busy.base_url, timeout=5)))
+        drainer.start()
+        rest = list(stream)
+        drainer.join()
+        before = busy.stats["requests"]
+        for _ in range(3):
+            router.chat(MESSAGES)
+        after_drain = busy.stats["requests"]
+
+        router.resume(busy.base_url)
+        router.close()
+
+    assert drained == [True]
+    assert rest[-1]["done"] is True
+    assert after_drain == before
@@ -0,0 +1,84 @@
+"""
+Tests for the portfolio history store
+"""
+
+import calendar
+import sqlite3
+import threading
+
+from src.portfolio import PortfolioStore, history_analysis, ratings_from_analysis, ratings_from_text, recent_months
+
+
+def at(year, month, day=15):
+    return float(calendar.timegm((year, month, day, 12, 0, 0)))
+
+
+def test_progress_is_read_from_monthly_aggregates(tmp_path):
+    store = PortfolioStore(tmp_path / "portfolio.sqlite3")
+    for month, ratings in [(1, (4, 6)), (3, (7,)), (6, (8, 9))]:
+        for rating in ratings:
+            assert store.record("ana", f"Lake in month {month}", {"composition": rating, "overall": rating - 1},
+                                created_at=at(2026, month))
+    store.record("ben", "Street at night", {"composition": 2}, created_at=at(2026, 6))
+    store.record("ana", "Old shot", {"composition": 1}, created_at=at(2025, 11))
+    store.flush()
+
+    assert recent_months(3, now=at(2026, 2)) == ["2025-12", "2026-01", "2026-02"]
+    progress = store.progress("ana", months=6, now=at(2026, 6, 30))
+    composition = progress["composition"]
+    assert [m["month"] for m in composition["months"]] == ["2026-01", "2026-02", "2026-03",
+                                                            "2026-04", "2026-05", "2026-06"]
+    assert [m["mean"] for m in composition["months"]] == [5.0, None, 7.0, None, None, 8.5]
+    assert composition["count"] == 5 and composition["mean"] == 6.8
+    assert progress["overall"]["mean"] == 5.8
+    assert store.progress("nobody", aspects=["composition"])["composition"]["count"] == 0
+
+    db = sqlite3.connect(str(tmp_path / "portfolio.sqlite3"))
+    before = db.execute("SELECT * FROM monthly_scores ORDER BY 1, 2, 3").fetchall()
+    store.rebuild_aggregates()
+    assert db.execute("SELECT * FROM monthly_scores ORDER BY 1, 2, 3").fetchall() == before
+    plan = " ".join(row[-1] for row in db.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM monthly_scores WHERE user_id = 'ana' AND month >= '2026-01'"))
+    assert "SCAN" not in plan
+    db.close()
+    store.close()
+
+
+def test_history_pages_newest_first_and_full_queue_drops(tmp_path):
+    store = PortfolioStore(tmp_path / "portfolio.sqlite3")
+    for day in range(1, 6):
+        store.record("ana", f"Shot {day}", {"overall": day + 3}, feedback=f"Rating: {day + 3}/10",
+                     created_at=at(2026, 5, day))
+    store.flush()
+
+    page = store.history("ana", limit=2)
+    assert [row["description"] for row in page] == ["Shot 5", "Shot 4"]
+    page = store.history("ana", limit=2, before=page[-1]["created_at"])
+    assert [row["description"] for row in page] == ["Shot 3", "Shot 2"]
+    assert [row["ratings"]["overall"] for row in store.best("ana", limit=2)] == [8, 7]
+    store.close()
+
+    # Hold the writer on its first batch so the one-slot queue stays full
+    full = PortfolioStore(tmp_path / "full.sqlite3", max_pending=1)
+    gate = threading.Event()
+    write = full._write
+    full._write = lambda items: (gate.wait(), write(items))
+    saved = [full.record("ana", f"Shot {i}", {"overall": 5}) for i in range(3)]
+    assert saved[0] and False in saved
+    assert full.get_stats()["dropped"] == saved.count(False)
+    gate.set()
+    full.flush()
+    assert len(full.history("ana")) == saved.count(True)
+    full.close()
+
+    assert ratings_from_text("Nice light.\nRating: 7.5/10 - crop tighter") == {"overall": 8}
+    assert ratings_from_analysis({"lighting": {"status": "ok", "rating": 6}, "technical": {"status": "timeout"},
+                                  "overall_rating": 6}) == {"lighting": 6, "overall": 6}
+
+    fast = {"lighting": {"status": "ok", "rating": 5, "tier": "fast"}}
+    failed = {**fast, "composition": {"status": "error", "error": "connection refused"}, "overall_rating": 5}
+    assert history_analysis(failed, ["composition"]) is None  # the fast tier's rating alone isn't saved
+    partial = {**failed, "storytelling": {"status": "ok", "rating": 8}}
+    assert history_analysis(partial, ["composition", "storytelling"]) == {
+        "lighting": fast["lighting"], "storytelling": {"status": "ok", "rating": 8}, "overall_rating": 6}
+    assert history_analysis(fast) == {**fast, "overall_rating": 5}
@@ -0,0 +1,66 @@
+"""
+Tests for token-budgeted prompt assembly
+"""
+
+from src.feedback import build_feedback_prompt
+from src.prompt_builder import ASPECT_SYSTEM, FEEDBACK_SYSTEM, PromptBuilder, estimate_tokens
+from src.rag_pipeline import PhotographyKnowledgeBase
+
+
+def make_chunks(section, count, words=60):
+    return [
+        {"id": f"{section}-{i}", "section": section, "title": f"{section} {i}",
+         "text": f"{section} principle {i}: " + "keep the frame simple and deliberate " * (words // 6),
+         "score": 1.0 - i / 100}
+        for i in range(count)
+    ]
+
+
+def test_prompt_stays_within_budget_and_prefers_top_chunks():
+    builder = PromptBuilder(context_window=700, max_output_tokens=200, max_chunks_per_aspect=10)
+    candidates = {aspect: make_chunks(aspect, 10) for aspect in ("composition", "lighting")}
+
+    prompt = builder.build(ASPECT_SYSTEM, "Harbour at dawn with fishing boats.", candidates,
+                           facts=["Horizon: tilted 2.5°"])
+
+    assert prompt.tokens <= builder.input_budget == 500
+    assert builder.count_messages(prompt.messages) == prompt.tokens
+    ids = [c["id"] for c in prompt.sources]
+    for aspect in ("composition", "lighting"):
+        picked = [i for i in ids if i.startswith(aspect)]
+        assert picked == [f"{aspect}-{n}" for n in range(len(picked))]
+        assert picked
+    assert len(ids) < 20
+    assert prompt.options == {"num_ctx": 700, "num_predict": 200}
+
+
+def test_chunk_cap_applies_when_budget_is_ample():
+    builder = PromptBuilder(context_window=8192, max_output_tokens=512, max_chunks_per_aspect=2)
+    prompt = builder.build(ASPECT_SYSTEM, "Street scene.", {"composition": make_chunks("composition", 6)})
+
+    assert [c["id"] for c in prompt.sources] == ["composition-0", "composition-1"]
+
+
+def test_oversized_description_is_trimmed_to_fit():
+    builder = PromptBuilder(context_window=600, max_output_tokens=100)
+    description = "A crowded night market lit by paper lanterns and neon signs. " * 200
+
+    prompt = builder.build(ASPECT_SYSTEM, description, {"lighting": make_chunks("lighting", 5)})
+
+    assert estimate_tokens(description) > builder.input_budget
+    assert prompt.tokens <= builder.input_budget
+    assert "PHOTO: A crowded night market" in prompt.user
+
+
+def test_feedback_prompts_share_a_stable_system_prefix():
+    PhotographyKnowledgeBase.get_vector_store()
+    builder = PromptBuilder(context_window=1024, max_output_tokens=256)
+
+    first = build_feedback_prompt("Portrait with soft window light from the left.", builder)
+    second = build_feedback_prompt("Mountain lake at golden hour with reflections.", builder)
+
+    assert first.messages[0] == second.messages[0] == {"role": "system", "content": FEEDBACK_SYSTEM}
+    assert first.user != second.user
+    for prompt in (first, second):
+        assert prompt.tokens <= builder.input_budget
+        assert {c["section"] for c in prompt.sources} == {"composition", "lighting"}
@@ -0,0 +1,89 @@
+"""
+Tests for quantized and approximate vector indexes and column-wise chunk storage
+"""
+
+import numpy as np
+import pytest
+
+from src.embeddings import HashingEmbedder
+from src.rag_pipeline import PhotographyKnowledgeBase
+from src import vector_index
+from src.vector_index import NumpyIndex, QuantizedIndex, build_index
+from src.vector_store import ChunkTable, VectorStore
+
+
+def clustered_vectors(n=3000, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((60, dim))
+    vectors = centers[rng.integers(0, 60, n)] + 0.3 * rng.standard_normal((n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def test_quantized_indexes_recover_exact_results_after_rerank(tmp_path):
+    vectors = clustered_vectors()
+    queries = vectors[:20] + 0.01
+    rows = np.arange(0, len(vectors), 2)
+    _, truth = NumpyIndex(vectors).search(queries, 5)
+    _, truth_rows = NumpyIndex(vectors).search(queries, 5, rows)
+
+    for mode in ("float16", "int8", "pq"):
+        index = QuantizedIndex(vectors, mode, rerank=50)
+        assert index.nbytes < vectors.nbytes
+        _, ids = index.search(queries, 5)
+        assert np.mean([len(np.intersect1d(a, b)) / 5 for a, b in zip(ids, truth)]) >= 0.95
+        _, ids = index.search(queries, 5, rows)
+        assert set(ids.ravel()) <= set(rows)
+        assert np.mean([len(np.intersect1d(a, b)) / 5 for a, b in zip(ids, truth_rows)]) >= 0.95
+
+    built = build_index(vectors, "pq", cache_dir=tmp_path, cache_key="v1")
+    cached = build_index(vectors, "pq", cache_dir=tmp_path, cache_key="v1")
+    np.testing.assert_array_equal(built.codes, cached.codes)
+    assert QuantizedIndex.load(tmp_path / "index-pq.npz", vectors, key="v2") is None
+
+
+@pytest.mark.parametrize("backend", ["hnsw", "ivf"])
+def test_faiss_indexes_match_exact_search_with_and_without_a_row_filter(backend, monkeypatch):
+    pytest.importorskip("faiss")
+    vectors = clustered_vectors()
+    queries = vectors[:20] + 0.01
+    rows = np.arange(0, len(vectors), 2)
+    exact = NumpyIndex(vectors)
+    index = build_index(vectors, backend)
+    assert index.name == f"faiss-{backend}"
+
+    def recall(ids, truth):
+        return np.mean([len(np.intersect1d(a, b)) / 5 for a, b in zip(ids, truth)])
+
+    _, ids = index.search(queries, 5)
+    assert recall(ids, exact.search(queries, 5)[1]) >= 0.95
+
+    scans = []
+    monkeypatch.setattr(index.exact, "search", lambda *args: scans.append(args) or exact.search(*args))
+    monkeypatch.setattr(vector_index, "EXACT_SCAN_THRESHOLD", 100)  # filter by over-fetching, not exactly
+    _, ids = index.search(queries, 5, rows)
+    assert not scans and set(ids.ravel()) <= set(rows)
+    assert recall(ids, exact.search(queries, 5, rows)[1]) >= 0.95
+
+    few = rows[:150]  # too selective for the over-fetch: falls back to an exact scan
+    _, ids = index.search(queries, 5, few)
+    assert len(scans) == 1
+    np.testing.assert_array_equal(ids, exact.search(queries, 5, few)[1])
+
+def test_chunk_columns_round_trip_through_the_store(tmp_path):
+    chunks = PhotographyKnowledgeBase.get_chunks() + [
+        {"id": "textbooks/ümlaut.md#0", "section": "lighting", "title": "Licht", "text": "Gegenlicht — ☀",
+         "source": "textbooks/ümlaut.md"},
+    ]
+    table = ChunkTable.from_dicts(chunks)
+    assert list(table) == chunks and table[-1] == chunks[-1]
+
+    (tmp_path / "chunks.json").write_text("[]", encoding="utf-8")  # left by a pre-columnar store
+    VectorStore(HashingEmbedder().embed([c["text"] for c in chunks]), chunks, {"count": len(chunks)}).save(tmp_path)
+    assert not (tmp_path / "chunks.json").exists()
+    store = VectorStore.load(tmp_path)
+
+    assert [store.chunks[i] for i in range(len(store))] == chunks
+    lighting = store.section_rows("lighting")
+    assert list(lighting) == [i for i, c in enumerate(chunks) if c["section"] == "lighting"]
+    assert list(store.chunks.rows_where("source", ["textbooks/ümlaut.md", "missing"])) == [len(chunks) - 1]
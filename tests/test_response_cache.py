@@ -0,0 +1,64 @@
+"""
+Tests for the exact + semantic response cache
+"""
+
+import time
+
+from src.embeddings import HashingEmbedder
+from src.response_cache import ResponseCache
+
+MODEL = "llama3.2:3b"
+DESCRIPTION = (
+    "Mountain landscape at sunset with golden hour light illuminating the peaks. "
+    "A stream winds through the foreground creating leading lines."
+)
+
+
+def make_cache(**kwargs) -> ResponseCache:
+    kwargs.setdefault("embedder", HashingEmbedder())
+    return ResponseCache(**kwargs)
+
+
+def test_exact_hit_ignores_case_and_whitespace():
+    cache = make_cache(similarity_threshold=None)
+    cache.put(DESCRIPTION, MODEL, "1", "Great shot")
+
+    assert cache.get("  " + DESCRIPTION.upper().replace(" ", "   "), MODEL, "1") == "Great shot"
+    assert cache.get(DESCRIPTION, MODEL, "2") is None
+    assert cache.get(DESCRIPTION, "other-model", "1") is None
+    assert cache.get_stats()["exact_hits"] == 1
+
+
+def test_semantic_hit_for_near_duplicate():
+    cache = make_cache(similarity_threshold=0.8)
+    cache.put(DESCRIPTION, MODEL, "1", "Great shot")
+
+    assert cache.get(DESCRIPTION.replace("stream", "small stream"), MODEL, "1") == "Great shot"
+    assert cache.get("Portrait with soft window light from the left", MODEL, "1") is None
+    stats = cache.get_stats()
+    assert (stats["semantic_hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_lru_and_ttl_eviction():
+    cache = make_cache(max_entries=2, similarity_threshold=None)
+    cache.put("first photo", MODEL, "1", "a")
+    cache.put("second photo", MODEL, "1", "b")
+    cache.get("first photo", MODEL, "1")
+    cache.put("third photo", MODEL, "1", "c")
+
+    assert cache.get("second photo", MODEL, "1") is None
+    assert cache.get("first photo", MODEL, "1") == "a"
+
+    cache.ttl_seconds = 0
+    time.sleep(0.01)
+    assert cache.get("third photo", MODEL, "1") is None
+
+
+def test_sqlite_persistence(tmp_path):
+    db_path = tmp_path / "responses.sqlite3"
+    make_cache(db_path=db_path).put(DESCRIPTION, MODEL, "1", "Great shot")
+
+    reopened = make_cache(db_path=db_path, similarity_threshold=0.8)
+    assert reopened.get(DESCRIPTION, MODEL, "1") == "Great shot"
+    assert reopened.get(DESCRIPTION + " with a tiny boat", MODEL, "1") == "Great shot"
@@ -0,0 +1,109 @@
+"""
+Tests for the session-fair request scheduler
+"""
+
+import threading
+
+import pytest
+
+from src.scheduler import RequestExpiredError, RequestScheduler, SchedulerBusyError
+
+
+def blocker():
+    """A job that holds the single worker until released"""
+    release = threading.Event()
+    return release, lambda: release.wait(5) and "unblocked"
+
+
+def test_sessions_are_served_round_robin():
+    scheduler = RequestScheduler(max_active=1, max_queue=10, max_per_session=5)
+    release, hold = blocker()
+    first = scheduler.submit("hold", hold)
+    first.wait_started(1)
+
+    order = []
+    tickets = [scheduler.submit(s, lambda s=s, i=i: order.append(f"{s}{i}"))
+               for s, i in (("a", 1), ("a", 2), ("a", 3), ("b", 1))]
+    assert [t.position() for t in tickets] == [1, 3, 4, 2]
+
+    release.set()
+    for ticket in tickets:
+        ticket.result(2)
+    assert order == ["a1", "b1", "a2", "a3"]
+    scheduler.shutdown()
+
+
+def test_identical_requests_share_one_generation():
+    scheduler = RequestScheduler(max_active=1)
+    calls = []
+    go = threading.Event()
+
+    def generate():
+        calls.append(1)
+        go.wait(2)
+        yield from ["Strong ", "leading ", "lines."]
+
+    first = scheduler.submit("a", generate, key="same photo")
+    second = scheduler.submit("b", generate, key="same photo")
+    go.set()
+
+    assert second.coalesced and not first.coalesced
+    assert "".join(first.stream()) == "".join(second.stream()) == "Strong leading lines."
+    assert len(calls) == 1
+    assert scheduler.get_stats()["coalesced"] == 1
+    scheduler.shutdown()
+
+
+def test_saturation_sheds_load_with_retry_hint():
+    scheduler = RequestScheduler(max_active=1, max_queue=2, max_per_session=1)
+    release, hold = blocker()
+    scheduler.submit("hold", hold).wait_started(1)
+    scheduler.submit("a", lambda: "a")
+
+    with pytest.raises(SchedulerBusyError):
+        scheduler.submit("a", lambda: "again")  # per-session share
+    scheduler.submit("b", lambda: "b")
+    with pytest.raises(SchedulerBusyError) as busy:
+        scheduler.submit("c", lambda: "c")  # whole queue
+    assert busy.value.retry_after > 0
+    assert scheduler.get_stats()["rejected"] == 2
+
+    release.set()
+    scheduler.shutdown()
+
+
+def test_cancelled_and_stale_requests_never_run():
+    scheduler = RequestScheduler(max_active=1, max_wait=0.05)
+    release, hold = blocker()
+    scheduler.submit("hold", hold).wait_started(1)
+    ran = []
+    abandoned = scheduler.submit("a", lambda: ran.append("a"))
+    stale = scheduler.submit("b", lambda: ran.append("b"))
+    abandoned.cancel()
+
+    threading.Event().wait(0.1)
+    release.set()
+    with pytest.raises(RequestExpiredError):
+        stale.result(2)
+    assert ran == []
+    assert abandoned.status == "cancelled"
+    scheduler.shutdown()
+
+
+def test_a_cancelled_running_request_is_not_joined_by_a_retry():
+    scheduler = RequestScheduler(max_active=2)
+    go = threading.Event()
+
+    def generate(text):
+        go.wait(2)
+        yield text
+
+    abandoned = scheduler.submit("a", lambda: generate("first"), key="same photo")
+    abandoned.wait_started(1)
+    abandoned.cancel()  # the worker is still blocked inside the generation
+    retry = scheduler.submit("a", lambda: generate("second"), key="same photo")
+    go.set()
+
+    assert not retry.coalesced
+    assert retry.result(2) == "second"
+    scheduler.shutdown()
@@ -0,0 +1,22 @@
+"""
+Tests for bounded per-session state
+"""
+
+from src.session_store import SessionResults, session_results
+
+
+def test_results_are_bounded_by_count_and_size():
+    results = SessionResults(max_entries=3, max_bytes=10_000)
+    for i in range(5):
+        results.put(f"photo {i}", {"feedback": "Nice light. " * 10})
+    assert len(results) == 3 and results.evictions == 2
+    assert results.get("photo 0") is None and results.get("photo 2") is not None
+
+    results.put("photo 5", {"feedback": "x" * 9_800})  # photo 2 was just used, so 3 and 4 go
+    assert "photo 2" in results and "photo 3" not in results and "photo 4" not in results
+    assert results.nbytes <= 10_000
+    results.put("huge", {"feedback": "x" * 50_000})
+    assert len(results) == 1 and results.get("huge") is not None
+
+    state = {}
+    assert session_results(state) is session_results(state)
@@ -0,0 +1,91 @@
+"""
+Tests for request spans, token accounting and metrics export
+"""
+
+import threading
+
+from src.feedback import stream_photography_feedback
+from src.llm_client import LLMConfig, OllamaClient
+from src.telemetry import MetricsRegistry, cpu_timed, registry, span, track_request
+from tools.ollama_stub import StubOllamaServer
+
+
+def test_histogram_exports_prometheus_and_json():
+    metrics = MetricsRegistry(prefix="test_")
+    latency = metrics.histogram("latency_seconds", "Test latency")
+    for value in (0.004, 0.02, 0.02, 0.3):
+        latency.observe(value, stage="retrieval")
+    metrics.counter("requests_total", "Test requests").inc(3)
+
+    text = metrics.to_prometheus()
+    assert "# TYPE test_latency_seconds histogram" in text
+    assert 'test_latency_seconds_bucket{stage="retrieval",le="0.025"} 3' in text
+    assert 'test_latency_seconds_bucket{stage="retrieval",le="+Inf"} 4' in text
+    assert "test_requests_total 3" in text
+
+    summary = metrics.to_json()["test_latency_seconds"]['{stage="retrieval"}']
+    assert summary["count"] == 4
+    assert 0.01 <= summary["p50"] <= 0.025
+
+
+def test_streamed_request_records_spans_and_tokens():
+    tokens = registry.counter("llm_tokens_total")
+    completion_before = tokens.value(kind="completion")
+
+    with StubOllamaServer(token_delay=0.01) as server:
+        client = OllamaClient(LLMConfig(base_url=server.base_url, timeout=5.0))
+        with track_request("feedback") as trace:
+            with span("retrieval"):
+                pass
+            text = "".join(stream_photography_feedback("Lighthouse at dusk", client=client))
+        client.close()
+
+    assert text
+    timings = trace.summary()
+    for name in ("retrieval", "prompt_build", "llm_ttft", "llm_generation"):
+        assert name in timings
+    assert timings["llm_ttft"] <= timings["llm_generation"]
+    assert trace.duration * 1000 >= timings["llm_generation"]
+    assert tokens.value(kind="completion") - completion_before == server.stats["tokens_sent"]
+
+
+def test_cpu_timed_records_thread_cpu_not_wall_time():
+    import time
+
+    @cpu_timed("rerun", scope="test")
+    def busy_then_idle():
+        deadline = time.thread_time() + 0.02
+        while time.thread_time() < deadline:
+            pass
+        time.sleep(0.1)
+        return "done"
+
+    assert busy_then_idle() == "done"
+    cpu = registry.histogram("cpu_seconds").to_dict()['{scope="test",span="rerun"}']
+    assert cpu["count"] == 1 and 0.02 <= cpu["sum"] < 0.1
+
+
+def test_overlapping_profiled_requests_profile_one_and_run_both(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_REQUESTS", "cprofile")
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    inside, release = threading.Event(), threading.Event()
+    traces = []
+
+    def first():
+        with track_request("first") as trace:
+            inside.set()
+            release.wait(5)
+        traces.append(trace)
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    inside.wait(5)
+    with track_request("second") as second:  # raised ValueError on Python 3.12+
+        pass
+    release.set()
+    thread.join(5)
+
+    assert second.profile_path is None and traces[0].profile_path.endswith(".prof")
+    with track_request("third") as third:
+        pass
+    assert third.profile_path is not None  # the lock was released
@@ -0,0 +1,17 @@
+"""
+Tests for the Learn tab's knowledge formatting
+"""
+
+from src.rag_pipeline import PhotographyKnowledgeBase
+from src.utils import format_knowledge
+
+
+def test_knowledge_sections_format_as_markdown_without_their_title():
+    text = format_knowledge(PhotographyKnowledgeBase.get_section_knowledge("composition"))
+    assert text.startswith("**Rule of Thirds**\n- Divide frame into 3x3 grid")
+    assert "COMPOSITION PRINCIPLES" not in text
+
+    for section in PhotographyKnowledgeBase.SECTIONS:
+        lines = format_knowledge(PhotographyKnowledgeBase.get_section_knowledge(section)).splitlines()
+        assert lines[0].startswith("**") and lines[0].endswith("**")
+        assert not any(line.rstrip(":").isupper() for line in lines)
@@ -0,0 +1,4 @@
+"""
+Development Tools
+Test and benchmark helpers kept out of the application package
+"""
@@ -0,0 +1,250 @@
+"""
+Ollama Stub Server
+Minimal Ollama-compatible HTTP server for tests and benchmarks
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+DEFAULT_REPLY = (
+    "**Composition:** Strong use of leading lines. Try placing the subject on a "
+    "third.\n**Lighting:** Warm golden hour light works well.\n**Rating:** 7/10"
+)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.stub._count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: Dict, status: int = 200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, payload: Dict):
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        stub = self.server.stub
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": m, "model": m} for m in stub.models]})
+        elif self.path == "/api/ps":
+            self._send_json({"models": [{"name": m, "model": m} for m in stub.loaded_models]})
+        elif self.path == "/api/version":
+            self._send_json({"version": "0.0.0-stub"})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        stub = self.server.stub
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path not in ("/api/chat", "/api/generate"):
+            self._send_json({"error": "not found"}, status=404)
+            return
+        stub._count("requests")
+        stub.last_request = request
+        if stub.fail_status:
+            self._send_json({"error": "stub failure"}, status=stub.fail_status)
+            return
+        with stub.slot():
+            self._generate(stub, request)
+
+    def _generate(self, stub: "StubOllamaServer", request: Dict):
+        chat = self.path == "/api/chat"
+        model = request.get("model", stub.models[0])
+        if request.get("keep_alive") is not None and model not in stub.loaded_models:
+            stub.loaded_models.append(model)
+        prompt = request.get("messages", []) if chat else request.get("prompt", "")
+        reply = stub.reply(prompt) if (chat or prompt) else ""
+        tokens = [t + " " for t in reply.split(" ")] if reply else []
+        if tokens:
+            tokens[-1] = tokens[-1].rstrip(" ")
+        # A passed-in context is already evaluated (a warm KV cache); only new text is prefilled
+        prompt_tokens = len(json.dumps(prompt) + request.get("system", "")) // 4 if (chat or prompt) else 0
+        started = time.perf_counter()
+        latency = stub.sample_latency() + stub.prefill_delay * prompt_tokens
+        time.sleep(latency)
+
+        def piece(text: str) -> Dict:
+            base = {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"), "done": False}
+            if chat:
+                base["message"] = {"role": "assistant", "content": text}
+            else:
+                base["response"] = text
+            return base
+
+        def final() -> Dict:
+            elapsed = int((time.perf_counter() - started) * 1e9)
+            done = piece("")
+            done.update({
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": elapsed,
+                "load_duration": 0,
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(latency * 1e9),
+                "eval_count": len(tokens),
+                "eval_duration": max(elapsed - int(latency * 1e9), 1),
+            })
+            if not chat:
+                done["context"] = list(request.get("context") or []) + list(range(prompt_tokens + len(tokens)))
+            return done
+
+        if not request.get("stream", True):
+            time.sleep(stub.token_delay * len(tokens))
+            payload = final()
+            if chat:
+                payload["message"]["content"] = reply
+            else:
+                payload["response"] = reply
+            self._send_json(payload)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in tokens:
+                time.sleep(stub.token_delay)
+                self._write_chunk(piece(token))
+                stub._count("tokens_sent")
+            self._write_chunk(final())
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            stub._count("cancelled")
+            self.close_connection = True
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-response is expected (timeouts, cancellation)
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubOllamaServer:
+    """Threaded Ollama look-alike serving /api/chat, /api/generate, /api/tags and /api/ps
+
+    Use as a context manager; base_url points at the bound port. Counters
+    record connections, requests, streamed tokens and client cancellations.
+    Like OLLAMA_NUM_PARALLEL, parallel caps how many requests generate at
+    once (0 = unlimited); the rest wait for a slot, as on a real server.
+    prefill_delay adds that many seconds per prompt token before the first
+    token, so long prompts cost more than short follow-ups.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 models: Optional[List[str]] = None,
+                 reply: Optional[Callable] = None,
+                 token_delay: float = 0.0, latency: float = 0.0,
+                 jitter: float = 0.0, seed: Optional[int] = None, parallel: int = 0,
+                 prefill_delay: float = 0.0):
+        self.models = models or ["llama3.2:3b"]
+        self.loaded_models: List[str] = []
+        self.reply = reply or (lambda prompt: DEFAULT_REPLY)
+        self.token_delay = token_delay
+        self.latency = latency
+        self.jitter = jitter
+        self.prefill_delay = prefill_delay
+        self._random = random.Random(seed)
+        self._slots = threading.Semaphore(parallel) if parallel else None
+        self.fail_status = 0
+        self.last_request: Optional[Dict] = None
+        self.stats = {"connections": 0, "requests": 0, "tokens_sent": 0, "cancelled": 0}
+        self._lock = threading.Lock()
+        self._server = _StubHTTPServer((host, port), _StubHandler)
+        self._server.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    def sample_latency(self) -> float:
+        """Prefill latency for one request: latency plus up to jitter seconds"""
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold one of the parallel generation slots"""
+        if self._slots is None:
+            yield
+            return
+        with self._slots:
+            yield
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Ollama API, e.g. to load-test the app")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--tokens-per-second", type=float, default=20.0, help="Generation rate (0 = instant)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--parallel", type=int, default=1, help="Requests generated at once (0 = unlimited)")
+    parser.add_argument("--prefill-ms", type=float, default=0.0, help="Extra latency per prompt token")
+    args = parser.parse_args()
+
+    stub = StubOllamaServer(
+        args.host, args.port, latency=args.latency, jitter=args.jitter, parallel=args.parallel,
+        prefill_delay=args.prefill_ms / 1000,
+        token_delay=1 / args.tokens_per_second if args.tokens_per_second else 0.0,
+    )
+    print(f"Stub Ollama server on {stub.base_url} (Ctrl+C to stop)")
+    stub.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()